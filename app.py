@@ -18,6 +18,14 @@ def get_memory_manager():
 
 mem_mgr = get_memory_manager()
 
+# PRE-WARMED MODEL HANDLES (once per process and key set: new brains / key rotation reuse them)
+@st.cache_resource
+def warm_model_pool(api_keys):
+    from spell_agents import SpellBrain
+    keys = list(api_keys)
+    OracleBrain.warm_model_pool(keys)
+    return SpellBrain.warm_model_pool(keys)  # handles now in the pool
+
 # SET PAGE CONFIG
 st.set_page_config(
     page_title="Nes Shine // Sovereign Engine",
@@ -353,13 +361,38 @@ with st.sidebar:
         if st.session_state.el_voice_id:
             os.environ["ELEVENLABS_VOICE_ID"] = st.session_state.el_voice_id
     
+    # SPECULATIVE DRAFTING (parallel drafts across keys)
+    with st.expander("⚡ SPECULATIVE DRAFTING", expanded=False):
+        st.caption("Write several drafts in parallel on different keys and keep the best one. 1 = classic serial cycle. Needs spare keys; costs more per reading.")
+        spec_settings = mem_mgr.load_settings()
+        spec_branches_input = st.number_input("PARALLEL DRAFTS", min_value=1, max_value=8, step=1,
+                                              value=int(spec_settings.get("speculative_branches", 1)))
+        spec_ceiling_input = st.number_input("COST CEILING PER READING ($)", min_value=0.10, max_value=50.0, step=0.50,
+                                             value=float(spec_settings.get("speculative_cost_ceiling_usd", 3.0)))
+        if st.button("💾 SAVE SPECULATIVE", key="save_spec_btn", use_container_width=True):
+            spec_settings["speculative_branches"] = int(spec_branches_input)
+            spec_settings["speculative_cost_ceiling_usd"] = float(spec_ceiling_input)
+            if mem_mgr.save_settings(spec_settings):
+                st.success("✅ Speculative drafting settings saved.")
+            else:
+                st.error("Database save failed.")
+    
     # Determine active API keys (COLLECT ALL VALID KEYS)
     valid_keys = [k.strip() for k in st.session_state.saved_keys if k and k.strip()]
     api_key = valid_keys[0] if valid_keys else None
     active_key_num = len(valid_keys)
     
     if api_key:
+        warm_model_pool(tuple(valid_keys))
         st.success(f"🔑 {len(valid_keys)} ACTIVE KEYS READY (ROTATION ENABLED)")
+        # KEY POOL HEALTH (shared across readings, persisted quarantines)
+        try:
+            from key_pool import get_key_pool
+            resting = [k for k in get_key_pool(valid_keys).snapshot() if k["quarantined"]]
+            if resting:
+                st.caption(f"⏸️ {len(resting)} KEY(S) RESTING (QUOTA/LIMIT) — POOL SKIPS THEM AUTOMATICALLY")
+        except Exception:
+            pass
     else:
         st.error("⚠️ NO API KEYS SET")
     
@@ -430,7 +463,9 @@ with st.sidebar:
         st.metric("TOKENS", f"{total_k:.1f}K" if total_k > 0 else "0")
     with tok_c2:
         st.metric("API CALLS", usage['total_api_calls'])
-    
+    if usage.get('extractions'):
+        st.caption(f"🧩 JSON extraction failures {usage['extraction_failure_rate']:.1%} of {usage['extractions']} · {usage['extraction_repairs']} repaired by retry")
+
     st.markdown("---")
     st.markdown("### CLIENT ARCHIVES")
     
@@ -763,6 +798,8 @@ with tab1:
                 with cc3:
                     st.metric("QC ROUNDS", u['qc_rounds'])
                 st.caption(f"📊 {u['tokens_in']:,} input + {u['tokens_out']:,} output · {u['api_calls']} API calls")
+                if u.get('tokens_cached'):
+                    st.caption(f"🗄️ {u['tokens_cached']:,} of {u['tokens_in']:,} input tokens served from context cache · saved ${u.get('cache_savings_usd', 0.0):.4f}")
             
             # RAW TEXT EXPANDER
             with st.expander("VIEW SOURCE CODE"):
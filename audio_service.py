@@ -9,6 +9,15 @@ import re
 import io
 from html.parser import HTMLParser
 
+_CLIENT_FACTORY = None  # ElevenLabs client class override (fake_backend for offline runs)
+
+
+def set_client_factory(factory=None):
+    """Replaces the ElevenLabs client class; None restores the real SDK. Returns the previous factory."""
+    global _CLIENT_FACTORY
+    previous, _CLIENT_FACTORY = _CLIENT_FACTORY, factory
+    return previous
+
 
 class HTMLStripper(HTMLParser):
     """Strips HTML tags and converts structure into speech-friendly text."""
@@ -130,8 +139,11 @@ class AudioService:
         if not self.api_key:
             raise ValueError("ELEVENLABS_API_KEY not set.")
 
-        from elevenlabs.client import ElevenLabs
-        self.client = ElevenLabs(api_key=self.api_key)
+        if _CLIENT_FACTORY is not None:
+            self.client = _CLIENT_FACTORY(api_key=self.api_key)
+        else:
+            from elevenlabs.client import ElevenLabs
+            self.client = ElevenLabs(api_key=self.api_key)
 
         self.voice_id = voice_id or os.environ.get("ELEVENLABS_VOICE_ID", "")
         if not self.voice_id:
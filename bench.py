@@ -0,0 +1,222 @@
+"""
+Offline Benchmark Harness for Nes Shine Oracle
+Runs full OracleBrain.run_cycle / SpellBrain.run_spell_cycle / AudioService
+jobs against the fake Gemini and ElevenLabs backends (fake_backend.py) with
+injected faults, and reports throughput, wasted tokens, recovery time and
+per-agent latency quantiles. No API quota is spent.
+
+    python bench.py --readings 8 --spells 2 --audio --keys 3 --concurrency 4 \
+        --faults "rate_limit=0.05,unavailable=0.03,blocked=0.02,stream_break=0.1" --time-scale 0.01
+
+--time-scale shrinks every simulated wait (latency, Retry-After, backoff,
+cooldowns, hedge delays); reported latencies are converted back to simulated seconds.
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+ORDER_NOTE = """Marissa Angelique 11/11
+Eamon Mitchell 12/30
+
+Will Eamon come back to me this spring? I keep dreaming about a blue light.
+Message:Thank you Nes
+Marissa
+Message:I trust your guidance
+"""
+SPELL_NOTE = "Hi Nes, my name is Julie. I want Tom to reconcile with me and open his heart again."
+
+
+class _BenchStore:
+    """Key pool state stays in memory: a bench run must not touch saved quarantines."""
+
+    def __init__(self):
+        self.records = []
+
+    def load(self):
+        return list(self.records)
+
+    def save(self, records):
+        self.records = list(records)
+
+
+def _percentile(samples, q):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+
+def _fmt(seconds):
+    return "-" if seconds is None else f"{seconds:.1f}s"
+
+
+class Bench:
+    def __init__(self, readings=4, spells=0, audio=False, keys=3, concurrency=2, faults="", time_scale=0.01, seed=7):
+        from fake_backend import FakeGemini, FakeElevenLabs, FaultProfile
+        self.readings = readings
+        self.spells = spells
+        self.audio = audio
+        self.concurrency = concurrency
+        self.time_scale = time_scale
+        self.faults = FaultProfile.parse(faults)
+        self.api_keys = [f"AIzaBenchFakeKey-{seed:04d}-{n:04d}-offline" for n in range(keys)]
+        self.gemini = FakeGemini(faults=self.faults, time_scale=time_scale, seed=seed)
+        self.tts = FakeElevenLabs(faults=self.faults, time_scale=time_scale, seed=seed + 1)
+        self.store = _BenchStore()
+        self.results = []
+        self._lock = threading.Lock()
+
+    # ==================== BRAIN SETUP ====================
+    def _pool(self):
+        """Key pool on the bench store, with quotas scaled to the simulated clock."""
+        import key_pool
+        return key_pool.KeyPool(
+            self.api_keys, store=self.store,
+            limits={"rpm": int(key_pool.DEFAULT_LIMITS["rpm"] / self.time_scale),
+                    "tpm": int(key_pool.DEFAULT_LIMITS["tpm"] / self.time_scale)})
+
+    def _tune(self, brain):
+        """Scales every wait inside the brain to the simulated clock."""
+        import retry_policy
+        brain.retry_policy = retry_policy.RetryPolicy(
+            base_delay=retry_policy.BASE_DELAY * self.time_scale,
+            max_delay=retry_policy.MAX_DELAY * self.time_scale)
+        if hasattr(brain, "latency_tracker"):
+            brain.latency_tracker = self.tracker
+        brain.telemetry = self.telemetry
+        return brain
+
+    def _reading_job(self, n):
+        from agents import OracleBrain
+        brain = self._tune(OracleBrain(self.api_keys, key_pool=self._pool()))
+        draft, delivery, usage, audio_path = brain.run_cycle(
+            ORDER_NOTE, "Love", client_email=f"bench-reading-{n}@example.com",
+            target_length="6000", generate_audio=self.audio, speculative_branches=1)
+        return {"kind": "reading", "chars": len(draft or ""), "audio": bool(audio_path), "usage": usage}
+
+    def _spell_job(self, n):
+        from spell_agents import SpellBrain
+        brain = self._tune(SpellBrain(self.api_keys, key_pool=self._pool()))
+        ritual, delivery, usage, audio_path = brain.run_spell_cycle(
+            SPELL_NOTE, "Reconciliation", client_email=f"bench-spell-{n}@example.com",
+            approved_spells="1. Honey Jar Sweetening", diagnostic_report="Blocked heart chakra.",
+            target_length="15000", generate_audio=self.audio)
+        return {"kind": "spell", "chars": len(ritual or ""), "audio": bool(audio_path), "usage": usage}
+
+    def _timed(self, job, n):
+        started = time.time()
+        try:
+            result = job(n)
+            result["error"] = None
+        except Exception as e:
+            result = {"kind": job.__name__.strip("_").replace("_job", ""), "error": f"{type(e).__name__}: {e}"}
+        result["wall_s"] = time.time() - started
+        with self._lock:
+            self.results.append(result)
+        return result
+
+    # ==================== RUN ====================
+    def run(self):
+        import key_pool
+        import hedging
+        from fake_backend import installed
+        from telemetry import Telemetry
+
+        saved_cooldowns = (key_pool.RATE_LIMIT_COOLDOWN, key_pool.TRANSIENT_COOLDOWN)
+        saved_env = {k: os.environ.get(k) for k in ("RESPONSE_CACHE_PATH", "TELEMETRY_PATH", "SUPABASE_URL", "SUPABASE_KEY")}
+        saved_cwd = os.getcwd()
+        workdir = tempfile.mkdtemp(prefix="oracle-bench-")
+        try:
+            os.chdir(workdir)  # client_memories/ and saved_audio/ land in the temp dir
+            os.environ["RESPONSE_CACHE_PATH"] = os.path.join(workdir, "responses.sqlite3")
+            os.environ["TELEMETRY_PATH"] = os.path.join(workdir, "llm_spans.jsonl")
+            os.environ.pop("SUPABASE_URL", None)
+            os.environ.pop("SUPABASE_KEY", None)
+            key_pool.RATE_LIMIT_COOLDOWN = saved_cooldowns[0] * self.time_scale
+            key_pool.TRANSIENT_COOLDOWN = saved_cooldowns[1] * self.time_scale
+            self.tracker = hedging.LatencyTracker(default_delay=hedging.DEFAULT_HEDGE_DELAY * self.time_scale,
+                                                  min_delay=hedging.MIN_HEDGE_DELAY * self.time_scale)
+            self.telemetry = Telemetry(path=os.environ["TELEMETRY_PATH"])
+
+            jobs = [(self._reading_job, n) for n in range(self.readings)] + \
+                [(self._spell_job, n) for n in range(self.spells)]
+            started = time.time()
+            with installed(gemini=self.gemini, tts=self.tts if self.audio else None):
+                with ThreadPoolExecutor(max_workers=max(1, self.concurrency), thread_name_prefix="bench") as pool:
+                    list(pool.map(lambda job: self._timed(*job), jobs))
+            self.wall_s = time.time() - started
+        finally:
+            os.chdir(saved_cwd)
+            key_pool.RATE_LIMIT_COOLDOWN, key_pool.TRANSIENT_COOLDOWN = saved_cooldowns
+            for k, v in saved_env.items():
+                if v is None:
+                    os.environ.pop(k, None)
+                else:
+                    os.environ[k] = v
+        return self.report()
+
+    def report(self):
+        stats = self.gemini.stats
+        done = [r for r in self.results if not r["error"]]
+        simulated = self.wall_s / self.time_scale if self.time_scale else self.wall_s
+        tokens_total = stats["tokens_in"] + stats["tokens_out"] + stats["wasted_tokens"]
+        recoveries = stats["recoveries"]
+        lines = [
+            "==================== NES SHINE OFFLINE BENCH ====================",
+            f"Jobs: {len(done)}/{len(self.results)} ok  (readings={self.readings}, spells={self.spells}, "
+            f"audio={'on' if self.audio else 'off'}, keys={len(self.api_keys)}, concurrency={self.concurrency})",
+            f"Faults: {self.faults.rates} stream_break={self.faults.stream_break}",
+            f"Wall: {self.wall_s:.1f}s  |  Simulated: {simulated:.0f}s  |  "
+            f"Throughput: {len(done) / simulated * 3600 if simulated else 0:.1f} jobs/simulated hour",
+            f"Gemini calls: {stats['calls']} ({stats['successes']} ok)  |  Faults: {stats['faults'] or '-'}",
+            f"Calls per key: {sorted(stats['calls_per_key'].values())}",
+            f"Tokens: in={stats['tokens_in']} out={stats['tokens_out']} wasted={stats['wasted_tokens']} "
+            f"({stats['wasted_tokens'] / tokens_total * 100 if tokens_total else 0:.1f}%)",
+            f"Recovery after fault: p50={_fmt(_percentile(recoveries, 0.5))} p95={_fmt(_percentile(recoveries, 0.95))} "
+            f"max={_fmt(max(recoveries) if recoveries else None)} (n={len(recoveries)})",
+        ]
+        if self.audio:
+            lines.append(f"TTS: {self.tts.stats['requests']} requests, {self.tts.stats['characters']} chars, "
+                         f"faults {self.tts.stats['faults'] or '-'}")
+        lines.append("--- Per agent (simulated seconds) ---")
+        scale = self.time_scale or 1.0
+        for agent, row in sorted(self.telemetry.summary().items()):
+            p50, p95 = row["latency_p50"], row["latency_p95"]
+            lines.append(f"{agent:<22} calls={row['calls']:<4} p50={_fmt(p50 / scale if p50 is not None else None)} "
+                         f"p95={_fmt(p95 / scale if p95 is not None else None)} retries={row['retries'] or '-'}")
+        for r in self.results:
+            if r["error"]:
+                lines.append(f"FAILED {r['kind']}: {r['error'][:160]}")
+        return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline fault-injection benchmark for OracleBrain / SpellBrain / TTS.")
+    parser.add_argument("--readings", type=int, default=4)
+    parser.add_argument("--spells", type=int, default=0)
+    parser.add_argument("--audio", action="store_true", help="also run the ElevenLabs stage")
+    parser.add_argument("--keys", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--faults", default="rate_limit=0.05,unavailable=0.03,blocked=0.02,stream_break=0.1",
+                        help="comma separated kind=probability (rate_limit, daily_quota, unavailable, deadline, blocked, stream_break)")
+    parser.add_argument("--time-scale", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", default="bench_output.txt")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    output = os.path.abspath(args.output)
+    bench = Bench(args.readings, args.spells, args.audio, args.keys, args.concurrency, args.faults, args.time_scale, args.seed)
+    text = bench.run()
+    print(text)
+    with open(output, "w", encoding="utf-8") as f:
+        f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Budget Governor for Nes Shine Oracle
+Per-cycle ceilings on cost (USD), tokens, wall-clock and QC rounds for
+OracleBrain.run_cycle and SpellBrain.run_spell_cycle. The brains consult the
+governor before every LLM call (in _acquire_key); when a ceiling would be
+crossed it raises BudgetExceeded, and the cycle ships the best draft offered
+so far instead of starting another round. Limits come from the
+"budget_limits" app setting; None disables a ceiling.
+"""
+
+import time
+import threading
+
+DEFAULT_LIMITS = {
+    "max_usd": 5.00,          # per reading / spell
+    "max_tokens": 3_000_000,  # in + out, all agents of the cycle
+    "max_seconds": 3600,      # wall-clock from the start of the cycle
+    "max_rounds": 8,          # QC'd drafts
+}
+
+
+class BudgetExceeded(Exception):
+    """A cycle ceiling was hit. limit: "max_usd" | "max_tokens" | "max_seconds" | "max_rounds"."""
+
+    def __init__(self, limit, used, ceiling):
+        self.limit = limit
+        self.used = used
+        self.ceiling = ceiling
+        super().__init__(f"Bütçe sınırı aşıldı: {limit} ({used:g} / {ceiling:g})")
+
+
+class BudgetGovernor:
+    """
+    usage: callable returning (cost_usd, total_tokens) spent so far in the cycle.
+    Drafts are offered with a score (higher is better); best() returns the top one.
+    """
+
+    def __init__(self, usage, max_usd=None, max_tokens=None, max_seconds=None, max_rounds=None, clock=time.time):
+        self.usage = usage
+        self.limits = {"max_usd": max_usd, "max_tokens": max_tokens, "max_seconds": max_seconds, "max_rounds": max_rounds}
+        self.clock = clock
+        self.started = clock()
+        self.fired = None
+        self.active = True
+        self._lock = threading.Lock()
+        self._best = None  # (score, draft)
+
+    @classmethod
+    def from_settings(cls, usage, settings=None, clock=time.time):
+        limits = dict(DEFAULT_LIMITS)
+        for name, value in ((settings or {}).get("budget_limits") or {}).items():
+            if name in limits:
+                try:
+                    limits[name] = None if value in (None, "", 0) else float(value)
+                except (TypeError, ValueError):
+                    print(f"BUDGET: geçersiz ayar {name}={value!r}, varsayılan kullanılıyor.")
+        return cls(usage, clock=clock, **limits)
+
+    def elapsed(self):
+        return self.clock() - self.started
+
+    def _fire(self, limit, used):
+        with self._lock:
+            if self.fired is None:
+                self.fired = limit
+        raise BudgetExceeded(limit, used, self.limits[limit])
+
+    def check(self, est_tokens=0, est_usd=0.0):
+        """Before an LLM call: raises BudgetExceeded if the call would cross a ceiling."""
+        if not self.active:
+            return
+        usd, tokens = self.usage()
+        if self.limits["max_usd"] is not None and usd + est_usd > self.limits["max_usd"]:
+            self._fire("max_usd", round(usd + est_usd, 4))
+        if self.limits["max_tokens"] is not None and tokens + est_tokens > self.limits["max_tokens"]:
+            self._fire("max_tokens", tokens + est_tokens)
+        if self.limits["max_seconds"] is not None and self.elapsed() > self.limits["max_seconds"]:
+            self._fire("max_seconds", round(self.elapsed(), 1))
+
+    def check_round(self, next_round):
+        """Before drafting round `next_round` (1-based)."""
+        if self.active and self.limits["max_rounds"] is not None and next_round > self.limits["max_rounds"]:
+            self._fire("max_rounds", next_round)
+
+    def offer(self, draft, score):
+        if not draft:
+            return
+        with self._lock:
+            if self._best is None or score > self._best[0]:
+                self._best = (score, draft)
+
+    def best(self):
+        with self._lock:
+            return self._best[1] if self._best else None
+
+    def stop(self):
+        """Drafting is over: the post-approval tail (memory, delivery) is never cut off."""
+        self.active = False
+
+    def report(self):
+        usd, tokens = self.usage()
+        return {"limit_fired": self.fired, "cost_usd": round(usd, 6), "tokens": tokens,
+                "seconds": round(self.elapsed(), 1), "limits": dict(self.limits)}
@@ -0,0 +1,198 @@
+"""
+Client Identification for Nes Shine Oracle
+Local fast path in front of the CLIENT_ID_PROMPT round-trip. Order notes carry
+the client's first name in predictable places: first-person labels ("Name: Julie",
+"my name is Julie", "call me Julie", "I'm Julie"),
+the sender line of pasted chat exports ("Marissa\\nMessage: ..."), sign-offs
+("Love, Julie") and a "First Last MM/DD" birth-data line at the top. Each
+signal adds evidence for a candidate; names already known from client_memories
+add more. A name introduced as somebody else's ("his name is David", "my
+daughter's name is Emma") is evidence AGAINST that candidate. Only when the best candidate stays below the confidence threshold
+does the caller fall back to the LLM.
+"""
+
+import re
+import time
+import threading
+
+CONFIDENCE_THRESHOLD = 0.8   # below this the LLM decides
+INDEX_TTL = 300              # seconds before the known-name index is rebuilt
+
+# Evidence weight per signal (combined as 1 - prod(1 - w))
+W_LABEL = 0.95        # "Name: Julie", "My name is Julie", "call me Julie"
+W_INTRO = 0.7         # "I'm Julie" (also "I'm Worried", so never enough on its own)
+W_SENDER = 0.7        # standalone name line directly above "Message:" (per occurrence)
+W_SIGNOFF = 0.85      # "Love,\nJulie" / "- Julie" as the last line
+W_BIRTH_LINE = 0.6    # "Marissa Angelique 11/11" as the first line
+W_KNOWN = 0.5         # candidate is a client we already have memory for
+W_THIRD_PARTY = 0.9   # "his name is David": confidence in David is cut by this much
+
+_NAME = r"[A-ZÀ-ÖØ-Þ][a-zà-öø-ÿ]+(?:[-'][A-ZÀ-ÖØ-Þ]?[a-zà-öø-ÿ]+)?"
+_LABEL_RE = re.compile(r"(?i:\bname\s*(?:is\b|:)|\bname's\b)\s*(" + _NAME + r")\b")
+_CALL_ME_RE = re.compile(r"(?i:\bcall me)\s+(" + _NAME + r")\b")
+_INTRO_RE = re.compile(r"(?i:\bI'm|\bI’m|\bI am)\s+(" + _NAME + r")\b")
+_NAME_QUALIFIERS = {"full", "first", "real", "client"}
+_THIRD_PARTY_OWNERS = {"his", "her", "their"}
+_SENDER_RE = re.compile(r"^[ \t]*(" + _NAME + r")(?:[ \t]+" + _NAME + r")?[ \t]*\r?\n[ \t]*Message\s*:", re.MULTILINE)
+_SIGNOFF_RE = re.compile(
+    r"(?:^|\n)\s*(?i:love|thanks|thank you|regards|best|xoxo|blessings|sincerely|cheers)[ ,!.]*\s*\n?\s*[-–—~]?\s*("
+    + _NAME + r")\s*[!.]*\s*$")
+_DASH_SIGN_RE = re.compile(r"\n\s*[-–—~]\s*(" + _NAME + r")\s*$")
+_BIRTH_LINE_RE = re.compile(r"^\s*(" + _NAME + r")(?:\s+" + _NAME + r")*\s+\d{1,2}[/.]\d{1,2}(?:[/.]\d{2,4})?\b")
+
+# Words that look like names in these notes but never are the client
+_STOPWORDS = {
+    "nes", "shine", "message", "date", "hi", "hello", "hey", "dear", "thanks", "thank", "love",
+    "yes", "no", "ok", "okay", "sorry", "just", "also", "so", "and", "but", "the", "he", "she",
+    "they", "we", "my", "his", "her", "their", "reading", "order", "note", "client", "unknown",
+    "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday",
+    "mon", "tue", "wed", "thu", "fri", "sat", "sun",
+    "january", "february", "march", "april", "may", "june", "july", "august",
+    "september", "october", "november", "december",
+    "not", "sure", "here", "happy", "really", "very", "going", "still", "ready",
+}
+
+
+def _clean(name):
+    name = (name or "").strip().strip(".,!")
+    if not name or name.lower() in _STOPWORDS or len(name) < 2:
+        return None
+    return name[0].upper() + name[1:]
+
+
+def _label_owner(line_prefix):
+    """
+    Whose name a "name is X" / "Name: X" label gives, from the words before it
+    on the same line: "self" (my name, a bare form label), "other" (his/her/
+    their name, my daughter's name) or None (not a label we can attribute).
+    """
+    words = [w.lower() for w in re.findall(r"[\w'’]+", line_prefix)]
+    while words and words[-1] in _NAME_QUALIFIERS:
+        words.pop()
+    if not words or words == ["your"] or words[-1] == "my":
+        return "self"
+    if words[-1] in _THIRD_PARTY_OWNERS or words[-1].endswith(("'s", "’s")):
+        return "other"
+    return None
+
+
+def first_name(full_name):
+    """First name of a stored client_name; emails and 'Unknown' are not names."""
+    if not full_name or "@" in full_name or "unknown" in full_name.lower():
+        return None
+    parts = re.findall(_NAME, full_name)
+    return _clean(parts[0]) if parts else None
+
+
+class ClientIdentifier:
+    def __init__(self, threshold=CONFIDENCE_THRESHOLD, index_ttl=INDEX_TTL, clock=time.time):
+        self.threshold = threshold
+        self.index_ttl = index_ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._known = set()
+        self._index_built = None
+        self.stats = {"local_hits": 0, "llm_fallbacks": 0}
+
+    # ==================== NAME INDEX ====================
+    def build_index(self, names):
+        known = {n.lower() for n in (first_name(name) for name in names) if n}
+        with self._lock:
+            self._known = known
+            self._index_built = self.clock()
+        return len(known)
+
+    def refresh_index(self, memory_manager):
+        """Rebuilds the known-name index from client_memories at most every INDEX_TTL seconds."""
+        if memory_manager is None:
+            return
+        with self._lock:
+            fresh = self._index_built is not None and self.clock() - self._index_built < self.index_ttl
+        if fresh:
+            return
+        try:
+            self.build_index(c.get("client_name") for c in memory_manager.list_all_clients())
+        except Exception as e:
+            print(f"CLIENT INDEX ERROR (non-fatal): {e}")
+
+    # ==================== HEURISTICS ====================
+    def candidates(self, text):
+        """{name: confidence} from every local signal in the note."""
+        evidence = {}
+        third_party = set()
+
+        def add(name, weight):
+            name = _clean(name)
+            if name:
+                evidence.setdefault(name, []).append(weight)
+
+        for m in _LABEL_RE.finditer(text):
+            owner = _label_owner(text[text.rfind("\n", 0, m.start()) + 1:m.start()])
+            if owner == "self":
+                add(m.group(1), W_LABEL)
+            elif owner == "other" and _clean(m.group(1)):
+                third_party.add(_clean(m.group(1)))
+        for m in _CALL_ME_RE.finditer(text):
+            add(m.group(1), W_LABEL)
+        for m in _INTRO_RE.finditer(text):
+            add(m.group(1), W_INTRO)
+        for m in _SENDER_RE.finditer(text):
+            add(m.group(1), W_SENDER)
+        tail = text.strip()[-200:]
+        for regex in (_SIGNOFF_RE, _DASH_SIGN_RE):
+            m = regex.search(tail)
+            if m:
+                add(m.group(1), W_SIGNOFF)
+                break
+        m = _BIRTH_LINE_RE.match(text.strip())
+        if m:
+            add(m.group(1), W_BIRTH_LINE)
+
+        with self._lock:
+            known = set(self._known)
+        scores = {}
+        for name, weights in evidence.items():
+            if name.lower() in known:
+                weights.append(W_KNOWN)
+            miss = 1.0
+            for w in weights:
+                miss *= 1.0 - w
+            scores[name] = 1.0 - miss
+            if name in third_party:
+                scores[name] *= 1.0 - W_THIRD_PARTY
+        return scores
+
+    def identify(self, text):
+        """
+        Returns (name, confidence). name is None when no candidate reaches the
+        threshold or two candidates are too close to call.
+        """
+        scores = self.candidates(text or "")
+        if not scores:
+            self._count(False)
+            return None, 0.0
+        ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+        name, confidence = ranked[0]
+        ambiguous = len(ranked) > 1 and ranked[1][1] >= confidence - 0.1
+        if confidence < self.threshold or ambiguous:
+            self._count(False)
+            return None, confidence
+        self._count(True)
+        return name, confidence
+
+    def _count(self, local_hit):
+        with self._lock:
+            self.stats["local_hits" if local_hit else "llm_fallbacks"] += 1
+
+    def hit_rate(self):
+        with self._lock:
+            total = self.stats["local_hits"] + self.stats["llm_fallbacks"]
+            return self.stats["local_hits"] / total if total else 0.0
+
+
+_IDENTIFIER = ClientIdentifier()
+
+
+def get_client_identifier():
+    """Process-wide identifier shared by OracleBrain and SpellBrain."""
+    return _IDENTIFIER
@@ -0,0 +1,105 @@
+"""
+Concurrency helpers for Nes Shine Oracle
+Small thread-pool wrappers shared by the brains. Worker threads inherit the
+Streamlit script context so progress callbacks keep rendering in the UI.
+"""
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+
+
+class Cancelled(Exception):
+    """Raised inside an abandoned task at its next checkpoint (e.g. a losing speculative branch)."""
+
+
+def _script_context():
+    """Current Streamlit ScriptRunContext, or None outside Streamlit."""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        return get_script_run_ctx()
+    except Exception:
+        return None
+
+
+def _attach_context(ctx):
+    if ctx is None:
+        return
+    try:
+        from streamlit.runtime.scriptrunner import add_script_run_ctx
+        add_script_run_ctx(threading.current_thread(), ctx)
+    except Exception:
+        pass
+
+
+def _wrap(fn, ctx):
+    def runner():
+        _attach_context(ctx)
+        return fn()
+    return runner
+
+
+def iter_completed(tasks, max_workers=None, thread_name_prefix="oracle"):
+    """
+    Runs zero-argument callables concurrently and yields (index, result, error)
+    in completion order. Breaking out of the loop early abandons the remaining
+    tasks: queued ones are cancelled, running ones finish in the background and
+    their results are discarded.
+    """
+    if not tasks:
+        return
+    ctx = _script_context()
+    executor = ThreadPoolExecutor(max_workers=max_workers or len(tasks), thread_name_prefix=thread_name_prefix)
+    try:
+        futures = {executor.submit(_wrap(fn, ctx)): idx for idx, fn in enumerate(tasks)}
+        for future in as_completed(futures):
+            idx = futures[future]
+            try:
+                yield idx, future.result(), None
+            except Exception as e:
+                yield idx, None, e
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def submit_with_context(executor, fn):
+    """executor.submit() for a long-lived pool: the task runs in the caller's Streamlit context."""
+    return executor.submit(_wrap(fn, _script_context()))
+
+
+def run_parallel(tasks, max_workers=None, thread_name_prefix="oracle"):
+    """Runs all tasks and returns [(result, error), ...] in submission order."""
+    results = [(None, None)] * len(tasks)
+    for idx, result, error in iter_completed(tasks, max_workers, thread_name_prefix):
+        results[idx] = (result, error)
+    return results
+
+
+def run_stage(tasks, thread_name_prefix="oracle-stage"):
+    """
+    Runs a stage of independent tasks concurrently, each with its own timeout.
+    tasks: {name: (callable, timeout_seconds or None)}
+    Returns {name: (result, error)} once every task finished or timed out.
+    A timed-out task gets a TimeoutError and is abandoned (it may still finish
+    in the background; its result is discarded).
+    """
+    if not tasks:
+        return {}
+    ctx = _script_context()
+    executor = ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix=thread_name_prefix)
+    started = time.time()
+    results = {}
+    try:
+        futures = {name: executor.submit(_wrap(fn, ctx)) for name, (fn, _) in tasks.items()}
+        for name, future in futures.items():
+            timeout = tasks[name][1]
+            remaining = None if timeout is None else max(0.0, started + timeout - time.time())
+            try:
+                results[name] = (future.result(timeout=remaining), None)
+            except FuturesTimeout:
+                results[name] = (None, TimeoutError(f"{name} timed out after {timeout}s"))
+            except Exception as e:
+                results[name] = (None, e)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return results
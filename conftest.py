@@ -0,0 +1,14 @@
+import os
+import tempfile
+
+
+def pytest_configure(config):
+    """
+    Process-wide singletons (telemetry, response cache, key pool state) read
+    their paths from the environment when first built; point them at a temp dir
+    so no test writes into the repo's logs/ or .cache/.
+    """
+    workdir = tempfile.mkdtemp(prefix="oracle-tests-")
+    os.environ["TELEMETRY_PATH"] = os.path.join(workdir, "llm_spans.jsonl")
+    os.environ["RESPONSE_CACHE_PATH"] = os.path.join(workdir, "responses.sqlite3")
+    os.environ["KEY_POOL_STATE_PATH"] = os.path.join(workdir, "key_pool_state.json")
@@ -0,0 +1,154 @@
+"""
+Context Cache for Nes Shine Oracle
+Registers the static instruction prefix (NES_SHINE_CORE_INSTRUCTIONS + the
+per-reading memory context) once as Gemini cached content and hands out the
+handle for the rest of the cycle, so QC revisions stop re-sending thousands of
+identical input tokens. Cached content lives in the project of the API key
+that created it, so handles are tracked per key.
+"""
+
+import time
+import hashlib
+import threading
+
+from key_pool import key_fingerprint
+
+CACHE_TTL = 900            # seconds; a full QC cycle comfortably fits, released early at cycle end
+REFRESH_MARGIN = 60        # recreate a handle that would expire mid-request
+MIN_CACHE_TOKENS = 1024    # Gemini rejects smaller cached contents (model dependent, 1024-4096)
+
+
+def estimate_tokens(*texts):
+    """Rough token estimate used before anything is sent (same ratio as the key pool)."""
+    return sum(len(t or "") for t in texts) // 4
+
+
+class GeminiCacheBackend:
+    """Creates/deletes cached contents through the key's own CacheService client."""
+
+    def create(self, client, model_name, system_instruction, contents, ttl):
+        """Returns (cache_name, cached_token_count)."""
+        from google.generativeai.caching import CachedContent
+        request = CachedContent._prepare_create_request(
+            model=model_name,
+            display_name="nes-shine-prefix",
+            system_instruction=system_instruction,
+            contents=[contents] if contents else None,
+            ttl=ttl,
+        )
+        response = client.get_service_client("cache").create_cached_content(request=request)
+        tokens = 0
+        try:
+            tokens = response.usage_metadata.total_token_count
+        except Exception:
+            pass
+        return response.name, tokens
+
+    def delete(self, client, name):
+        client.get_service_client("cache").delete_cached_content(name=name)
+
+
+class LocalCacheBackend:
+    """In-memory stand-in for tests and offline runs. Mirrors the Gemini contract."""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.entries = {}
+        self.create_calls = 0
+        self._counter = 0
+
+    def create(self, client, model_name, system_instruction, contents, ttl):
+        self.create_calls += 1
+        if self.fail:
+            raise Exception("400 Cached content is too small")
+        self._counter += 1
+        name = f"cachedContents/local-{self._counter}"
+        self.entries[name] = {
+            "api_key": client.api_key,
+            "model": model_name,
+            "system_instruction": system_instruction,
+            "contents": contents,
+        }
+        return name, estimate_tokens(system_instruction, contents)
+
+    def delete(self, client, name):
+        self.entries.pop(name, None)
+
+
+class ContextCache:
+    """
+    Per-brain registry of cached prefixes.
+    get() returns {"name", "tokens", "created"} or None (caller then sends the
+    prefix inline). Failures never raise: caching is purely an optimization.
+    """
+
+    def __init__(self, backend=None, ttl=CACHE_TTL, min_tokens=MIN_CACHE_TOKENS, clock=time.time):
+        self.backend = backend or GeminiCacheBackend()
+        self.ttl = ttl
+        self.min_tokens = min_tokens
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries = {}   # (key fp, model, content hash) -> entry
+        self._floors = {}    # (key fp, model) -> largest estimate the API refused
+        self.stats = {"created": 0, "reused": 0, "skipped": 0, "failed": 0}
+
+    def _content_hash(self, system_instruction, contents):
+        digest = hashlib.sha256()
+        digest.update((system_instruction or "").encode("utf-8"))
+        digest.update(b"\x00")
+        digest.update((contents or "").encode("utf-8"))
+        return digest.hexdigest()[:16]
+
+    def get(self, client, model_name, system_instruction, contents=None):
+        est = estimate_tokens(system_instruction, contents)
+        fp = key_fingerprint(client.api_key)
+        scope = (fp, model_name)
+        entry_key = (fp, model_name, self._content_hash(system_instruction, contents))
+        now = self.clock()
+
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry and entry["expires_at"] - REFRESH_MARGIN > now:
+                self.stats["reused"] += 1
+                return {"name": entry["name"], "tokens": entry["tokens"], "created": False}
+            if est < self.min_tokens or est <= self._floors.get(scope, -1):
+                self.stats["skipped"] += 1
+                return None
+
+        try:
+            name, tokens = self.backend.create(client, model_name, system_instruction, contents, self.ttl)
+        except Exception as e:
+            with self._lock:
+                self._floors[scope] = max(self._floors.get(scope, -1), est)
+                self.stats["failed"] += 1
+            print(f"CONTEXT CACHE: Oluşturulamadı ({str(e)[:120]}). Önek satır içi gönderilecek.")
+            return None
+
+        with self._lock:
+            stale = self._entries.get(entry_key)
+            self._entries[entry_key] = {
+                "name": name,
+                "tokens": tokens or est,
+                "expires_at": now + self.ttl,
+                "client": client,
+            }
+            self.stats["created"] += 1
+        if stale:
+            self._delete(stale)
+        print(f"CONTEXT CACHE: {name} oluşturuldu ({tokens or est} token, anahtar {getattr(client, 'key_hint', fp)})")
+        return {"name": name, "tokens": tokens or est, "created": True}
+
+    def _delete(self, entry):
+        try:
+            self.backend.delete(entry["client"], entry["name"])
+        except Exception as e:
+            print(f"CONTEXT CACHE: Silme hatası (non-fatal, TTL ile düşecek): {str(e)[:100]}")
+
+    def release_all(self):
+        """Deletes every handle this brain created (stops storage billing early)."""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            self._delete(entry)
+        return len(entries)
@@ -0,0 +1,134 @@
+"""
+Stream Continuation for Nes Shine Oracle
+When a long stream dies half way (timeout, 503, 429 on the key), the text that
+already arrived is kept and the model is asked to continue from the last
+character instead of regenerating the whole reading. The continuation is
+validated and stitched onto the partial text (overlap removed), so the caller
+sees one seamless draft. A rejected continuation falls back to a full restart.
+"""
+
+import re
+
+MIN_RESUME_CHARS = 500    # below this, a restart is cheaper than a continuation
+MAX_RESUMES = 3           # per generation; after that stream_with_retry restarts
+OVERLAP_WINDOW = 400      # chars of the continuation held back to find the seam
+MIN_OVERLAP = 12          # shorter matches are coincidence, not an echo
+TAIL_PROBE = 60           # chars of the partial searched for in the continuation head
+
+META_OPENERS = ("sure", "here is", "here's", "certainly", "of course", "tabii", "elbette", "işte", "devam ediyorum")
+
+
+class ContinuationRejected(Exception):
+    """The continuation cannot be stitched; caller restarts from scratch."""
+
+
+def can_resume(partial):
+    return len(partial or "") >= MIN_RESUME_CHARS
+
+
+def build_continuation_prompt(original_prompt, partial):
+    """Original request + the partial answer + a strict 'continue, do not repeat' directive."""
+    return f"""{original_prompt}
+
+        --- YARIM KALAN METİN (YAYIN KESİLDİ) ---
+        Aşağıdaki metni SEN yazıyordun ve bağlantı koptu. Metni TEKRAR ETME, baştan BAŞLAMA.
+        Son karakterden itibaren aynı ses, aynı üslup ve aynı HTML yapısıyla KESİNTİSİZ devam et.
+        Cümle veya kelime yarımsa onu tamamlayarak başla. Açıklama, özür veya kod bloğu (```) ekleme;
+        SADECE metnin devamını yaz.
+
+<<<YARIM_METİN>>>
+{partial}
+<<<DEVAMI_BURADAN>>>"""
+
+
+def _strip_opening_fence(text):
+    return re.sub(r"^\s*```[a-zA-Z]*[ \t]*\n", "", text, count=1)
+
+
+def _normalize(text):
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+def looks_complete(partial):
+    """The stream may have died after the last chunk; a closed document needs no continuation."""
+    tail = partial.rstrip()
+    return tail.endswith("</div>") or tail.endswith("</html>") or tail.endswith("</p>")
+
+
+def validate_continuation(partial, head):
+    """Returns (ok, reason). `head` is the first OVERLAP_WINDOW chars (or all) of the continuation."""
+    body = _strip_opening_fence(head).lstrip()
+    if not body:
+        return True, ""
+    lowered = body.lower()
+    if "<h1" in partial.lower() and "<h1" in lowered:
+        return False, "continuation restarted the document (new <h1>)"
+    if lowered.startswith("<!doctype") or lowered.startswith("<html"):
+        return False, "continuation restarted the document"
+    opening = _normalize(partial[:80])
+    if opening and _normalize(body[:80]) == opening:
+        return False, "continuation repeats the opening"
+    if lowered.startswith(META_OPENERS):
+        return False, "continuation starts with meta commentary"
+    return True, ""
+
+
+def stitch(partial, continuation, max_overlap=OVERLAP_WINDOW):
+    """Returns the part of `continuation` that goes after `partial` (echoed overlap removed)."""
+    text = _strip_opening_fence(continuation)
+    if not partial:
+        return text
+
+    # 1) Exact echo: the continuation starts with the partial's last k characters
+    for k in range(min(len(partial), len(text), max_overlap), MIN_OVERLAP - 1, -1):
+        if partial.endswith(text[:k]):
+            return text[k:]
+
+    # 2) Echo of the last sentence with different leading whitespace
+    probe = partial.rstrip()[-TAIL_PROBE:].lstrip()
+    if len(probe) >= MIN_OVERLAP:
+        idx = text.find(probe, 0, max_overlap + len(probe))
+        if idx != -1:
+            return text[idx + len(probe):]
+
+    # 3) Clean continuation: keep the paragraph break the model chose, avoid doubled spaces
+    if partial[-1:].isspace():
+        return text.lstrip(" \t")
+    return text
+
+
+class ContinuationStitcher:
+    """
+    Streaming helper: holds back the first OVERLAP_WINDOW chars of a
+    continuation, validates and de-duplicates them, then passes the rest through.
+    feed()/finish() return the text to hand to the caller; both may raise ContinuationRejected.
+    """
+
+    def __init__(self, partial, window=OVERLAP_WINDOW):
+        self.partial = partial
+        self.window = window
+        self.head = ""
+        self.released = False
+        self.received = 0
+
+    def feed(self, text):
+        self.received += len(text.strip())
+        if self.released:
+            return text
+        self.head += text
+        if len(self.head) < self.window:
+            return ""
+        return self._release()
+
+    def finish(self):
+        out = "" if self.released else self._release()
+        if self.received == 0 and not looks_complete(self.partial):
+            raise ContinuationRejected("empty continuation")
+        return out
+
+    def _release(self):
+        self.released = True
+        ok, reason = validate_continuation(self.partial, self.head)
+        if not ok:
+            raise ContinuationRejected(reason)
+        return stitch(self.partial, self.head, self.window)
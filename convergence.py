@@ -0,0 +1,110 @@
+"""
+Convergence Detection for Nes Shine Oracle
+Watches the QC loop of run_cycle: successive drafts are compared by word
+shingle similarity and length delta, successive QC critiques by how much of
+the new critique was already said. A round that changes (almost) nothing is
+a stall. The first stall switches strategy (the writer is told plainly that
+the last rewrite did not move); another stall right after stops the loop and
+the best draft so far is shipped.
+"""
+
+import re
+
+SHINGLE_WORDS = 5            # draft shingles
+NOTE_SHINGLE_WORDS = 3       # critique shingles
+DRAFT_SIMILARITY = 0.85      # Jaccard at or above this = the rewrite barely changed the text
+LENGTH_DELTA = 0.05          # ... and the length moved less than 5%
+REPEATED_FEEDBACK = 0.6      # share of the new critique already present in the previous one
+PATIENCE = 2                 # consecutive stalls before the loop is stopped
+
+SWITCH_DIRECTIVE = """!!! DİKKAT: SON REVİZYON NEREDEYSE HİÇBİR ŞEYİ DEĞİŞTİRMEDİ / AYNI ELEŞTİRİLER TEKRARLANDI !!!
+Önceki taslağı küçük rötuşlarla tekrar GÖNDERME. Aşağıdaki her maddeyi somut olarak ele al:
+gerekirse ilgili bölümleri tamamen yeniden kur, yeni sahneler, yeni duyusal detaylar ve yeni yapı kullan.
+
+"""
+
+
+def _words(text):
+    text = re.sub(r"<[^>]+>", " ", text or "")
+    return re.findall(r"\w+", text.lower())
+
+
+def shingles(text, size=SHINGLE_WORDS):
+    words = _words(text)
+    if len(words) < size:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def similarity(a, b, size=SHINGLE_WORDS):
+    """Jaccard similarity of word shingles (HTML tags ignored)."""
+    sa, sb = shingles(a, size), shingles(b, size)
+    if not sa and not sb:
+        return 1.0
+    return len(sa & sb) / len(sa | sb)
+
+
+def _issue_shingles(notes, size):
+    """Critique shingles taken per issue (sentence / bullet), so reordered issues still match."""
+    result = set()
+    for issue in re.split(r"[.!?;\n]+", notes or ""):
+        result |= shingles(issue, size)
+    return result
+
+
+def repeated_share(previous, current, size=NOTE_SHINGLE_WORDS):
+    """Share of `current`'s shingles already present in `previous` (0 when either is empty)."""
+    sp, sc = _issue_shingles(previous, size), _issue_shingles(current, size)
+    if not sp or not sc:
+        return 0.0
+    return len(sc & sp) / len(sc)
+
+
+class ConvergenceDetector:
+    """
+    observe() once per QC'd draft. Returns None (keep going), "switch" or "stop";
+    the reason of the last stall is in self.reason.
+    """
+
+    def __init__(self, draft_similarity=DRAFT_SIMILARITY, length_delta=LENGTH_DELTA,
+                 repeated_feedback=REPEATED_FEEDBACK, patience=PATIENCE):
+        self.draft_similarity = draft_similarity
+        self.length_delta = length_delta
+        self.repeated_feedback = repeated_feedback
+        self.patience = patience
+        self.stalls = 0
+        self.switches = 0
+        self.reason = None
+        self.history = []  # per round: {"similarity", "length_delta", "repeated_feedback"}
+        self._last_draft = None
+        self._last_notes = None
+
+    def observe(self, draft, notes=None):
+        """notes: the QC critique of this draft (None when it was approved / no critique)."""
+        row = {"similarity": None, "length_delta": None, "repeated_feedback": None}
+        stall = None
+        if self._last_draft is not None and draft:
+            row["similarity"] = similarity(self._last_draft, draft)
+            row["length_delta"] = abs(len(draft) - len(self._last_draft)) / max(len(self._last_draft), 1)
+            if row["similarity"] >= self.draft_similarity and row["length_delta"] < self.length_delta:
+                stall = "drafts_converged"
+        if notes and self._last_notes:
+            row["repeated_feedback"] = repeated_share(self._last_notes, notes)
+            if stall is None and row["repeated_feedback"] >= self.repeated_feedback:
+                stall = "repeated_feedback"
+        self.history.append(row)
+        self._last_draft = draft or self._last_draft
+        self._last_notes = notes
+
+        if stall is None:
+            self.stalls = 0
+            return None
+        self.stalls += 1
+        self.reason = stall
+        if self.stalls >= self.patience:
+            return "stop"
+        self.switches += 1
+        return "switch"
+
+    def switch_feedback(self, notes):
+        return SWITCH_DIRECTIVE + (notes or "")
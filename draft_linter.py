@@ -0,0 +1,130 @@
+"""
+Pre-QC Draft Linter for Nes Shine Oracle
+Deterministic checks for the mechanical reasons a draft gets rejected
+(GRANDMASTER_QC_PROMPT and the writer's rules in prompts.py): too short,
+leftover code fences, unbalanced tags, dashes, Turkish words, a recited
+timestamp, internal notes. grandmaster_agent runs lint() first; a draft with
+a hard failure goes back to the writer with the linter's feedback and never
+costs an LLM QC call. Each hit is counted per rule in usage_stats["lint_hits"].
+"""
+
+import re
+from sections import parse_target_length, visible_length
+
+MIN_LENGTH_RATIO = 0.85   # below this share of target_length (visible chars) the draft is rejected
+TURKISH_WORD_LIMIT = 3    # stopword hits tolerated (names, quotes) before "not all English"
+
+_TAG = re.compile(r"<[^>]+>")
+_FENCE = re.compile(r"^\s*```[a-zA-Z]*[ \t]*\n?|\n?[ \t]*```\s*$")
+_BALANCED_TAGS = ("h1", "h2", "h3", "p", "b", "i", "em", "strong", "div")
+_DASH = re.compile(r"[–—]|(?<!\d)-|-(?!\d)")
+_TURKISH = re.compile(r"\b(?:ve|bir|için|ile|çok|değil|gibi|ama|şu|olarak|daha|seni|benim|bana|sana)\b", re.IGNORECASE)
+_TIMESTAMP = re.compile(
+    r"\b(?!(\d)\1?:\1\1\b|(\d\d):\2\b)\d{1,2}:\d{2}\b"   # clock times, but not 11:11 / 12:12 angel numbers
+    r"|\b\d{4}-\d{2}-\d{2}\b|\b(?-i:EST|EDT)\b"
+    r"|\b\d+\s*(?:hours?|hrs?|minutes?|mins?|seconds?|days?)\s+(?:and\s+\d+\s*\w+\s+)?ago\b",
+    re.IGNORECASE)
+_INTERNAL = re.compile(
+    r"\[HATA:|\b(?-i:APPROVED|REVISE|HEDEF)\b|\bGrandmaster\s*:|\bMedium Agent\b"   # verdict tokens only in capitals
+    r"|\[\d+\]|\[cite|\bas an ai\b|\blanguage model\b"
+    r"|^\s*(?:sure|certainly|here is|here's)\b",
+    re.IGNORECASE)
+
+
+def _text(draft):
+    return re.sub(r"[ \t]+", " ", _TAG.sub(" ", draft or ""))
+
+
+def _sample(match_iter, limit=3):
+    found = []
+    for m in match_iter:
+        if m.group(0) not in found:
+            found.append(m.group(0))
+        if len(found) >= limit:
+            break
+    return ", ".join(repr(f) for f in found)
+
+
+def check_length(draft, target):
+    length = visible_length(draft)
+    if length < target * MIN_LENGTH_RATIO:
+        return f"METİN ÇOK KISA: {length} harf, hedef en az {target}. Her başlığı derinleştirerek metni GENİŞLET."
+
+
+def check_fences(draft, target):
+    if "```" in draft:
+        return "Metinde kod bloğu işaretleri (```) kalmış. SADECE HTML body içeriği üret."
+
+
+def check_tags(draft, target):
+    problems = []
+    for tag in _BALANCED_TAGS:
+        opened = len(re.findall(rf"<{tag}\b[^>]*>", draft, re.IGNORECASE))
+        closed = len(re.findall(rf"</{tag}\s*>", draft, re.IGNORECASE))
+        if opened > closed:
+            problems.append(f"<{tag}> ({opened} açık / {closed} kapalı)")
+    if problems:
+        return "Kapatılmamış HTML etiketleri: " + ", ".join(problems) + ". Tüm etiketleri kapat."
+
+
+def check_dashes(draft, target):
+    text = _text(draft)
+    if _DASH.search(text):
+        return f"Metinde tire var ({_sample(re.finditer(r'.{0,12}(?:[–—]|-).{0,12}', text))}). Tarihler hariç HİÇBİR tire kullanma."
+
+
+def check_turkish(draft, target):
+    hits = list(_TURKISH.finditer(_text(draft)))
+    if len(hits) > TURKISH_WORD_LIMIT:
+        return f"Metinde Türkçe kelimeler var ({_sample(iter(hits))}). Okumanın TAMAMI İngilizce olmalı."
+
+
+def check_timestamp(draft, target):
+    match = _TIMESTAMP.search(_text(draft))
+    if match:
+        return f"Sistem zamanı / süre okunmuş ({match.group(0)!r}). Zamanı ASLA söyleme, mistik ve doğal ifade kullan."
+
+
+def check_internal(draft, target):
+    text = _text(draft)
+    if _INTERNAL.search(text):
+        return f"Metinde müşteriye gitmemesi gereken not / meta ifade var ({_sample(_INTERNAL.finditer(text))}). Tertemiz, gönderilmeye hazır metin yaz."
+
+
+# (rule name, check) in report order; every check returns None or the feedback for the writer
+RULES = [
+    ("length", check_length),
+    ("fences", check_fences),
+    ("tags", check_tags),
+    ("dashes", check_dashes),
+    ("turkish", check_turkish),
+    ("timestamp", check_timestamp),
+    ("internal", check_internal),
+]
+
+
+def strip_fences(draft):
+    """Removes a ```html ... ``` wrapper around the whole draft (the common, harmless case)."""
+    return _FENCE.sub("", draft or "")
+
+
+def lint(draft, target_length):
+    """
+    Returns {"passed", "hits", "feedback"}: hits are the rule names that fired,
+    feedback is the REVISE text for the writer (empty when passed).
+    """
+    target = parse_target_length(target_length)
+    hits, notes = [], []
+    for name, check in RULES:
+        try:
+            note = check(draft or "", target)
+        except Exception as e:
+            print(f"LINT RULE ERROR ({name}, non-fatal): {e}")
+            continue
+        if note:
+            hits.append(name)
+            notes.append(f"{len(notes) + 1}. {note}")
+    feedback = ""
+    if notes:
+        feedback = "REVISE (otomatik ön kontrol): Taslak mekanik kontrollerden geçemedi.\n" + "\n".join(notes)
+    return {"passed": not hits, "hits": hits, "feedback": feedback}
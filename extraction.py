@@ -0,0 +1,181 @@
+"""
+Structured Extraction for Nes Shine Oracle
+Every JSON extraction (fused post-reading call, reading / spell memory, PDF
+import) runs in the API's JSON-schema response mode and is validated locally
+against the same schema. A violation gets one targeted repair call that only
+sends the broken JSON and the list of problems, not the source text again.
+After approval the reading is sent ONCE and one JSON comes back with the
+memory session fields, the delivery message and the confirmed client name
+(POST_READING_PROMPT); when that is unusable the caller falls back to the
+separate calls.
+"""
+
+import re
+import json
+import dataclasses
+
+SESSION_FIELDS = ("topic", "target_name", "key_prediction", "hook_left", "client_mood",
+                  "specific_details", "promises_made", "physical_descriptions", "reading_summary")
+NULLABLE_FIELDS = ("target_name", "promises_made", "physical_descriptions")
+SESSION_DEFAULTS = {"topic": "Genel", "target_name": None, "promises_made": None, "physical_descriptions": None}
+
+
+def _string(nullable=False):
+    return {"type": "string", "nullable": True} if nullable else {"type": "string"}
+
+
+SESSION_SCHEMA = {
+    "type": "object",
+    "properties": {field: _string(field in NULLABLE_FIELDS) for field in SESSION_FIELDS},
+    "required": list(SESSION_FIELDS),
+}
+POST_READING_SCHEMA = {
+    "type": "object",
+    "properties": {"client_name": _string(), "delivery_message": _string(), "session": SESSION_SCHEMA},
+    "required": ["client_name", "delivery_message", "session"],
+}
+
+SPELL_SESSION_FIELDS = ("topic", "target_name", "spells_used", "client_tasks_given", "expected_timeline",
+                        "warnings_given", "specific_details", "follow_up_protocol", "ritual_summary")
+SPELL_SESSION_SCHEMA = {
+    "type": "object",
+    "properties": {field: _string(field == "target_name") for field in SPELL_SESSION_FIELDS},
+    "required": list(SPELL_SESSION_FIELDS),
+}
+
+PDF_IMPORT_FIELDS = ("topic", "key_prediction", "hook_left", "client_mood", "client_name", "target_name", "reading_date")
+PDF_IMPORT_SCHEMA = {
+    "type": "object",
+    "properties": {field: _string(field == "target_name") for field in PDF_IMPORT_FIELDS},
+    "required": list(PDF_IMPORT_FIELDS),
+}
+PDF_IMPORT_SCHEMA["properties"]["reading_date"]["pattern"] = r"^(\d{4}-\d{2}-\d{2}|Unknown)$"
+
+REPAIR_PROMPT = """
+The JSON below was extracted by you but does not match the required schema.
+PROBLEMS:
+{errors}
+
+Return ONLY the corrected JSON object: keep every value that is already valid, fix only the problems above,
+do not invent facts (use null where a nullable field has no value).
+
+SCHEMA:
+{schema}
+
+JSON TO FIX:
+{text}
+"""
+
+
+LOCAL_ONLY_KEYS = ("pattern",)
+_JSON_TYPES = {"string": str, "object": dict, "array": list, "boolean": bool, "number": (int, float), "integer": int}
+
+
+def validate(data, schema, path="$"):
+    """Violations of `schema` (the subset used here: type, nullable, required, properties, pattern); [] when valid."""
+    if data is None:
+        return [] if schema.get("nullable") else [f"{path}: null is not allowed"]
+    expected = _JSON_TYPES.get(schema.get("type"))
+    if expected and (not isinstance(data, expected) or (schema.get("type") != "boolean" and isinstance(data, bool))):
+        return [f"{path}: expected {schema['type']}, got {type(data).__name__}"]
+    errors = []
+    if isinstance(data, str) and schema.get("pattern") and not re.match(schema["pattern"], data):
+        errors.append(f"{path}: {data!r} does not match {schema['pattern']}")
+    if isinstance(data, dict):
+        for field in schema.get("required", []):
+            if field not in data:
+                errors.append(f"{path}.{field}: missing")
+        for field, sub in schema.get("properties", {}).items():
+            if field in data:
+                errors.extend(validate(data[field], sub, f"{path}.{field}"))
+    return errors
+
+
+def check(text, schema):
+    """Model answer -> (data, errors). Fenced or prefixed JSON is tolerated; unparsable text is one error."""
+    body = re.sub(r"^\s*```[a-zA-Z]*\s*|\s*```\s*$", "", text or "")
+    try:
+        data = json.loads(body)
+    except ValueError:
+        match = re.search(r"\{.*\}", body, re.DOTALL)
+        try:
+            data = json.loads(match.group(0)) if match else None
+        except ValueError:
+            data = None
+        if data is None:
+            return None, ["$: not a JSON object"]
+    return data, validate(data, schema)
+
+
+def build_repair_prompt(text, errors, schema):
+    return REPAIR_PROMPT.format(errors="\n".join(f"- {e}" for e in errors), schema=json.dumps(schema, ensure_ascii=False),
+                                text=(text or "")[:8000])
+
+
+def run_extraction(generate, prompt, schema):
+    """
+    generate(prompt) -> answer text (a schema-mode call). Validates the answer
+    and, on a violation, makes ONE repair call with the broken JSON and the
+    problems. Returns (data or None, repaired, errors).
+    """
+    text = generate(prompt)
+    data, errors = check(text, schema)
+    if not errors:
+        return data, False, []
+    print(f"EXTRACTION SCHEMA: {len(errors)} ihlal ({'; '.join(errors[:3])}), onarım isteniyor...")
+    data, errors = check(generate(build_repair_prompt(text, errors, schema)), schema)
+    if errors:
+        print(f"EXTRACTION FAILED after repair: {'; '.join(errors[:3])}")
+        return None, True, errors
+    return data, True, []
+
+
+def _api_schema(schema):
+    """The schema without the keys only validated locally (the API's Schema has no `pattern`)."""
+    if not isinstance(schema, dict):
+        return schema
+    return {k: ({f: _api_schema(v) for f, v in value.items()} if k == "properties" else _api_schema(value))
+            for k, value in schema.items() if k not in LOCAL_ONLY_KEYS}
+
+
+def json_config(base_config, schema):
+    """Copy of a GenerationConfig that makes the API answer with JSON matching `schema`."""
+    return dataclasses.replace(base_config, response_mime_type="application/json", response_schema=_api_schema(schema))
+
+
+def build_session(data, timestamp):
+    """Memory session record from extracted fields (missing ones get the old defaults)."""
+    session = {"timestamp": timestamp}
+    for field in SESSION_FIELDS:
+        session[field] = data.get(field, SESSION_DEFAULTS.get(field, ""))
+    return session
+
+
+def build_spell_session(data, timestamp):
+    """Spell memory session record (ritual_summary is stored as reading_summary, like readings)."""
+    session = {"timestamp": timestamp, "session_type": "spell", "topic": data.get("topic") or "Spell Work"}
+    for field in SPELL_SESSION_FIELDS[1:-1]:
+        session[field] = data.get(field, None if field == "target_name" else "")
+    session["reading_summary"] = data.get("ritual_summary", "")
+    return session
+
+
+def _is_unknown(name):
+    return not name or "unknown" in name.lower()
+
+
+def post_reading_result(data, known_name=None):
+    """
+    Validated fused answer -> {"client_name", "delivery_message", "session"},
+    or None when it is not usable (no answer, empty delivery message).
+    The known name wins unless it is unknown and the reading names the client.
+    """
+    if not data:
+        return None
+    message = re.sub(r"<[^>]+>", "", str(data.get("delivery_message") or "")).strip()
+    if not message:
+        return None
+    name = str(data.get("client_name") or "").strip()
+    if not _is_unknown(known_name) or _is_unknown(name):
+        name = known_name
+    return {"client_name": name, "delivery_message": message, "session": data["session"]}
@@ -0,0 +1,426 @@
+"""
+Fake Gemini / ElevenLabs Backend for Nes Shine Oracle
+In-process stand-ins for generate_content (plain and streaming), count_tokens,
+cached contents and ElevenLabs text-to-speech, with lognormal latencies and
+injected 429 / daily quota / 503 / DeadlineExceeded / blocked-prompt / broken
+stream faults. Installed through the client factories of gemini_client and
+audio_service, so OracleBrain, SpellBrain and AudioService run unchanged and
+no quota is spent. Used by bench.py and the offline tests.
+"""
+
+import re
+import json
+import math
+import time
+import random
+import codecs
+import threading
+import contextlib
+from types import SimpleNamespace
+
+from google.api_core import exceptions
+
+ROT13_MARKER = "ENCODED PROMPT:\n"
+DEFAULT_DOC_CHARS = 4000
+MAX_DOC_CHARS = 20000
+FAULT_KINDS = ("rate_limit", "daily_quota", "unavailable", "deadline", "blocked")
+
+
+class Latency:
+    """Lognormal call latency: `median` seconds, spread `sigma`, plus `per_1k_chars` of output."""
+
+    def __init__(self, median=1.0, sigma=0.4, per_1k_chars=0.0):
+        self.median = median
+        self.sigma = sigma
+        self.per_1k_chars = per_1k_chars
+
+    def sample(self, rng, out_chars=0):
+        base = self.median * math.exp(rng.gauss(0.0, self.sigma)) if self.median > 0 else 0.0
+        return base + self.per_1k_chars * out_chars / 1000
+
+
+class FaultProfile:
+    """
+    Per-call fault probabilities. `stream_break` is drawn separately for
+    streams that started fine: the stream dies part way through.
+    retry_after: seconds put into the 429 message ("Please retry in Ns").
+    """
+
+    def __init__(self, rate_limit=0.0, daily_quota=0.0, unavailable=0.0, deadline=0.0, blocked=0.0,
+                 stream_break=0.0, retry_after=5.0):
+        self.rates = {"rate_limit": rate_limit, "daily_quota": daily_quota, "unavailable": unavailable,
+                      "deadline": deadline, "blocked": blocked}
+        self.stream_break = stream_break
+        self.retry_after = retry_after
+
+    @classmethod
+    def parse(cls, spec):
+        """'rate_limit=0.05,unavailable=0.02,stream_break=0.1' -> FaultProfile."""
+        kwargs = {}
+        for part in filter(None, (p.strip() for p in (spec or "").split(","))):
+            name, _, value = part.partition("=")
+            kwargs[name.strip()] = float(value)
+        return cls(**kwargs)
+
+    def draw(self, rng):
+        roll = rng.random()
+        for kind in FAULT_KINDS:
+            roll -= self.rates[kind]
+            if roll < 0:
+                return kind
+        return None
+
+
+def _target_chars(prompt):
+    match = re.search(r"Minimum\s+(\d[\d,.]{2,7})\s+(?:karakter|characters)", prompt, re.IGNORECASE)
+    if not match:
+        return DEFAULT_DOC_CHARS
+    return min(int(re.sub(r"[,.]", "", match.group(1))), MAX_DOC_CHARS)
+
+
+def fake_document(chars):
+    """Deterministic HTML reading of roughly `chars` characters (same length -> same text)."""
+    parts = ["<h1>Nes Shine Reading</h1>\n"]
+    size, n = len(parts[0]), 0
+    while size < chars:
+        n += 1
+        para = (f"<p>Paragraph {n}: the energies around this question move slowly but with purpose, "
+                f"and the cards keep returning to the same quiet truth about patience and timing.</p>\n")
+        if n % 4 == 1:
+            para = f"<h2>Chapter {n // 4 + 1}</h2>\n" + para
+        parts.append(para)
+        size += len(para)
+    parts.append("</div>")
+    return "".join(parts)
+
+
+def default_responder(prompt, model_name):
+    """Scripted replies, recognised by the prompt templates in prompts.py / spell_prompts.py."""
+    if "<<<YARIM_METİN>>>" in prompt:
+        # Stream continuation: the rest of the same deterministic document
+        original, _, rest = prompt.partition("--- YARIM KALAN METİN")
+        partial = rest.split("<<<YARIM_METİN>>>\n", 1)[-1].rsplit("\n<<<DEVAMI_BURADAN>>>", 1)[0]
+        full = fake_document(_target_chars(original))
+        return full[len(partial):] if full.startswith(partial) else "<p>The vision continues.</p>\n</div>"
+    if "<<<GENİŞLETİLECEK_BÖLÜM>>>" in prompt:
+        # Section expansion: the same section with paragraphs appended up to the requested size
+        section = prompt.split("<<<GENİŞLETİLECEK_BÖLÜM>>>\n", 1)[1].rsplit("\n<<<BÖLÜM_SONU>>>", 1)[0]
+        match = re.search(r"en az (\d+) harf", prompt)
+        goal = int(match.group(1)) if match else len(section) * 2
+        while len(section) < goal:
+            section += "\n<p>The vision deepens: a second layer of the same truth opens, slower and brighter than the first.</p>"
+        return section + "\n"
+    for start, end in (("<<<DÜZELTİLECEK_BÖLÜM>>>", "<<<BÖLÜM_SONU>>>"), ("<<<SECTION_TO_REWRITE>>>", "<<<SECTION_END>>>")):
+        if start in prompt:
+            # Section revision: the same section, reworded
+            section = prompt.split(start + "\n", 1)[1].rsplit("\n" + end, 1)[0]
+            return section.replace("quiet truth", "revised truth") + "\n"
+    if '"delivery_message"' in prompt:
+        # Fused post-reading extraction: memory session + delivery message + client name
+        match = re.search(r"Bilinen ad: (.*?)\.\n", prompt)
+        name = match.group(1) if match else "Unknown"
+        return json.dumps({"client_name": name,
+                           "delivery_message": f"Dear {name}, your reading is ready. Receive it slowly. Nes",
+                           "session": {"topic": "Love", "target_name": "Eamon", "key_prediction": "He returns in spring",
+                                       "hook_left": "A letter", "client_mood": "hopeful", "specific_details": "Blue light",
+                                       "promises_made": None, "physical_descriptions": None,
+                                       "reading_summary": "Offline bench reading"}})
+    if "İNCELENECEK TASLAK" in prompt or "GRANDMASTER QUALITY CONTROLLER" in prompt or "Kalite Kontrol uzmanı" in prompt:
+        return "APPROVED"
+    if "Müşterinin ADINI" in prompt:
+        return "Unknown"
+    if "memory system for SPELL" in prompt:
+        return json.dumps({"topic": "Return", "target_name": "Eamon", "spells_used": "Melammu", "client_tasks_given": "Light a candle",
+                           "expected_timeline": "7 days", "warnings_given": "None", "specific_details": "Blue light",
+                           "follow_up_protocol": "Return in 30 days", "ritual_summary": "Offline bench ritual"})
+    if "hafızasısın" in prompt:
+        return ('{"topic": "Love", "target_name": "Eamon", "key_prediction": "He returns in spring", '
+                '"hook_left": "A letter", "client_mood": "hopeful", "specific_details": "Blue light", '
+                '"promises_made": null, "physical_descriptions": null, "reading_summary": "Offline bench reading"}')
+    if "teslim mesajı" in prompt or "delivery message" in prompt.lower():
+        return "Your reading is ready. Take a quiet moment to receive it. — Nes"
+    return fake_document(_target_chars(prompt))
+
+
+class FakeResponse:
+    """Mimics GenerateContentResponse for the fields the brains read."""
+
+    def __init__(self, text, prompt_tokens, cached_tokens=0, blocked=False):
+        self.text = text
+        self.candidates = [] if blocked else [SimpleNamespace(text=text)]
+        self.prompt_feedback = "block_reason: PROHIBITED_CONTENT" if blocked else None
+        self.usage_metadata = SimpleNamespace(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=0 if blocked else max(1, len(text) // 4),
+            total_token_count=prompt_tokens + (0 if blocked else max(1, len(text) // 4)),
+            cached_content_token_count=cached_tokens,
+        )
+
+
+class FakeStream:
+    """Iterable of chunks; usage_metadata is filled in once the stream completes."""
+
+    def __init__(self, backend, api_key, text, prompt_tokens, cached_tokens, break_at):
+        self._backend = backend
+        self._api_key = api_key
+        self._text = text
+        self._prompt_tokens = prompt_tokens
+        self._cached_tokens = cached_tokens
+        self._break_at = break_at
+        self.usage_metadata = None
+        self.candidates = [SimpleNamespace(text=text)]
+        self.prompt_feedback = None
+
+    def __iter__(self):
+        backend = self._backend
+        backend._sleep(backend.latency.sample(backend._rng_draw(), 0))  # time to first token
+        size = backend.chunk_chars
+        for start in range(0, len(self._text), size):
+            chunk = self._text[start:start + size]
+            if self._break_at is not None and start >= self._break_at:
+                backend._record_fault("stream_break", self._api_key, self._prompt_tokens + start // 4)
+                raise exceptions.ServiceUnavailable("503 Stream removed (fake backend)")
+            backend._sleep(backend.latency.per_1k_chars * len(chunk) / 1000)
+            yield SimpleNamespace(text=chunk)
+        out_tokens = max(1, len(self._text) // 4)
+        self.usage_metadata = SimpleNamespace(
+            prompt_token_count=self._prompt_tokens, candidates_token_count=out_tokens,
+            total_token_count=self._prompt_tokens + out_tokens, cached_content_token_count=self._cached_tokens)
+        backend._record_success(self._api_key, self._prompt_tokens, out_tokens)
+
+
+class FakeModel:
+    def __init__(self, backend, api_key, model_name, generation_config=None, cached_content=None):
+        self._backend = backend
+        self._api_key = api_key
+        self.model_name = model_name if model_name.startswith("models/") else f"models/{model_name}"
+        self._generation_config = generation_config
+        self._cached_content = cached_content
+
+    def count_tokens(self, contents):
+        return SimpleNamespace(total_tokens=max(1, len(str(contents)) // 4))
+
+    def generate_content(self, contents, stream=False, request_options=None, **kwargs):
+        return self._backend.generate(self, str(contents), stream)
+
+
+class _FakeCacheService:
+    def __init__(self, backend):
+        self._backend = backend
+
+    def create_cached_content(self, request=None):
+        tokens = max(1, len(str(request)) // 4)
+        with self._backend._lock:
+            self._backend._cache_seq += 1
+            name = f"cachedContents/fake-{self._backend._cache_seq}"
+            self._backend._cached[name] = tokens
+        return SimpleNamespace(name=name, usage_metadata=SimpleNamespace(total_token_count=tokens))
+
+    def delete_cached_content(self, name=None):
+        with self._backend._lock:
+            self._backend._cached.pop(name, None)
+
+
+class FakeGeminiClient:
+    """Drop-in for gemini_client.GeminiClient (same public surface)."""
+
+    def __init__(self, backend, api_key):
+        self._backend = backend
+        self.api_key = api_key
+
+    @property
+    def key_hint(self):
+        return f"{self.api_key[:6]}...{self.api_key[-4:]}" if self.api_key and len(self.api_key) >= 12 else "INVALID"
+
+    def get_service_client(self, name="generative"):
+        return _FakeCacheService(self._backend) if name == "cache" else self._backend
+
+    def build_model(self, model_name, generation_config=None, safety_settings=None, cached_content=None):
+        return FakeModel(self._backend, self.api_key, model_name, generation_config, cached_content)
+
+
+class FakeGemini:
+    """
+    One simulated Gemini endpoint shared by every key. time_scale shrinks every
+    simulated wait (0.01 = 100x faster than real time); stats are in simulated seconds.
+    missing_models answer 404, like a retired or not-enabled model.
+    """
+
+    def __init__(self, latency=None, faults=None, time_scale=1.0, seed=0, responder=None, chunk_chars=400, clock=time.time,
+                 missing_models=()):
+        self.latency = latency or Latency(median=2.0, sigma=0.5, per_1k_chars=0.5)
+        self.faults = faults or FaultProfile()
+        self.time_scale = time_scale
+        self.responder = responder or default_responder
+        self.chunk_chars = chunk_chars
+        self.clock = clock
+        self.missing_models = {m.replace("models/", "") for m in missing_models}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._cache_seq = 0
+        self._cached = {}
+        self._outage_started = None
+        self.stats = {"calls": 0, "successes": 0, "faults": {}, "tokens_in": 0, "tokens_out": 0,
+                      "wasted_tokens": 0, "recoveries": [], "calls_per_key": {}, "calls_per_model": {}}
+
+    def client(self, api_key):
+        return FakeGeminiClient(self, api_key)
+
+    # ==================== INTERNALS ====================
+    def _rng_draw(self):
+        with self._lock:
+            return random.Random(self._rng.random())
+
+    def _sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds * self.time_scale)
+
+    def _record_fault(self, kind, api_key, wasted_tokens=0):
+        with self._lock:
+            self.stats["faults"][kind] = self.stats["faults"].get(kind, 0) + 1
+            self.stats["wasted_tokens"] += wasted_tokens
+            if self._outage_started is None:
+                self._outage_started = self.clock()
+
+    def _record_success(self, api_key, tokens_in, tokens_out):
+        with self._lock:
+            self.stats["successes"] += 1
+            self.stats["tokens_in"] += tokens_in
+            self.stats["tokens_out"] += tokens_out
+            if self._outage_started is not None:
+                # first success after a fault: how long the system took to recover
+                elapsed = self.clock() - self._outage_started
+                self.stats["recoveries"].append(elapsed / self.time_scale if self.time_scale else elapsed)
+                self._outage_started = None
+
+    def _reply(self, prompt, model_name):
+        if ROT13_MARKER in prompt:
+            decoded = codecs.decode(prompt.split(ROT13_MARKER, 1)[1], "rot_13")
+            return codecs.encode(self.responder(decoded, model_name), "rot_13"), True
+        return self.responder(prompt, model_name), False
+
+    def generate(self, model, prompt, stream):
+        rng = self._rng_draw()
+        with self._lock:
+            self.stats["calls"] += 1
+            per_key = self.stats["calls_per_key"]
+            per_key[model._api_key] = per_key.get(model._api_key, 0) + 1
+            name = model.model_name.replace("models/", "")
+            self.stats["calls_per_model"][name] = self.stats["calls_per_model"].get(name, 0) + 1
+        if name in self.missing_models:
+            raise exceptions.NotFound(f"404 models/{name} is not found for API version v1beta.")
+        cached_tokens = self._cached.get(model._cached_content, 0) if model._cached_content else 0
+        prompt_tokens = max(1, len(prompt) // 4) + cached_tokens
+        text, rot13 = self._reply(prompt, model.model_name)
+        kind = self.faults.draw(rng)
+        if kind == "blocked" and rot13:
+            kind = None  # the ROT13 bypass gets through, as in production
+
+        if kind in ("rate_limit", "daily_quota"):
+            self._sleep(0.05)
+            self._record_fault(kind, model._api_key)
+            quota = "GenerateRequestsPerDayPerProjectPerModel" if kind == "daily_quota" else "GenerateRequestsPerMinutePerProjectPerModel"
+            raise exceptions.ResourceExhausted(
+                f"429 You exceeded your current quota ({quota}). Please retry in {self.faults.retry_after * self.time_scale:.3f}s.")
+        if kind == "unavailable":
+            self._sleep(0.2)
+            self._record_fault(kind, model._api_key)
+            raise exceptions.ServiceUnavailable("503 The model is overloaded. Please try again later.")
+        if kind == "deadline":
+            self._sleep(self.latency.sample(rng, len(text)) * 2)
+            self._record_fault(kind, model._api_key)
+            raise exceptions.DeadlineExceeded("504 Deadline Exceeded")
+        if kind == "blocked":
+            self._record_fault(kind, model._api_key, prompt_tokens)
+            if stream:
+                from google.generativeai.types import BlockedPromptException
+                raise BlockedPromptException("block_reason: PROHIBITED_CONTENT")
+            return FakeResponse("", prompt_tokens, blocked=True)
+
+        if stream:
+            break_at = None
+            if rng.random() < self.faults.stream_break and len(text) > self.chunk_chars:
+                break_at = rng.randrange(self.chunk_chars, len(text))
+            return FakeStream(self, model._api_key, text, prompt_tokens, cached_tokens, break_at)
+
+        self._sleep(self.latency.sample(rng, len(text)))
+        response = FakeResponse(text, prompt_tokens, cached_tokens)
+        self._record_success(model._api_key, prompt_tokens, response.usage_metadata.candidates_token_count)
+        return response
+
+
+# ==================== ELEVENLABS ====================
+class _FakeRawAudio:
+    def __init__(self, text):
+        self.headers = {"x-character-count": str(len(text))}
+        self._audio = b"ID3" + text.encode("utf-8")[:64]
+
+    def parse(self):
+        return self._audio
+
+
+class FakeElevenLabs:
+    """
+    Stand-in for elevenlabs.client.ElevenLabs: text_to_speech.with_raw_response.convert().
+    Faults: rate_limit (429 too_many_concurrent_requests) and unavailable (503).
+    """
+
+    def __init__(self, latency=None, faults=None, time_scale=1.0, seed=0):
+        self.latency = latency or Latency(median=3.0, sigma=0.3, per_1k_chars=1.5)
+        self.faults = faults or FaultProfile()
+        self.time_scale = time_scale
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "characters": 0, "faults": {}}
+
+    def client(self, api_key=None):
+        backend = self
+        return SimpleNamespace(text_to_speech=SimpleNamespace(
+            with_raw_response=SimpleNamespace(convert=lambda text, voice_id, model_id: backend.convert(text))))
+
+    def convert(self, text):
+        with self._lock:
+            roll = self._rng.random()
+            latency = self.latency.sample(random.Random(self._rng.random()), len(text))
+            self.stats["requests"] += 1
+        kind = None
+        if roll < self.faults.rates["rate_limit"]:
+            kind = "rate_limit"
+        elif roll < self.faults.rates["rate_limit"] + self.faults.rates["unavailable"]:
+            kind = "unavailable"
+        if kind:
+            with self._lock:
+                self.stats["faults"][kind] = self.stats["faults"].get(kind, 0) + 1
+            if kind == "rate_limit":
+                raise Exception("status_code: 429, body: {'detail': {'status': 'too_many_concurrent_requests'}}")
+            raise Exception("status_code: 503, body: service unavailable")
+        time.sleep(latency * self.time_scale)
+        with self._lock:
+            self.stats["characters"] += len(text)
+        return _FakeRawAudio(text)
+
+
+@contextlib.contextmanager
+def installed(gemini=None, tts=None):
+    """Routes every new Gemini client / AudioService through the fakes for the duration of the block."""
+    import os
+    import gemini_client
+    import audio_service
+    previous_gemini = gemini_client.set_client_factory(gemini.client) if gemini else None
+    previous_tts = audio_service.set_client_factory(tts.client) if tts else None
+    saved_env = {k: os.environ.get(k) for k in ("ELEVENLABS_API_KEY", "ELEVENLABS_VOICE_ID")}
+    if tts:
+        os.environ["ELEVENLABS_API_KEY"] = saved_env["ELEVENLABS_API_KEY"] or "fake-elevenlabs-key"
+        os.environ["ELEVENLABS_VOICE_ID"] = saved_env["ELEVENLABS_VOICE_ID"] or "fake-voice"
+    try:
+        yield
+    finally:
+        if gemini:
+            gemini_client.set_client_factory(previous_gemini)
+        if tts:
+            audio_service.set_client_factory(previous_tts)
+        for k, v in saved_env.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
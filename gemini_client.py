@@ -0,0 +1,140 @@
+"""
+Gemini Client Layer for Nes Shine Oracle
+Gives every API key its own isolated transport and model handles, so several
+brains (single reading, batch queue, spell engine) can run in the same process
+without overwriting each other through the process-global genai.configure().
+Clients and model handles live in a process-wide pool: a new brain or a key
+rotation reuses the already-built handle and its open transport.
+"""
+
+import dataclasses
+import threading
+import google.generativeai as genai
+from google.generativeai.client import _ClientManager
+
+
+class GeminiClient:
+    """Isolated Gemini client bound to a single API key."""
+
+    def __init__(self, api_key):
+        self.api_key = api_key
+        self._manager = _ClientManager()
+        self._manager.configure(api_key=api_key)
+        self._lock = threading.Lock()
+
+    @property
+    def key_hint(self):
+        """Masked key for logs (never print the full key)."""
+        if not self.api_key or len(self.api_key) < 12:
+            return "INVALID"
+        return f"{self.api_key[:6]}...{self.api_key[-4:]}"
+
+    def get_service_client(self, name="generative"):
+        """Returns (and lazily creates) the low-level service client for this key only."""
+        with self._lock:
+            return self._manager.get_default_client(name)
+
+    def build_model(self, model_name, generation_config=None, safety_settings=None, cached_content=None):
+        """
+        Builds a GenerativeModel whose requests always go through THIS key's
+        transport. genai.GenerativeModel would otherwise lazily bind to the
+        global default client on its first call.
+        cached_content: name of a cached prefix created with this same key.
+        """
+        model = genai.GenerativeModel(
+            model_name,
+            generation_config=generation_config,
+            safety_settings=safety_settings
+        )
+        model._client = self.get_service_client("generative")
+        if cached_content:
+            # from_cached_content() would look the handle up via the global client
+            model._cached_content = cached_content
+        return model
+
+
+# ==================== PROCESS-WIDE HANDLE POOL ====================
+_POOL_LOCK = threading.Lock()
+_CLIENTS = {}   # api_key -> GeminiClient
+_MODELS = {}    # (api_key, model_name, config signature, safety signature) -> GenerativeModel
+_POOL_STATS = {"hits": 0, "builds": 0}
+_CLIENT_FACTORY = GeminiClient  # swapped by fake_backend for offline runs
+
+
+def set_client_factory(factory=None):
+    """
+    Replaces the per-key client class (e.g. fake_backend.FakeGemini.client) and
+    empties the pool. None restores the real GeminiClient. Returns the previous factory.
+    """
+    global _CLIENT_FACTORY
+    with _POOL_LOCK:
+        previous = _CLIENT_FACTORY
+        _CLIENT_FACTORY = factory or GeminiClient
+        _CLIENTS.clear()
+        _MODELS.clear()
+    return previous
+
+
+def _signature(value):
+    """Hashable, value-based signature of a generation config / safety settings."""
+    if value is None:
+        return None
+    if dataclasses.is_dataclass(value):
+        value = dataclasses.asdict(value)
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _signature(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_signature(v) for v in value)
+    return str(value)
+
+
+def get_client(api_key):
+    """Shared GeminiClient for a key; its transport stays open for the life of the process."""
+    with _POOL_LOCK:
+        client = _CLIENTS.get(api_key)
+        if client is None:
+            client = _CLIENT_FACTORY(api_key)
+            _CLIENTS[api_key] = client
+        return client
+
+
+def get_model(client, model_name, generation_config=None, safety_settings=None):
+    """
+    Pooled model handle per (key, model, config, safety settings), built by
+    `client`. Handles are never mutated after creation (cached-content models
+    are built separately), so brains and threads can share them.
+    """
+    pool_key = (client.api_key, model_name, _signature(generation_config), _signature(safety_settings))
+    with _POOL_LOCK:
+        model = _MODELS.get(pool_key)
+        if model is not None:
+            _POOL_STATS["hits"] += 1
+            return model
+    model = client.build_model(model_name, generation_config=generation_config, safety_settings=safety_settings)
+    with _POOL_LOCK:
+        # Another thread may have built the same handle meanwhile; keep the first one
+        model = _MODELS.setdefault(pool_key, model)
+        _POOL_STATS["builds"] += 1
+    return model
+
+
+def warm_pool(api_keys, specs):
+    """
+    Pre-builds clients (with their service transports) and model handles.
+    specs: [(model_name, generation_config, safety_settings), ...]
+    Returns the number of handles in the pool. Failures are non-fatal: the
+    handle is simply built on first use instead.
+    """
+    for api_key in api_keys:
+        for model_name, generation_config, safety_settings in specs:
+            try:
+                get_model(get_client(api_key), model_name, generation_config, safety_settings)
+            except Exception as e:
+                print(f"MODEL POOL WARM-UP ERROR (non-fatal): {e}")
+    with _POOL_LOCK:
+        return len(_MODELS)
+
+
+def pool_stats():
+    with _POOL_LOCK:
+        return {"clients": len(_CLIENTS), "models": len(_MODELS), **_POOL_STATS}
@@ -0,0 +1,138 @@
+"""
+Hedged Requests for Nes Shine Oracle
+Tail-latency control for non-streaming Gemini calls. If a call has not
+returned within the observed p90 latency for its prompt size, a duplicate is
+fired on a different healthy key and the first successful answer wins. The
+loser cannot be interrupted mid-HTTP-call; it is abandoned and, when it
+finishes, handed to a callback so its tokens and key health are still
+accounted.
+"""
+
+import math
+import threading
+from collections import deque
+from concurrent.futures import Future, wait, FIRST_COMPLETED, TimeoutError as FuturesTimeout
+
+WINDOW = 50                 # latency samples kept per (model, size bucket)
+MIN_SAMPLES = 5             # below this the default delay is used
+DEFAULT_HEDGE_DELAY = 90.0  # seconds, until we have observations
+MIN_HEDGE_DELAY = 5.0
+MAX_HEDGE_DELAY = 240.0     # always below the 300 s request timeout
+
+
+
+class LatencyTracker:
+    """Process-wide rolling latency samples per model and prompt-size bucket."""
+
+    def __init__(self, window=WINDOW, min_samples=MIN_SAMPLES, default_delay=DEFAULT_HEDGE_DELAY, min_delay=MIN_HEDGE_DELAY):
+        self.window = window
+        self.min_samples = min_samples
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self._lock = threading.Lock()
+        self._samples = {}
+        self.stats = {"eligible": 0, "hedged": 0, "hedge_wins": 0}
+
+    @staticmethod
+    def bucket(est_tokens):
+        """Power-of-two prompt-size bucket (1K-2K, 2K-4K, ...)."""
+        return int(math.log2(max(est_tokens, 1)))
+
+    def _key(self, model_name, est_tokens):
+        return ((model_name or "").replace("models/", ""), self.bucket(est_tokens))
+
+    def record(self, model_name, est_tokens, latency):
+        with self._lock:
+            samples = self._samples.setdefault(self._key(model_name, est_tokens), deque(maxlen=self.window))
+            samples.append(latency)
+
+    def percentile(self, model_name, est_tokens, pct=0.9):
+        with self._lock:
+            samples = sorted(self._samples.get(self._key(model_name, est_tokens), ()))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(math.ceil(pct * len(samples))) - 1)]
+
+    def hedge_delay(self, model_name, est_tokens):
+        p90 = self.percentile(model_name, est_tokens)
+        delay = self.default_delay if p90 is None else p90
+        return min(max(delay, self.min_delay), MAX_HEDGE_DELAY)
+
+    def count(self, hedged=False, hedge_won=False):
+        with self._lock:
+            self.stats["eligible"] += 1
+            self.stats["hedged"] += int(hedged)
+            self.stats["hedge_wins"] += int(hedge_won)
+
+    def rates(self):
+        """hedge_rate = hedged / eligible calls, win_rate = hedge wins / hedged calls."""
+        with self._lock:
+            s = dict(self.stats)
+        return {
+            "hedge_rate": s["hedged"] / s["eligible"] if s["eligible"] else 0.0,
+            "win_rate": s["hedge_wins"] / s["hedged"] if s["hedged"] else 0.0,
+            **s,
+        }
+
+
+_TRACKER = LatencyTracker()
+
+
+def get_latency_tracker():
+    return _TRACKER
+
+
+def _spawn(fn, name):
+    """
+    Runs fn on its own daemon thread right away and returns its Future. A shared
+    pool would cap concurrent calls and let queue time eat into the hedge delay.
+    """
+    future = Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name=name, daemon=True).start()
+    return future
+
+
+def run_hedged(primary_fn, hedge_factory, delay, on_abandoned):
+    """
+    primary_fn(): the original call.
+    hedge_factory(): returns a duplicate call (on another key) or None if no key is free.
+    on_abandoned(which, future): invoked once the losing/failed call is done
+                                 ("primary" or "hedge"), for usage & key accounting.
+    Returns (result, winner, hedged). Raises the primary's error when nothing succeeds
+    (the hedge's own failure goes to on_abandoned).
+    """
+    primary = _spawn(primary_fn, "hedge-primary")
+    try:
+        return primary.result(timeout=delay), "primary", False
+    except FuturesTimeout:
+        pass
+
+    hedge_fn = hedge_factory()
+    if hedge_fn is None:
+        return primary.result(), "primary", False
+
+    hedge = _spawn(hedge_fn, "hedge-duplicate")
+    names = {primary: "primary", hedge: "hedge"}
+    pending = {primary, hedge}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        winner = next((f for f in done if f.exception() is None), None)
+        if winner is None:
+            continue
+        for other in names:
+            if other is not winner:
+                other.add_done_callback(lambda fut, which=names[other]: on_abandoned(which, fut))
+        return winner.result(), names[winner], True
+
+    # Both failed: the hedge is settled here, the caller handles the primary's error
+    on_abandoned("hedge", hedge)
+    raise primary.exception()
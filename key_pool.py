@@ -0,0 +1,372 @@
+"""
+Shared API Key Pool for Nes Shine Oracle
+Process-wide scheduler for Gemini API keys. Tracks per-key RPM/TPM/RPD
+consumption with token buckets, scores latency and error rates, and
+quarantines exhausted keys until their quota resets. Quarantine and daily
+counters are persisted to their own state file (.cache/key_pool_state.json,
+KEY_POOL_STATE_PATH overrides; never client_memories) so a key that hit its
+daily quota is not retried by every new OracleBrain/SpellBrain.
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+
+# Conservative defaults; override with the "key_pool_limits" app setting
+DEFAULT_LIMITS = {
+    "rpm": 60,          # requests per minute per key
+    "tpm": 2_000_000,   # tokens per minute per key
+    "rpd": 1000,        # requests per day per key
+}
+
+RATE_LIMIT_COOLDOWN = 60      # seconds a key rests after a per-minute 429 (no Retry-After)
+TRANSIENT_COOLDOWN = 10       # seconds a key rests after 500/503/timeout
+EWMA_ALPHA = 0.3
+DEFAULT_STATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "key_pool_state.json")
+PERSIST_INTERVAL = 60         # seconds between throttled counter flushes
+RELOAD_INTERVAL = 120         # seconds between re-reading other processes' quarantines
+
+
+def key_fingerprint(api_key):
+    """Stable, non-reversible id for a key (raw keys are never persisted)."""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+def next_quota_reset(now=None):
+    """Gemini daily quotas reset at midnight Pacific time. Returns epoch seconds."""
+    import pytz
+    from datetime import datetime, timedelta
+    pt = pytz.timezone("America/Los_Angeles")
+    now_pt = datetime.fromtimestamp(now if now is not None else time.time(), pt)
+    midnight = pt.localize(datetime(now_pt.year, now_pt.month, now_pt.day) + timedelta(days=1))
+    return midnight.timestamp()
+
+
+def classify_quota_error(error):
+    """
+    Classifies a 429 / ResourceExhausted error.
+    Returns ("daily_quota" | "rate_limit", retry_after_seconds or None).
+    """
+    text = str(error)
+    upper = text.upper()
+    retry_after = None
+    match = re.search(r"retry in ([0-9.]+)\s*s", text, re.IGNORECASE) or \
+        re.search(r"retry_delay\s*\{\s*seconds:\s*([0-9]+)", text)
+    if match:
+        try:
+            retry_after = float(match.group(1))
+        except ValueError:
+            retry_after = None
+    if "PERDAY" in upper or "PER_DAY" in upper or "PER DAY" in upper or "DAILY" in upper:
+        return "daily_quota", retry_after
+    return "rate_limit", retry_after
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at capacity / period."""
+
+    def __init__(self, capacity, period=60.0, now=None):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / period
+        self.tokens = self.capacity
+        self.updated = now if now is not None else time.time()
+
+    def _refill(self, now):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until `amount` tokens are available (0 if available now)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount, now):
+        self._refill(now)
+        self.tokens -= min(amount, self.capacity)
+
+    def fill_ratio(self, now):
+        self._refill(now)
+        return max(0.0, self.tokens) / self.capacity
+
+
+class KeyState:
+    """Live health and consumption record of one API key."""
+
+    def __init__(self, fingerprint, limits, now):
+        self.fingerprint = fingerprint
+        self.rpm = TokenBucket(limits["rpm"], now=now)
+        self.tpm = TokenBucket(limits["tpm"], now=now)
+        self.rpd_limit = limits["rpd"]
+        self.day_count = 0
+        self.day_reset_at = next_quota_reset(now)
+        self.latency_ewma = None
+        self.error_ewma = 0.0
+        self.in_flight = 0
+        self.quarantined_until = 0.0
+        self.quarantine_reason = None
+
+    def roll_day(self, now):
+        if now >= self.day_reset_at:
+            self.day_count = 0
+            self.day_reset_at = next_quota_reset(now)
+
+    def is_quarantined(self, now):
+        return now < self.quarantined_until
+
+    def score(self, now):
+        """Lower is better: load + error rate + latency penalty."""
+        load = 1.0 - min(self.rpm.fill_ratio(now), self.tpm.fill_ratio(now))
+        latency_penalty = min((self.latency_ewma or 0.0) / 120.0, 1.0)
+        return load + 2.0 * self.error_ewma + 0.5 * latency_penalty + 0.25 * self.in_flight
+
+    def to_record(self):
+        return {
+            "fingerprint": self.fingerprint,
+            "day_count": self.day_count,
+            "day_reset_at": self.day_reset_at,
+            "quarantined_until": self.quarantined_until,
+            "quarantine_reason": self.quarantine_reason,
+            "error_ewma": round(self.error_ewma, 4),
+            "latency_ewma": self.latency_ewma,
+        }
+
+    def merge_record(self, record, now):
+        """Adopt persisted state written by this or another process."""
+        if record.get("day_reset_at", 0) > now:
+            self.day_reset_at = record["day_reset_at"]
+            self.day_count = max(self.day_count, int(record.get("day_count", 0)))
+        if record.get("quarantined_until", 0) > max(now, self.quarantined_until):
+            self.quarantined_until = record["quarantined_until"]
+            self.quarantine_reason = record.get("quarantine_reason")
+        if self.latency_ewma is None and record.get("latency_ewma"):
+            self.latency_ewma = record["latency_ewma"]
+
+
+class FileStateStore:
+    """Persists pool state (key fingerprints only) to a local JSON file, written atomically."""
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get("KEY_POOL_STATE_PATH", DEFAULT_STATE_PATH)
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f).get("keys", [])
+
+    def save(self, records):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"keys": records}, f)
+        os.replace(tmp, self.path)
+
+
+# ==================== PROCESS-WIDE SHARED STATE ====================
+_LOCK = threading.RLock()
+_STATES = {}            # fingerprint -> KeyState
+_SYNC = {"loaded_at": 0.0, "saved_at": 0.0, "dirty": False}
+
+
+class KeyPool:
+    """
+    View over the process-wide key states for one list of API keys.
+    Indices returned by acquire() are indices into the list given here,
+    so brains can keep using self.api_keys[self.current_key_index].
+    """
+
+    def __init__(self, api_keys, limits=None, store=None, clock=time.time):
+        self.api_keys = list(api_keys)
+        self.limits = dict(DEFAULT_LIMITS, **(limits or {}))
+        self.store = store if store is not None else FileStateStore()
+        self.clock = clock
+        now = self.clock()
+        self._fingerprints = {}
+        with _LOCK:
+            for idx, key in enumerate(self.api_keys):
+                if not key or not key.strip():
+                    continue
+                fp = key_fingerprint(key.strip())
+                self._fingerprints[idx] = fp
+                if fp not in _STATES:
+                    _STATES[fp] = KeyState(fp, self.limits, now)
+        self._sync(force_load=_SYNC["loaded_at"] == 0.0)
+
+    @property
+    def size(self):
+        return len(self._fingerprints)
+
+    def _state(self, idx):
+        return _STATES[self._fingerprints[idx]]
+
+    # ==================== SCHEDULING ====================
+    def acquire(self, est_tokens=0, exclude=()):
+        """
+        Picks the least-loaded healthy key and reserves budget on it.
+        Returns (index, 0) when a key is ready, (None, wait_seconds) when every
+        key is throttled, or (None, None) when every key is out for the day.
+        """
+        self._sync()
+        now = self.clock()
+        best_idx, best_score = None, None
+        shortest_wait = None
+        all_daily = True
+        with _LOCK:
+            for idx in self._fingerprints:
+                if idx in exclude and len(self._fingerprints) > len(exclude):
+                    continue
+                state = self._state(idx)
+                state.roll_day(now)
+                if state.day_count >= state.rpd_limit and not state.is_quarantined(now):
+                    self._quarantine(state, state.day_reset_at, "rpd_limit")
+                if state.is_quarantined(now):
+                    if state.quarantine_reason not in ("daily_quota", "rpd_limit"):
+                        all_daily = False
+                    wait = state.quarantined_until - now
+                    shortest_wait = wait if shortest_wait is None else min(shortest_wait, wait)
+                    continue
+                all_daily = False
+                wait = max(state.rpm.wait_time(1, now), state.tpm.wait_time(est_tokens, now))
+                if wait > 0:
+                    shortest_wait = wait if shortest_wait is None else min(shortest_wait, wait)
+                    continue
+                score = state.score(now)
+                if best_score is None or score < best_score:
+                    best_idx, best_score = idx, score
+
+            if best_idx is not None:
+                state = self._state(best_idx)
+                state.rpm.consume(1, now)
+                state.tpm.consume(est_tokens, now)
+                state.day_count += 1
+                state.in_flight += 1
+                _SYNC["dirty"] = True
+                return best_idx, 0
+
+        if all_daily and self._fingerprints:
+            return None, None
+        return None, max(shortest_wait or 1.0, 0.5)
+
+    def report_success(self, idx, latency=None, tokens=0, est_tokens=0):
+        """Records a finished call; corrects the TPM reservation with real usage."""
+        if idx not in self._fingerprints:
+            return
+        now = self.clock()
+        with _LOCK:
+            state = self._state(idx)
+            state.in_flight = max(0, state.in_flight - 1)
+            if tokens > est_tokens:
+                state.tpm.consume(tokens - est_tokens, now)
+            if latency is not None:
+                state.latency_ewma = latency if state.latency_ewma is None else \
+                    (1 - EWMA_ALPHA) * state.latency_ewma + EWMA_ALPHA * latency
+            state.error_ewma = (1 - EWMA_ALPHA) * state.error_ewma
+            if state.quarantine_reason and not state.is_quarantined(now):
+                state.quarantine_reason = None
+
+    def report_error(self, idx, kind, retry_after=None):
+        """
+        kind: "daily_quota" | "rate_limit" | "transient" | "invalid_key" | "other"
+        Returns the quarantine length in seconds (0 if the key stays active).
+        """
+        if idx not in self._fingerprints:
+            return 0
+        now = self.clock()
+        with _LOCK:
+            state = self._state(idx)
+            state.in_flight = max(0, state.in_flight - 1)
+            state.error_ewma = (1 - EWMA_ALPHA) * state.error_ewma + EWMA_ALPHA
+            if kind == "daily_quota":
+                until = state.day_reset_at if state.day_reset_at > now else next_quota_reset(now)
+            elif kind == "rate_limit":
+                until = now + (retry_after if retry_after else RATE_LIMIT_COOLDOWN)
+            elif kind == "transient":
+                until = now + (retry_after if retry_after else TRANSIENT_COOLDOWN)
+            elif kind == "invalid_key":
+                until = now + 24 * 3600
+            else:
+                return 0
+            self._quarantine(state, until, kind)
+        self._sync(force_save=kind in ("daily_quota", "invalid_key"))
+        return until - now
+
+    def release(self, idx):
+        """Releases an in-flight slot without scoring (e.g. blocked prompt)."""
+        if idx not in self._fingerprints:
+            return
+        with _LOCK:
+            state = self._state(idx)
+            state.in_flight = max(0, state.in_flight - 1)
+
+    def _quarantine(self, state, until, reason):
+        if until > state.quarantined_until:
+            state.quarantined_until = until
+            state.quarantine_reason = reason
+            _SYNC["dirty"] = True
+            print(f"KEY POOL: Key {state.fingerprint[:6]} quarantined ({reason}) for {int(until - self.clock())}s")
+
+    def snapshot(self):
+        """Per-key status for dashboards."""
+        now = self.clock()
+        rows = []
+        with _LOCK:
+            for idx, fp in self._fingerprints.items():
+                state = _STATES[fp]
+                rows.append({
+                    "index": idx,
+                    "fingerprint": fp[:6],
+                    "quarantined": state.is_quarantined(now),
+                    "reason": state.quarantine_reason if state.is_quarantined(now) else None,
+                    "available_in_s": max(0, int(state.quarantined_until - now)),
+                    "requests_today": state.day_count,
+                    "latency_s": round(state.latency_ewma, 2) if state.latency_ewma else None,
+                    "error_rate": round(state.error_ewma, 3),
+                    "in_flight": state.in_flight,
+                })
+        return rows
+
+    # ==================== PERSISTENCE ====================
+    def _sync(self, force_load=False, force_save=False):
+        """Merges persisted state and flushes our own (throttled, never raises)."""
+        now = self.clock()
+        if force_load or now - _SYNC["loaded_at"] > RELOAD_INTERVAL:
+            _SYNC["loaded_at"] = now
+            try:
+                records = self.store.load() or []
+                with _LOCK:
+                    for record in records:
+                        state = _STATES.get(record.get("fingerprint"))
+                        if state:
+                            state.merge_record(record, now)
+            except Exception as e:
+                print(f"KEY POOL LOAD ERROR (non-fatal): {e}")
+
+        if _SYNC["dirty"] and (force_save or now - _SYNC["saved_at"] > PERSIST_INTERVAL):
+            _SYNC["saved_at"] = now
+            _SYNC["dirty"] = False
+            with _LOCK:
+                records = [state.to_record() for state in _STATES.values()]
+            try:
+                self.store.save(records)
+            except Exception as e:
+                print(f"KEY POOL SAVE ERROR (non-fatal): {e}")
+
+
+def get_key_pool(api_keys):
+    """Returns a pool view over the process-wide key states, honouring saved limits."""
+    if "limits" not in _SYNC:
+        limits = None
+        try:
+            from memory import MemoryManager
+            limits = MemoryManager().load_settings().get("key_pool_limits")
+        except Exception:
+            pass
+        _SYNC["limits"] = limits
+    return KeyPool(api_keys, limits=_SYNC["limits"])
@@ -2,8 +2,15 @@
 import json
 import os
 import re
+import hashlib
 import datetime
 
+# Memory context budget (format_context_for_prompt)
+CONTEXT_RECENT_SESSIONS = 5     # newest sessions kept verbatim; older ones live in the rolling summary
+CONTEXT_TOKEN_BUDGET = 3000     # hard cap for the whole memory block (~4 chars per token)
+SUMMARY_FIELD_CHARS = 160       # per-field cap inside the rolling summary
+SUMMARY_LIST_LIMIT = 12         # promises / physical details / specifics kept (newest)
+
 def sanitize_filename(name):
     return re.sub(r'[^a-zA-Z0-9]', '', name)
 
@@ -33,6 +40,45 @@ def get_supabase_client():
         return None
 
 
+def _estimate_tokens(text):
+    return len(text or "") // 4
+
+
+def _clip(value):
+    if value in (None, "", "N/A", "null"):
+        return ""
+    text = re.sub(r"\s+", " ", str(value)).strip()
+    return text if len(text) <= SUMMARY_FIELD_CHARS else text[:SUMMARY_FIELD_CHARS - 3].rstrip() + "..."
+
+
+def _sessions_signature(sessions):
+    return hashlib.sha256(json.dumps(sessions, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def _empty_summary():
+    return {"covers": 0, "signature": None, "topics": {}, "targets": [], "promises": [], "physical": [], "details": [], "timeline": []}
+
+
+def _pack_sessions(memory_data):
+    """
+    JSON for the client_memories.sessions column. With a rolling summary the
+    payload is {"sessions": [...], "rolling_summary": {...}} (no extra column
+    or migration needed); without one it stays the plain session list.
+    """
+    sessions = memory_data.get("sessions", [])
+    if memory_data.get("rolling_summary"):
+        return json.dumps({"sessions": sessions, "rolling_summary": memory_data["rolling_summary"]}, ensure_ascii=False)
+    return json.dumps(sessions, ensure_ascii=False)
+
+
+def _unpack_sessions(raw):
+    """(sessions, rolling_summary or None) from a sessions column value, either layout."""
+    payload = json.loads(raw) if isinstance(raw, str) else raw
+    if isinstance(payload, dict):
+        return payload.get("sessions") or [], payload.get("rolling_summary")
+    return payload or [], None
+
+
 class MemoryManager:
     def __init__(self):
         self.supabase = get_supabase_client()
@@ -99,10 +145,11 @@ class MemoryManager:
             result = self.supabase.table("client_memories").select("*").eq("client_key", key).execute()
             if result.data:
                 row = result.data[0]
-                return {
-                    "client_name": row["client_name"],
-                    "sessions": json.loads(row["sessions"])
-                }
+                sessions, summary = _unpack_sessions(row["sessions"])
+                data = {"client_name": row["client_name"], "sessions": sessions}
+                if summary:
+                    data["rolling_summary"] = summary
+                return data
         except:
             pass
         return {"client_name": client_name, "sessions": []}
@@ -129,7 +176,7 @@ class MemoryManager:
         row = {
             "client_key": key,
             "client_name": client_name,
-            "sessions": json.dumps(memory_data.get("sessions", []), ensure_ascii=False),
+            "sessions": _pack_sessions(memory_data),  # rolling summary rides along in the same JSON
             "updated_at": datetime.datetime.now().isoformat()
         }
         try:
@@ -147,20 +194,60 @@ class MemoryManager:
             json.dump(memory_data, f, ensure_ascii=False, indent=4)
 
     # ==================== FORMAT ====================
-    def format_context_for_prompt(self, memory_data):
-        """Formats the memory JSON into a readable string for the LLM."""
-        if not memory_data.get("sessions"):
+    def format_context_for_prompt(self, memory_data, token_budget=CONTEXT_TOKEN_BUDGET, recent=CONTEXT_RECENT_SESSIONS):
+        """
+        Formats the memory JSON into a readable string for the LLM, within token_budget.
+        The newest `recent` sessions are shown verbatim, older ones through the
+        rolling summary. Sizes are left in self.last_context_stats.
+        """
+        sessions = memory_data.get("sessions") or []
+        if not sessions:
+            self.last_context_stats = {}
             return "No previous sessions found. This is a new client."
             
         context = f"CLIENT NAME: {memory_data.get('client_name')}\n"
-        context += f"TOTAL SESSIONS: {len(memory_data['sessions'])}\n\n"
-        
-        # Calculate relative time for the last session
+        context += f"TOTAL SESSIONS: {len(sessions)}\n\n"
+        context += f"TIMING CONTEXT: {self._timing_context(sessions[-1])}\n\n"
+        footer = "\n!!! KRİTİK: YUKARIDAKİ GEÇMİŞ BİLGİLERLE ASLA ÇELİŞME. DEVAMLILIK SAĞLA !!!\n"
+        footer += "!!! DAHA ÖNCE VERİLEN TARİHLER, İSİMLER, SÖZLER VE FİZİKSEL DETAYLARA SADIK KAL !!!\n"
+
+        full = context + "PAST SESSIONS HISTORY (Newest First):\n" + \
+            "".join(self._format_session(sessions, i) for i in range(len(sessions) - 1, -1, -1)) + footer
+
+        # Start from the stored summary; fold further (render-time only) while over budget
+        summary = dict(self.roll_summary(memory_data, recent))
+        timeline_limit = None
+        while True:
+            history = "PAST SESSIONS HISTORY (Newest First):\n" + "".join(
+                self._format_session(sessions, i) for i in range(len(sessions) - 1, summary["covers"] - 1, -1))
+            text = context + history + self._render_summary(summary, timeline_limit) + footer
+            if _estimate_tokens(text) <= token_budget:
+                break
+            if len(sessions) - summary["covers"] > 1:
+                summary = self._fold(summary, sessions[summary["covers"]], summary["covers"] + 1)
+            elif timeline_limit is None or timeline_limit > 0:
+                timeline_limit = len(summary["timeline"]) // 2 if timeline_limit is None else timeline_limit // 2
+            else:
+                # Hard cap: cut the history, never the header or the footer
+                room = max(0, token_budget * 4 - len(context) - len(footer) - 4)
+                text = context + (history + self._render_summary(summary, 0))[:room] + "...\n" + footer
+                break
+
+        self.last_context_stats = {
+            "sessions": len(sessions),
+            "verbatim_sessions": len(sessions) - summary["covers"],
+            "tokens": _estimate_tokens(text),
+            "tokens_saved": max(0, _estimate_tokens(full) - _estimate_tokens(text)),
+            "bytes_saved": max(0, len(full.encode("utf-8")) - len(text.encode("utf-8"))),
+        }
+        return text
+
+    def _timing_context(self, last_session):
+        """Relative time of the last session, e.g. '(Last Session: 3 DAYS AGO)'."""
         try:
             import pytz
             from datetime import datetime
             
-            last_session = memory_data['sessions'][-1]
             last_ts_str = last_session.get("timestamp") or last_session.get("date") # Fallback to old format
             
             # Identify if it's full timestamp or just date
@@ -188,17 +275,15 @@ class MemoryManager:
                         time_context = f"(Last Session: {days} DAYS AGO)"
                 else: # Old Format (YYYY-MM-DD)
                     time_context = f"(Last Session Date: {last_ts_str})"
+            return time_context
         except:
-            time_context = "(Time calculation error)"
+            return "(Time calculation error)"
 
-        context += f"TIMING CONTEXT: {time_context}\n\n"
-        context += "PAST SESSIONS HISTORY (Newest First):\n"
-        
-        # Reverse to show newest first
-        for i, session in enumerate(reversed(memory_data["sessions"])):
-            timestamp = session.get("timestamp", session.get("date", "Unknown"))
-            context += f"""
-            --- SESSION {len(memory_data['sessions']) - i} ({timestamp}) ---
+    def _format_session(self, sessions, index):
+        session = sessions[index]
+        timestamp = session.get("timestamp", session.get("date", "Unknown"))
+        return f"""
+            --- SESSION {index + 1} ({timestamp}) ---
             TOPIC: {session.get('topic')}
             TARGET NAME: {session.get('target_name')}
             PREDICTION GIVEN: {session.get('key_prediction')}
@@ -209,10 +294,73 @@ class MemoryManager:
             PHYSICAL/ENERGY: {session.get('physical_descriptions', 'N/A')}
             SESSION SUMMARY: {session.get('reading_summary', 'N/A')}
             """
-            
-        context += "\n!!! KRİTİK: YUKARIDAKİ GEÇMİŞ BİLGİLERLE ASLA ÇELİŞME. DEVAMLILIK SAĞLA !!!\n"
-        context += "!!! DAHA ÖNCE VERİLEN TARİHLER, İSİMLER, SÖZLER VE FİZİKSEL DETAYLARA SADIK KAL !!!\n"
-        return context
+
+    # ==================== ROLLING SUMMARY ====================
+    def roll_summary(self, memory_data, recent=CONTEXT_RECENT_SESSIONS):
+        """
+        Folds every session older than the newest `recent` into
+        memory_data["rolling_summary"] (incremental: only sessions not yet
+        covered are folded). A summary whose covered sessions were edited,
+        deleted or re-imported is rebuilt from scratch. Returns the summary.
+        """
+        sessions = memory_data.get("sessions") or []
+        summary = memory_data.get("rolling_summary")
+        if not summary or summary.get("covers", 0) > len(sessions) or \
+                summary.get("signature") != _sessions_signature(sessions[:summary.get("covers", 0)]):
+            summary = _empty_summary()
+        target = max(0, len(sessions) - recent)
+        while summary["covers"] < target:
+            summary = self._fold(summary, sessions[summary["covers"]], summary["covers"] + 1)
+        summary["signature"] = _sessions_signature(sessions[:summary["covers"]])
+        memory_data["rolling_summary"] = summary
+        return summary
+
+    def _fold(self, summary, session, number):
+        """Returns a new summary with `session` (1-based `number`) folded in."""
+        summary = {k: (list(v) if isinstance(v, list) else dict(v) if isinstance(v, dict) else v)
+                   for k, v in summary.items()}
+        topic = _clip(session.get("topic")) or "Genel"
+        summary["topics"][topic] = summary["topics"].get(topic, 0) + 1
+        target = _clip(session.get("target_name"))
+        if target and target not in summary["targets"]:
+            summary["targets"].append(target)
+        for field, key in (("promises_made", "promises"), ("physical_descriptions", "physical"), ("specific_details", "details")):
+            value = _clip(session.get(field))
+            if value:
+                summary[key] = (summary[key] + [f"#{number}: {value}"])[-SUMMARY_LIST_LIMIT:]
+        when = (session.get("timestamp") or session.get("date") or "?")[:10]
+        line = f"#{number} {when} {topic}"
+        if target:
+            line += f" → {target}"
+        said = _clip(session.get("key_prediction")) or _clip(session.get("spells_used"))
+        if said:
+            line += f": {said}"
+        hook = _clip(session.get("hook_left"))
+        if hook:
+            line += f" | HOOK: {hook}"
+        summary["timeline"].append(line)
+        summary["covers"] = number
+        summary["signature"] = None  # recomputed by roll_summary
+        return summary
+
+    def _render_summary(self, summary, timeline_limit=None):
+        if not summary["covers"]:
+            return ""
+        timeline = summary["timeline"]
+        if timeline_limit is not None:
+            timeline = timeline[len(timeline) - timeline_limit:] if timeline_limit else []
+        text = f"\n            --- OLDER SESSIONS 1-{summary['covers']} (ROLLING SUMMARY) ---\n"
+        text += "            TOPICS: " + ", ".join(f"{t} x{n}" for t, n in summary["topics"].items()) + "\n"
+        if summary["targets"]:
+            text += "            TARGET NAMES: " + ", ".join(summary["targets"]) + "\n"
+        for key, label in (("promises", "PROMISES MADE"), ("physical", "PHYSICAL/ENERGY"), ("details", "SPECIFIC DETAILS")):
+            if summary[key]:
+                text += f"            {label}: " + " ; ".join(reversed(summary[key])) + "\n"
+        if timeline:
+            text += "            TIMELINE (Newest First):\n" + "".join(f"            - {line}\n" for line in reversed(timeline))
+        if len(timeline) < len(summary["timeline"]):
+            text += f"            ({len(summary['timeline']) - len(timeline)} older sessions condensed into the lines above)\n"
+        return text
 
     # ==================== LIST ALL ====================
     def list_all_clients(self):
@@ -227,7 +375,7 @@ class MemoryManager:
             for row in result.data:
                 if row["client_key"] == "__app_settings__":
                     continue
-                sessions = json.loads(row["sessions"]) if isinstance(row["sessions"], str) else row["sessions"]
+                sessions, _ = _unpack_sessions(row["sessions"])
                 clients.append({
                     "filename": row["client_key"],
                     "client_name": row["client_name"],
@@ -377,6 +525,7 @@ class MemoryManager:
         import io
         from PyPDF2 import PdfReader
         from agents import OracleBrain # Local import to avoid circular dependency
+        from extraction import PDF_IMPORT_SCHEMA
         
         try:
             pdf_reader = PdfReader(io.BytesIO(pdf_file.read()))
@@ -415,18 +564,10 @@ class MemoryManager:
         """ + text[:12000] # Increased context window slightly
         
         try:
-            # Use Brain's Retry Logic
-            response = brain.generate_with_retry(brain.extraction_model, analysis_prompt)
-            result_text = response.text.strip()
-            
-            if "```json" in result_text:
-                result_text = result_text.split("```json")[1].split("```")[0]
-            elif "```" in result_text:
-                result_text = result_text.split("```")[1].split("```")[0]
-            
-            # Parse JSON
-            # import json # This import is already at the top of the file or implicitly available
-            data = json.loads(result_text)
+            # Brain's Retry Logic + schema-mode JSON (validated, one repair call)
+            data = brain.extract_json(analysis_prompt, PDF_IMPORT_SCHEMA, agent="pdf_import")
+            if data is None:
+                return False, "AI Analiz Hatası: Yanıt JSON şemasına uymadı (onarım denemesi de başarısız)."
             
             extracted_name = data.get("client_name") or "Unknown_Client"
             # Fallback if name is still generic
@@ -471,7 +612,24 @@ class MemoryManager:
             "total_tokens": usage_data.get("total_tokens", 0),
             "api_calls": usage_data.get("api_calls", 0),
             "cost_usd": round(usage_data.get("cost_usd", 0.0), 6),
-            "qc_rounds": usage_data.get("qc_rounds", 0)
+            "qc_rounds": usage_data.get("qc_rounds", 0),
+            "tokens_cached": usage_data.get("tokens_cached", 0),
+            "cache_savings_usd": round(usage_data.get("cache_savings_usd", 0.0), 6),
+            "response_cache_hits": usage_data.get("response_cache_hits", 0),
+            "client_id_local_hits": usage_data.get("client_id_local_hits", 0),
+            "memory_tokens_saved": usage_data.get("memory_tokens_saved", 0),
+            "budget_limit_fired": usage_data.get("budget_limit_fired"),
+            "length_extensions": usage_data.get("length_extensions", 0),
+            "lint_hits": usage_data.get("lint_hits", {}),
+            "lint_rejections": usage_data.get("lint_rejections", 0),
+            "section_revisions": usage_data.get("section_revisions", 0),
+            "routed_calls": usage_data.get("routed_calls", {}),
+            "fused_extractions": usage_data.get("fused_extractions", 0),
+            "extractions": usage_data.get("extractions", 0),
+            "extraction_repairs": usage_data.get("extraction_repairs", 0),
+            "extraction_failures": usage_data.get("extraction_failures", 0),
+            "convergence_stop": usage_data.get("convergence_stop"),
+            "rounds_saved": usage_data.get("rounds_saved", 0)
         }
         
         # Load existing usage data
@@ -491,6 +649,7 @@ class MemoryManager:
             return {
                 "total_cost": 0.0, "total_tokens": 0, "total_readings": 0,
                 "total_api_calls": 0, "tokens_in": 0, "tokens_out": 0,
+                "extractions": 0, "extraction_repairs": 0, "extraction_failures": 0, "extraction_failure_rate": 0.0,
                 "records": []
             }
         
@@ -501,6 +660,8 @@ class MemoryManager:
         else:
             filtered = records
         
+        extractions = sum(r.get("extractions", 0) for r in filtered)
+        failures = sum(r.get("extraction_failures", 0) for r in filtered)
         return {
             "total_cost": round(sum(r.get("cost_usd", 0) for r in filtered), 4),
             "total_tokens": sum(r.get("total_tokens", 0) for r in filtered),
@@ -508,6 +669,10 @@ class MemoryManager:
             "total_api_calls": sum(r.get("api_calls", 0) for r in filtered),
             "tokens_in": sum(r.get("tokens_in", 0) for r in filtered),
             "tokens_out": sum(r.get("tokens_out", 0) for r in filtered),
+            "extractions": extractions,
+            "extraction_repairs": sum(r.get("extraction_repairs", 0) for r in filtered),
+            "extraction_failures": failures,
+            "extraction_failure_rate": failures / extractions if extractions else 0.0,
             "records": filtered
         }
     
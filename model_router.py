@@ -0,0 +1,164 @@
+"""
+Model Tier Router for Nes Shine Oracle
+Short, structured calls (client name, memory JSON, delivery message, PDF
+import, TTS QC) do not need the pro model that writes the readings. Agents
+are mapped to a tier ("flash" / "pro"); each tier is a fallback chain of
+models, cheapest first. A model is skipped while it misses its tier's latency
+target (observed p95) or its per-call cost target, and it is put on cooldown
+after repeated errors (for good when the API says the model does not exist).
+The chains are checked against the model catalogue (models.txt, the dump of
+genai.list_models() made by list_models.py) so a retired model is never tried.
+"""
+
+import os
+import ast
+import math
+import time
+import threading
+from collections import deque
+
+CATALOGUE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models.txt")
+
+# Fallback chains, first healthy candidate wins; the last entry is the last resort
+TIERS = {
+    "pro": ["gemini-3.1-pro-preview", "gemini-3-pro-preview"],
+    "flash": ["gemini-3-flash-preview", "gemini-2.5-flash", "gemini-3.1-pro-preview"],
+}
+# Per-tier targets: observed p95 latency (s) and estimated cost of one call (USD)
+TARGETS = {
+    "pro": {"p95_latency_s": None, "cost_per_call_usd": None},
+    "flash": {"p95_latency_s": 45.0, "cost_per_call_usd": 0.02},
+}
+EXPECTED_OUT_TOKENS = 1024   # output size assumed for the cost target of a short call
+WINDOW = 50                  # latency samples kept per model
+MIN_SAMPLES = 5              # below this the latency target is not enforced
+MAX_FAILURES = 3             # consecutive errors before a model cools down
+COOLDOWN_S = 300.0           # seconds a failing model is skipped
+
+
+def load_catalogue(path=CATALOGUE_PATH):
+    """
+    models.txt -> {name: {"input_limit", "output_limit", "methods"}} or None.
+    The file is the Python repr of the list_models REST answer (UTF-16 when it
+    was redirected from PowerShell), so it is read with ast.literal_eval.
+    """
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+    except OSError:
+        return None
+    try:
+        text = raw.decode("utf-16") if raw[:2] in (b"\xff\xfe", b"\xfe\xff") else raw.decode("utf-8-sig")
+        data = ast.literal_eval(text.strip())
+    except (ValueError, SyntaxError, UnicodeDecodeError) as e:
+        print(f"MODEL CATALOGUE SKIPPED ({path}): {e}")
+        return None
+    catalogue = {}
+    for m in (data.get("models") or []) if isinstance(data, dict) else []:
+        name = str(m.get("name", "")).replace("models/", "")
+        if name:
+            catalogue[name] = {
+                "input_limit": m.get("inputTokenLimit"),
+                "output_limit": m.get("outputTokenLimit"),
+                "methods": list(m.get("supportedGenerationMethods") or []),
+            }
+    return catalogue or None
+
+
+class ModelRouter:
+    """Process-wide tier chains with per-model latency samples and error cooldowns."""
+
+    def __init__(self, catalogue=None, tiers=None, targets=None, clock=time.time):
+        self.catalogue = catalogue
+        self.tiers = {tier: list(chain) for tier, chain in (tiers or TIERS).items()}
+        self.targets = {tier: dict(t) for tier, t in (targets or TARGETS).items()}
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._latency = {}
+        self._failures = {}
+        self._cooldown_until = {}
+        self.stats = {"routed": {}, "fallbacks": 0}
+
+    def chain(self, tier):
+        """The tier's candidates that the catalogue lists for generateContent (all of them without a catalogue)."""
+        chain = self.tiers.get(tier) or []
+        if not self.catalogue:
+            return list(chain)
+        known = [m for m in chain if "generateContent" in self.catalogue.get(m, {}).get("methods", [])]
+        return known or list(chain)
+
+    def _p95(self, model):
+        samples = sorted(self._latency.get(model, ()))
+        if len(samples) < MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(math.ceil(0.95 * len(samples))) - 1)]
+
+    def _fits(self, model, tier, est_tokens, price_fn):
+        target = self.targets.get(tier, {})
+        p95 = self._p95(model)
+        if target.get("p95_latency_s") and p95 is not None and p95 > target["p95_latency_s"]:
+            return False
+        if target.get("cost_per_call_usd") and price_fn is not None:
+            price_in, price_out = price_fn(model)
+            cost = est_tokens / 1_000_000 * price_in + EXPECTED_OUT_TOKENS / 1_000_000 * price_out
+            if cost > target["cost_per_call_usd"]:
+                return False
+        return True
+
+    def choose(self, tier, est_tokens=0, price_fn=None, count=True):
+        """
+        First candidate that is not cooling down and meets the tier targets;
+        otherwise the first one that is merely available; otherwise the last resort.
+        count=False only peeks (e.g. for a cache key) without touching the stats.
+        """
+        chain = self.chain(tier)
+        if not chain:
+            return None
+        now = self._clock()
+        with self._lock:
+            available = [m for m in chain if self._cooldown_until.get(m, 0) <= now]
+            picked = next((m for m in available if self._fits(m, tier, est_tokens, price_fn)), None)
+            picked = picked or (available[0] if available else chain[-1])
+            if not count:
+                return picked
+            self.stats["routed"][picked] = self.stats["routed"].get(picked, 0) + 1
+            if picked != chain[0]:
+                self.stats["fallbacks"] += 1
+        return picked
+
+    def record(self, model, latency=None, ok=True, permanent=False):
+        """Outcome of one call. permanent=True (model not found / not allowed) retires it for the process."""
+        with self._lock:
+            if ok:
+                self._failures[model] = 0
+                if latency is not None:
+                    self._latency.setdefault(model, deque(maxlen=WINDOW)).append(latency)
+                return
+            self._failures[model] = self._failures.get(model, 0) + 1
+            if permanent or self._failures[model] >= MAX_FAILURES:
+                self._cooldown_until[model] = float("inf") if permanent else self._clock() + COOLDOWN_S
+                self._failures[model] = 0
+                print(f"MODEL ROUTER: {model} {'devre dışı' if permanent else f'{int(COOLDOWN_S)}s beklemede'}, zincirdeki sıradaki modele geçiliyor.")
+
+    def snapshot(self):
+        now = self._clock()
+        with self._lock:
+            return {
+                "routed": dict(self.stats["routed"]),
+                "fallbacks": self.stats["fallbacks"],
+                "cooling_down": sorted(m for m, t in self._cooldown_until.items() if t > now),
+                "p95_latency_s": {m: self._p95(m) for m in self._latency},
+            }
+
+
+_ROUTER = None
+_ROUTER_LOCK = threading.Lock()
+
+
+def get_model_router():
+    """Process-wide router, seeded from models.txt (shared by OracleBrain and SpellBrain)."""
+    global _ROUTER
+    with _ROUTER_LOCK:
+        if _ROUTER is None:
+            _ROUTER = ModelRouter(catalogue=load_catalogue())
+        return _ROUTER
@@ -0,0 +1,128 @@
+"""
+Structured QC Verdicts for Nes Shine Oracle
+The grandmasters (reading and spell QC) answer with a compact JSON verdict
+instead of free text: approved + a list of issues, each with an issue code,
+the ids of the affected sections (sections.py) and a short fix instruction.
+The writer then regenerates only those sections. Answers that are not valid
+JSON fall back to the old "APPROVED" / free-text protocol (whole-draft issue).
+"""
+
+import json
+import re
+
+ISSUE_CODES = {
+    "LENGTH": "too short / thin",
+    "STRUCTURE": "required structure or headings missing",
+    "FORMAT": "HTML or formatting problems",
+    "AI_TONE": "robotic, formulaic or AI-sounding prose",
+    "DASH": "dashes in the text",
+    "LANGUAGE": "not pure English",
+    "MEMORY": "past sessions with the client not felt",
+    "RELEVANCE": "does not answer the client's question / generic",
+    "HALLUCINATION": "invented or wrong facts, names, dates",
+    "HOOKS": "missing hooks for a next session",
+    "INTERNAL_NOTES": "notes or meta text not meant for the client",
+    "DEPTH": "not deep, premium or authoritative enough",
+    "OTHER": "anything else",
+}
+NOTE_CHARS = 400           # per issue; the verdict stays a few hundred tokens
+LEGACY_NOTE_CHARS = 3000   # free-text answers are kept, clipped
+
+_OPENING_TITLE = "Açılış"
+
+VERDICT_FORMAT = """
+        --- YANIT FORMATI (ZORUNLU) ---
+        Yukarıdaki "APPROVED" / "REVISE" formatı yerine yanıtını SADECE aşağıdaki JSON olarak ver, başka hiçbir metin yazma:
+        {{"approved": true|false, "issues": [{{"code": "<KOD>", "sections": ["<bölüm kimliği>"], "note": "en fazla 2 cümle, somut düzeltme talimatı"}}]}}
+        Onay için issues boş olmalı. KODLAR: {codes}
+        "sections" sorunun geçtiği bölümlerin kimlikleridir; sorun tüm okumayı ilgilendiriyorsa boş liste ver.
+        BÖLÜMLER:
+{section_map}
+"""
+
+SPELL_VERDICT_FORMAT = """
+--- ANSWER FORMAT (MANDATORY) ---
+Instead of the "APPROVED" / revision format above, answer ONLY with this JSON and nothing else:
+{{"approved": true|false, "issues": [{{"code": "<CODE>", "sections": ["<section id>"], "note": "at most 2 sentences, a concrete fix"}}]}}
+Approval requires an empty issues list. CODES: {codes}
+"sections" are the ids of the sections where the problem is; use an empty list when it concerns the whole ritual.
+SECTIONS:
+{section_map}
+"""
+
+
+def section_map(sections):
+    return "\n".join(f"        {s['id']}: {s['title'] or _OPENING_TITLE}" for s in sections)
+
+
+def format_instructions(sections, spell=False):
+    template = SPELL_VERDICT_FORMAT if spell else VERDICT_FORMAT
+    return template.format(codes=", ".join(ISSUE_CODES), section_map=section_map(sections))
+
+
+def _extract_json(text):
+    body = re.sub(r"^\s*```[a-zA-Z]*\s*|\s*```\s*$", "", text or "")
+    start, end = body.find("{"), body.rfind("}")
+    if start == -1 or end <= start:
+        return None
+    try:
+        return json.loads(body[start:end + 1])
+    except ValueError:
+        return None
+
+
+def parse_verdict(text, section_ids=(), default_sections=None):
+    """
+    Model answer -> {"approved", "issues", "structured"}. Issues are
+    {"code", "sections", "note"}; unknown codes become OTHER and unknown
+    section ids are dropped. default_sections is used for issues without
+    sections (a single-section review). An approval that still lists issues
+    is a rejection.
+    """
+    known = set(section_ids)
+    data = _extract_json(text)
+    if isinstance(data, dict) and isinstance(data.get("approved"), bool) and isinstance(data.get("issues", []), list):
+        issues = []
+        for raw in data.get("issues") or []:
+            if not isinstance(raw, dict):
+                continue
+            code = str(raw.get("code") or "OTHER").upper()
+            sections = [str(s) for s in (raw.get("sections") or []) if str(s) in known]
+            issues.append({
+                "code": code if code in ISSUE_CODES else "OTHER",
+                "sections": sections or list(default_sections or []),
+                "note": str(raw.get("note") or "").strip()[:NOTE_CHARS],
+            })
+        return {"approved": data["approved"] and not issues, "issues": issues, "structured": True}
+
+    # Legacy protocol: "APPROVED" at the end, anything else is a whole-draft critique
+    text = (text or "").strip()
+    if "APPROVED" in text:
+        return {"approved": True, "issues": [], "structured": False}
+    note = text[:LEGACY_NOTE_CHARS] or "QC yanıtı boş."
+    return {"approved": False, "issues": [{"code": "OTHER", "sections": list(default_sections or []), "note": note}], "structured": False}
+
+
+def failing_sections(verdict):
+    """Sorted ids of the sections to regenerate, or None when an issue concerns the whole draft."""
+    if verdict is None:
+        return None
+    if verdict["approved"]:
+        return []
+    ids = set()
+    for issue in verdict["issues"]:
+        if not issue["sections"]:
+            return None
+        ids.update(issue["sections"])
+    return sorted(ids, key=lambda sid: int(sid[1:]) if sid[1:].isdigit() else 0)
+
+
+def format_issues(issues, section_id=None):
+    """Compact writer feedback: one line per issue (only the ones touching section_id, if given)."""
+    lines = []
+    for issue in issues:
+        if section_id is not None and issue["sections"] and section_id not in issue["sections"]:
+            continue
+        where = f" ({', '.join(issue['sections'])})" if issue["sections"] and section_id is None else ""
+        lines.append(f"- [{issue['code']}]{where} {issue['note']}".rstrip())
+    return "\n".join(lines)
@@ -0,0 +1,182 @@
+"""
+Response Cache for Nes Shine Oracle
+Content-addressed, disk-backed cache for deterministic (low temperature)
+extraction calls: client identification, memory extraction, TTS QC and PDF
+imports. Re-runs after a crash, re-imported PDFs and batch retries are served
+from disk with zero API calls. SQLite store, TTL per entry, size-bounded LRU.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import contextlib
+import dataclasses
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "responses.sqlite3")
+DEFAULT_TTL = 14 * 24 * 3600       # 14 days
+MAX_ENTRIES = 5000
+MAX_BYTES = 64 * 1024 * 1024       # 64 MB of response text
+MAX_CACHEABLE_TEMPERATURE = 0.3    # higher temperatures are meant to vary, never cache them
+
+
+def _config_dict(generation_config):
+    if generation_config is None:
+        return {}
+    if dataclasses.is_dataclass(generation_config):
+        return dataclasses.asdict(generation_config)
+    if isinstance(generation_config, dict):
+        return dict(generation_config)
+    return {"repr": repr(generation_config)}
+
+
+def is_cacheable(generation_config):
+    """Only deterministic-ish configs are cacheable."""
+    temperature = _config_dict(generation_config).get("temperature")
+    return temperature is not None and temperature <= MAX_CACHEABLE_TEMPERATURE
+
+
+def make_key(model_name, generation_config, prompt):
+    """sha256 over model + generation config + prompt."""
+    payload = json.dumps({
+        "model": (model_name or "").replace("models/", ""),
+        "config": _config_dict(generation_config),
+        "prompt": str(prompt),
+    }, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CachedResponse:
+    """Minimal stand-in for a GenerateContentResponse served from disk (callers only read .text)."""
+
+    def __init__(self, text):
+        self.text = text
+        self.usage_metadata = None
+        self.prompt_feedback = None
+        self.candidates = [text]
+        self.from_cache = True
+
+
+class ResponseCache:
+    def __init__(self, path=None, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES, default_ttl=DEFAULT_TTL, clock=time.time):
+        self.path = path or os.environ.get("RESPONSE_CACHE_PATH", DEFAULT_PATH)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.enabled = True
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with self._connect() as conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS responses (
+                        key TEXT PRIMARY KEY,
+                        model TEXT,
+                        value TEXT NOT NULL,
+                        size INTEGER NOT NULL,
+                        created_at REAL NOT NULL,
+                        expires_at REAL NOT NULL,
+                        last_access REAL NOT NULL
+                    )""")
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_access ON responses(last_access)")
+        except Exception as e:
+            # Read-only disk etc.: run uncached rather than fail the reading
+            print(f"RESPONSE CACHE DISABLED: {e}")
+            self.enabled = False
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """Short-lived connection: commits on success, always closed (safe across threads)."""
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        """Returns the cached text or None (expired entries are dropped)."""
+        if not self.enabled:
+            return None
+        now = self.clock()
+        try:
+            with self._lock, self._connect() as conn:
+                row = conn.execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                if row[1] <= now:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    return None
+                conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+                return row[0]
+        except Exception as e:
+            print(f"RESPONSE CACHE READ ERROR (non-fatal): {e}")
+            return None
+
+    def put(self, key, value, model_name=None, ttl=None):
+        if not self.enabled or not value:
+            return False
+        now = self.clock()
+        size = len(value.encode("utf-8"))
+        try:
+            with self._lock, self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, model, value, size, created_at, expires_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, model_name, value, size, now, now + (ttl or self.default_ttl), now)
+                )
+                self._evict(conn, now)
+            return True
+        except Exception as e:
+            print(f"RESPONSE CACHE WRITE ERROR (non-fatal): {e}")
+            return False
+
+    def delete(self, key):
+        if not self.enabled:
+            return False
+        try:
+            with self._lock, self._connect() as conn:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            return True
+        except Exception as e:
+            print(f"RESPONSE CACHE DELETE ERROR (non-fatal): {e}")
+            return False
+
+    def _evict(self, conn, now):
+        """Drops expired rows, then least-recently-used rows until both bounds hold."""
+        conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        rows = conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC").fetchall()
+        doomed = []
+        for key, size in rows:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            count -= 1
+            total -= size
+        conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+    def stats(self):
+        if not self.enabled:
+            return {"entries": 0, "bytes": 0}
+        with self._lock, self._connect() as conn:
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"entries": count, "bytes": total}
+
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_response_cache():
+    """Process-wide cache shared by every brain."""
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = ResponseCache()
+        return _CACHE
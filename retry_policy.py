@@ -0,0 +1,95 @@
+"""
+Retry Policy for Nes Shine Oracle
+Shared backoff engine for OracleBrain and SpellBrain: exponential backoff with
+full jitter (workers never retry in lockstep after a 429 storm), Retry-After and
+quota-reset awareness, and a per-request deadline. Waits are sliced into short
+sleeps with a heartbeat, so the UI keeps updating and other threads keep running.
+"""
+
+import time
+import random
+
+BASE_DELAY = 2.0            # seconds; first retry waits up to this much
+MAX_DELAY = 60.0            # backoff cap
+REQUEST_DEADLINE = 30 * 60  # a single generate/stream call never retries longer than this
+SLICE = 1.0                 # max length of one uninterrupted sleep
+HEARTBEAT_INTERVAL = 5.0    # progress message cadence while waiting
+RETRY_AFTER_SPREAD = 0.2    # extra random share added on top of a server Retry-After
+
+
+class RetryDeadlineExceeded(Exception):
+    """The request ran out of its retry deadline."""
+
+
+class RetryPolicy:
+    """Stateless configuration; call begin() once per request."""
+
+    def __init__(self, base_delay=BASE_DELAY, max_delay=MAX_DELAY, deadline=REQUEST_DEADLINE,
+                 clock=time.time, sleep=time.sleep, rng=random.random):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.clock = clock
+        self.sleep = sleep
+        self.rng = rng
+
+    def begin(self, deadline=None):
+        return RetryBudget(self, self.deadline if deadline is None else deadline)
+
+
+class RetryBudget:
+    """Per-request retry state: failure counters per kind and the deadline."""
+
+    def __init__(self, policy, deadline):
+        self.policy = policy
+        self.started = policy.clock()
+        self.deadline_at = self.started + deadline
+        self.failures = {}
+        self.waited = 0.0
+
+    def remaining(self):
+        return self.deadline_at - self.policy.clock()
+
+    def backoff(self, kind="other", retry_after=None):
+        """
+        Next delay for a failure of `kind`. A server/pool Retry-After is honoured
+        as a floor with a small random spread; otherwise full jitter:
+        uniform(0, min(MAX_DELAY, BASE_DELAY * 2^n)).
+        """
+        n = self.failures.get(kind, 0)
+        self.failures[kind] = n + 1
+        p = self.policy
+        if retry_after:
+            return retry_after + p.rng() * min(max(retry_after * RETRY_AFTER_SPREAD, 0.5), 5.0)
+        return p.rng() * min(p.max_delay, p.base_delay * (2 ** n))
+
+    def wait(self, delay, message=None, progress_callback=None):
+        """
+        Sleeps `delay` seconds in short slices, emitting a heartbeat every
+        HEARTBEAT_INTERVAL. Raises RetryDeadlineExceeded if the wait would
+        outlive the request deadline.
+        """
+        p = self.policy
+        if delay >= self.remaining():
+            raise RetryDeadlineExceeded(
+                f"Yeniden deneme süresi doldu ({int(p.clock() - self.started)}s). {message or ''}".strip())
+        if message:
+            print(f"{message} ({delay:.1f}s)")
+            if progress_callback: progress_callback(f"{message} ({int(delay) + 1}s)")
+        end = p.clock() + delay
+        next_beat = p.clock() + HEARTBEAT_INTERVAL
+        while True:
+            now = p.clock()
+            left = end - now
+            if left <= 0:
+                break
+            if progress_callback and message and now >= next_beat:
+                progress_callback(f"{message} ({int(left) + 1}s kaldı)")
+                next_beat = now + HEARTBEAT_INTERVAL
+            p.sleep(min(SLICE, left))
+        self.waited += delay
+        return delay
+
+    def wait_until(self, timestamp, message=None, progress_callback=None):
+        """Quota-reset aware wait: sleeps until `timestamp` if the deadline allows it."""
+        return self.wait(max(0.0, timestamp - self.policy.clock()), message, progress_callback)
@@ -0,0 +1,150 @@
+"""
+Section-Parallel QC for Nes Shine Oracle
+The grandmaster reviews a draft chapter by chapter (sections.py boundaries)
+instead of in one 8-20K-char call: sections are reviewed in parallel against
+the per-chapter checklist (SECTION_QC_PROMPT), and ONE whole-reading pass
+(WHOLE_READING_QC_PROMPT) judges what only the full text can show: memory,
+answered questions, hooks, the closing blessing, total length. Every section
+approved and the whole pass approved = draft approved. Verdicts
+are cached by section text, so a revision that rewrote two chapters only pays
+for those two, and with pipelining a chapter is submitted while the writer is
+still streaming the next one.
+"""
+
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from concurrency import submit_with_context
+from qc_verdict import format_instructions, format_issues
+
+MIN_SECTIONS = 3       # opening + 2 chapters; shorter drafts get one whole-draft review
+MAX_WORKERS = 4        # parallel section reviews (each on its own key)
+OPENING_TITLE = "Açılış"
+
+
+def section_label(section):
+    return f"{section['id']} · {section['title'] or OPENING_TITLE}"
+
+
+def build_section_qc_prompt(qc_prompt, section, index, order_note, target_length):
+    """The per-chapter checklist scoped to one section; whole-reading criteria go to build_whole_qc_prompt."""
+    return f"""
+        {qc_prompt}
+
+        --- BÖLÜM KAPSAMI ---
+        Bu istekte okumanın SADECE bir bölümünü inceliyorsun (Bölüm {index + 1}: {section_label(section)}).
+        Okumanın tamamı yaklaşık {target_length} karakter. Sorun varsa sadece BU bölümün sorunlarını yaz.
+
+        --- İNCELENECEK TASLAK (BÖLÜM {index + 1}) ---
+        {section["html"]}
+
+        --- ORİJİNAL MÜŞTERİ NOTU (Context Kontrolü İçin) ---
+        {order_note}
+        {format_instructions([section])}"""
+
+
+def build_whole_qc_prompt(qc_prompt, draft_text, sections, order_note, target_length):
+    """The whole-reading pass: only the criteria a single chapter cannot answer."""
+    return f"""
+        {qc_prompt}
+
+        --- HEDEF UZUNLUK KRİTERİ ---
+        Bu okuma için hedeflenen minimum uzunluk: {target_length} karakter.
+
+        --- İNCELENECEK TASLAK (TÜM OKUMA) ---
+        {draft_text}
+
+        --- ORİJİNAL MÜŞTERİ NOTU (Context Kontrolü İçin) ---
+        {order_note}
+        {format_instructions(sections)}"""
+
+
+def aggregate(results, whole=None):
+    """
+    results: [(section, approved, issues)] in draft order (issues as in qc_verdict);
+    whole: (approved, issues) of the whole-reading pass, if one ran.
+    Returns the draft verdict {"approved", "issues", "structured"} and the writer feedback,
+    which names every failing section and the whole-reading issues.
+    """
+    failing = [(section, issues) for section, approved, issues in results if not approved]
+    whole_issues = list(whole[1]) if whole and not whole[0] else []
+    if whole and not whole[0] and not whole_issues:
+        whole_issues = [{"code": "OTHER", "sections": [], "note": "Tüm okuma reddedildi."}]
+    all_issues = [issue for _, issues in failing for issue in issues] + whole_issues
+    verdict = {"approved": not all_issues and not failing, "issues": all_issues, "structured": True}
+    if verdict["approved"]:
+        return verdict, "Onaylandı. Mükemmel."
+    lines = []
+    if failing:
+        lines.append(f"{len(failing)}/{len(results)} bölüm reddedildi. Onaylanan bölümler OLDUĞU GİBİ kalacak; sadece şu bölümleri düzelt:")
+    for section, issues in failing:
+        lines.append(f"\n[Bölüm {section_label(section)}]\n{format_issues(issues, section['id'])}")
+    if whole_issues:
+        lines.append(f"\n[Tüm okuma]\n{format_issues(whole_issues)}")
+    return verdict, "\n".join(lines).strip()
+
+
+class SectionReviewer:
+    """
+    review_fn(section, index, order_note, target_length) -> (approved, issues),
+    called on worker threads (it must use its own brain fork). whole_fn(draft,
+    sections, order_note, target_length) -> (approved, issues) is the
+    whole-reading pass, run once per draft next to the section reviews.
+    Verdicts are cached per (text, order note, target length) until reset().
+    """
+
+    def __init__(self, review_fn, whole_fn=None, max_workers=MAX_WORKERS):
+        self.review_fn = review_fn
+        self.whole_fn = whole_fn
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._futures = {}
+        self._executor = None
+        self.submitted = 0
+        self.reused = 0
+
+    def _key(self, text, order_note, target_length, scope="section"):
+        raw = f"{scope}\x00{target_length}\x00{order_note}\x00{text.strip()}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def submit(self, section, index, order_note, target_length):
+        """Schedules (or reuses) the review of one section; returns its future."""
+        key = self._key(section["html"], order_note, target_length)
+        return self._submit(key, lambda: self.review_fn(section, index, order_note, target_length))
+
+    def submit_whole(self, draft, sections, order_note, target_length):
+        """Schedules (or reuses) the whole-reading pass of a draft; returns its future."""
+        key = self._key(draft, order_note, target_length, scope="whole")
+        return self._submit(key, lambda: self.whole_fn(draft, sections, order_note, target_length))
+
+    def _submit(self, key, fn):
+        with self._lock:
+            future = self._futures.get(key)
+            if future is not None and not (future.done() and future.exception() is not None):
+                self.reused += 1
+                return future
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="oracle-section-qc")
+            future = submit_with_context(self._executor, fn)
+            self._futures[key] = future
+            self.submitted += 1
+            return future
+
+    def review(self, sections, order_note, target_length):
+        """Reviews every section (cached ones are not paid again) and returns [(section, approved, issues)]."""
+        futures = [self.submit(s, n, order_note, target_length) for n, s in enumerate(sections)]
+        return [(section, *future.result()) for section, future in zip(sections, futures)]
+
+    def review_draft(self, draft, sections, order_note, target_length):
+        """Section reviews plus the whole-reading pass, in parallel: (results, (approved, issues) or None)."""
+        whole = self.submit_whole(draft, sections, order_note, target_length) if self.whole_fn else None
+        results = self.review(sections, order_note, target_length)
+        return results, whole.result() if whole else None
+
+    def reset(self):
+        """New cycle: forget verdicts (running reviews finish in the background)."""
+        with self._lock:
+            self._futures = {}
+            self.submitted = 0
+            self.reused = 0
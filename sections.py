@@ -0,0 +1,140 @@
+"""
+Reading Sections for Nes Shine Oracle
+A reading is one HTML body whose chapters start at <h2> (prompts.py, FORMAT VE
+YAPISAL KURALLAR); a ritual wraps each <h2> chapter in a section div
+(spell_prompts.py). split_sections() cuts a draft at those boundaries without
+losing a character, so single sections can be measured, expanded, reviewed or
+regenerated and spliced back with join_sections(). Also the shared helpers for
+the numeric target length and the visible (tag-free) length of a draft.
+"""
+
+import re
+
+DEFAULT_TARGET = 8000
+MIN_TARGET = 1000      # smaller numbers in a length note are page / word counts, not characters
+
+_H2 = re.compile(r"<h2\b", re.IGNORECASE)
+# A chapter starts at its wrapper div when it has one, otherwise at the <h2>
+_SECTION_START = re.compile(r"<div\b[^>]*\bclass=\"[^\"]*\b(?:spell-section|modal-content)\b[^\"]*\"[^>]*>|<h2\b", re.IGNORECASE)
+_FIRST_TAG = re.compile(r"\s*(<[a-zA-Z][^>]*>)")
+_TAG = re.compile(r"<[^>]+>")
+_FENCE = re.compile(r"^\s*```[a-zA-Z]*[ \t]*\n|\n?```\s*$")
+
+
+def parse_target_length(value, default=DEFAULT_TARGET):
+    """'8000', '20,000', 'SOVEREIGN DEPTH (20K CHARS)' -> int; free text without a character count -> default."""
+    for digits, kilo in re.findall(r"(\d[\d,.]*)\s*([kK]\b)?", str(value or "")):
+        number = int(re.sub(r"[,.]", "", digits) or 0) * (1000 if kilo else 1)
+        if number >= MIN_TARGET:
+            return number
+    return default
+
+
+def visible_length(html):
+    """Characters the client actually reads: tags removed, whitespace collapsed."""
+    return len(re.sub(r"\s+", " ", _TAG.sub(" ", html or "")).strip())
+
+
+def _title(html):
+    match = re.search(r"<h2\b[^>]*>(.*?)</h2>", html, re.IGNORECASE | re.DOTALL)
+    return re.sub(r"\s+", " ", _TAG.sub("", match.group(1))).strip() if match else ""
+
+
+def _tag_name(tag):
+    """'<div class="spell-section">' -> 'div.spell-section', '<h2 class="x">' -> 'h2'."""
+    name = re.match(r"<(\w+)", tag).group(1).lower()
+    cls = re.search(r'class="([^"]*)"', tag)
+    return f"{name}.{cls.group(1).split()[0]}" if name == "div" and cls and cls.group(1).split() else name
+
+
+def split_sections(html):
+    """
+    [{"id", "title", "html"}]: "s0" is everything before the first chapter
+    (title, subtitle, opening), then one section per <h2> (starting at its
+    wrapper div, if any). The last section also carries the closing markup.
+    "".join(s["html"]) == html.
+    """
+    html = html or ""
+    starts = []
+    wrapper_open = False  # a wrapper div was seen and its <h2> not yet
+    for m in _SECTION_START.finditer(html):
+        is_h2 = m.group(0).lower().startswith("<h2")
+        if is_h2 and wrapper_open:
+            wrapper_open = False  # the heading of the wrapper that already started this chapter
+            continue
+        starts.append(m.start())
+        wrapper_open = not is_h2
+    bounds = [0] + [s for s in starts if s > 0] + [len(html)]
+    sections = []
+    for n, (a, b) in enumerate(zip(bounds, bounds[1:])):
+        chunk = html[a:b]
+        sections.append({"id": f"s{n}", "title": _title(chunk), "html": chunk})
+    return sections
+
+
+def join_sections(sections):
+    return "".join(s["html"] for s in sections)
+
+
+def replace_section(sections, section_id, html):
+    """New list with `section_id`'s html replaced (unknown ids are ignored)."""
+    return [dict(s, html=html) if s["id"] == section_id else s for s in sections]
+
+
+def clean_section(text, original, longer=True):
+    """
+    Model output for one section -> section html, or None if it is not a
+    drop-in replacement: a different opening tag than the original (<h2>, the
+    wrapper div, <h1> for the opening), a new <h1>, not longer than before
+    (expansions) or under half the old length (revisions). Trailing whitespace
+    of the original is kept so the seams do not move.
+    """
+    body = _FENCE.sub("", text or "").strip()
+    first_old, first_new = _FIRST_TAG.match(original), _FIRST_TAG.match(body)
+    if first_old and (not first_new or _tag_name(first_new.group(1)) != _tag_name(first_old.group(1))):
+        return None
+    if re.search(r"<h1\b", body, re.IGNORECASE) and not re.search(r"<h1\b", original, re.IGNORECASE):
+        return None
+    new, old = visible_length(body), visible_length(original)
+    if (longer and new <= old) or (not longer and new < old / 2):
+        return None
+    return body + original[len(original.rstrip()):]
+
+
+def build_expansion_prompt(original_prompt, draft, section, target_chars):
+    """Original request + the whole draft for context + one section to rewrite longer."""
+    return f"""{original_prompt}
+
+        --- MEVCUT TASLAK (SADECE BAĞLAM, TEKRAR YAZMA) ---
+{draft}
+
+        --- GENİŞLETİLECEK BÖLÜM ---
+        Yukarıdaki HEDEF UZUNLUK okumanın tamamı içindir; taslak bu hedefin altında kaldı.
+        Bu istekte SADECE aşağıdaki bölümü, taslağın geri kalanıyla aynı ses, üslup ve HTML yapısıyla,
+        yeni görüler, duyusal detaylar ve derinlik ekleyerek GENİŞLET: bölüm en az {target_chars} harf olsun.
+        Aynı <h2> başlığıyla başla. Diğer bölümleri, açıklama veya kod bloğu (```) ekleme.
+
+<<<GENİŞLETİLECEK_BÖLÜM>>>
+{section["html"].strip()}
+<<<BÖLÜM_SONU>>>"""
+
+
+def build_section_revision_prompt(original_prompt, draft, section, feedback):
+    """Original request + the whole draft for context + one rejected section and the critique to fix."""
+    return f"""{original_prompt}
+
+        --- MEVCUT TASLAK (SADECE BAĞLAM, TEKRAR YAZMA) ---
+{draft}
+
+        --- GRANDMASTER GERİ BİLDİRİMİ ---
+{feedback}
+
+        --- DÜZELTİLECEK BÖLÜM ---
+        Grandmaster bu bölümü reddetti; diğer bölümler onaylandı ve OLDUĞU GİBİ kalacak.
+        SADECE aşağıdaki bölümü, yukarıdaki eleştirileri gidererek, taslağın geri kalanıyla aynı ses,
+        üslup ve HTML yapısıyla YENİDEN YAZ. Uzunluğu en az aynı kalsın. Aynı başlıkla başla.
+        Diğer bölümleri, açıklama veya kod bloğu (```) ekleme.
+
+<<<DÜZELTİLECEK_BÖLÜM>>>
+{section["html"].strip()}
+<<<BÖLÜM_SONU>>>"""
@@ -1,14 +1,25 @@
 
-import os
 import time
-import json
 import re
+import hashlib
+import threading
 import google.generativeai as genai
+from gemini_client import get_client, get_model, warm_pool
+from key_pool import get_key_pool, classify_quota_error
+from retry_policy import RetryPolicy, RetryDeadlineExceeded
+from client_identity import get_client_identifier
+from telemetry import get_telemetry
+from model_router import get_model_router
+from token_estimator import get_token_estimator
+from budget import BudgetGovernor, BudgetExceeded
+from sections import split_sections, join_sections, replace_section, clean_section
+from qc_verdict import parse_verdict, failing_sections, format_issues, format_instructions
+from extraction import SPELL_SESSION_SCHEMA, json_config, run_extraction, build_spell_session
 from spell_prompts import (
     SPELL_PERSONA, SPELL_KNOWLEDGE_BASE, FORTY_PILLARS,
     INCOMPATIBILITY_MATRIX, PLANETARY_TIMING, ANCIENT_LANGUAGE_LIBRARY,
     SPELL_DIAGNOSTIC_PROMPT, SPELL_RECOMMENDATION_PROMPT,
-    SPELL_ARCHITECT_PROMPT, SPELL_QC_PROMPT,
+    SPELL_ARCHITECT_PROMPT, SPELL_QC_PROMPT, SPELL_SECTION_REVISION_PROMPT,
     SPELL_MEMORY_UPDATE_PROMPT, SPELL_DELIVERY_PROMPT
 )
 
@@ -24,24 +35,53 @@ class SpellBrain:
     EXTRACTION_MODEL = "gemini-3.1-pro-preview"
     PRICE_INPUT_PER_M = 2.00
     PRICE_OUTPUT_PER_M = 12.00
+    PRICE_IN_FLASH = 0.15
+    PRICE_OUT_FLASH = 0.60
+    # Short structured calls go to the flash tier (model_router.py); the ritual itself, QC and
+    # diagnostics stay on pro. App setting "model_routes" overrides (shared keys with OracleBrain).
+    MODEL_ROUTES = {"client_id": "flash", "spell_memory": "flash", "spell_delivery": "flash"}
     
-    def __init__(self, api_keys):
+    def __init__(self, api_keys, key_pool=None):
+        """key_pool: injected pool (tests, bench); default is the process-wide get_key_pool view."""
         self.api_keys = api_keys if isinstance(api_keys, list) else [api_keys]
         self.current_key_index = 0
         self.current_model_name = self.PRIMARY_MODEL
         self.FALLBACK_MODEL = "gemini-3-pro-preview"  # Fail-safe model
+        self._usage_lock = threading.RLock()
+        self.key_pool = key_pool or get_key_pool(self.api_keys)  # shared with OracleBrain (same process-wide key states)
+        self.retry_policy = RetryPolicy()  # same jittered backoff + deadline as OracleBrain
+        self.model_router = get_model_router()
+        self.model_routes = dict(self.MODEL_ROUTES)
+        self.client_identifier = get_client_identifier()
+        self.telemetry = get_telemetry()
+        self.token_estimator = get_token_estimator()
+        self.budget = None  # BudgetGovernor of the running spell cycle
+        self.qc_verdicts = {}  # ritual digest -> structured QC verdict (this cycle)
         self._reset_usage_stats()
+        self.generation_config, self.extraction_config, self.safety_settings = self._default_configs()
         self._configure_genai()
+        self._reinit_models()
     
     def _reset_usage_stats(self):
-        self.usage_stats = {
-            "tokens_in": 0,
-            "tokens_out": 0,
-            "total_tokens": 0,
-            "api_calls": 0,
-            "cost_usd": 0.0,
-            "qc_rounds": 0
-        }
+        with self._usage_lock:
+            self.usage_stats = {
+                "tokens_in": 0,
+                "tokens_out": 0,
+                "total_tokens": 0,
+                "api_calls": 0,
+                "cost_usd": 0.0,
+                "qc_rounds": 0,
+                "memory_context_tokens": 0,
+                "memory_tokens_saved": 0,
+                "memory_bytes_saved": 0,
+                "section_revisions": 0,
+                "qc_verdict_fallbacks": 0,
+                "routed_calls": {},
+                "extractions": 0,
+                "extraction_repairs": 0,
+                "extraction_failures": 0,
+                "budget_limit_fired": None
+            }
     
     def _track_usage(self, response, used_model_name=None):
         try:
@@ -49,27 +89,43 @@ class SpellBrain:
             if meta:
                 t_in = meta.prompt_token_count or 0
                 t_out = meta.candidates_token_count or 0
-                self.usage_stats["tokens_in"] += t_in
-                self.usage_stats["tokens_out"] += t_out
-                self.usage_stats["total_tokens"] += (t_in + t_out)
-                self.usage_stats["api_calls"] += 1
-                active_mod = used_model_name or self.current_model_name
-                if "pro" in active_mod.lower():
-                    cost = (t_in / 1_000_000 * self.PRICE_INPUT_PER_M) + (t_out / 1_000_000 * self.PRICE_OUTPUT_PER_M)
-                else:
-                    cost = (t_in / 1_000_000 * self.PRICE_IN_FLASH) + (t_out / 1_000_000 * self.PRICE_OUT_FLASH)
-                self.usage_stats["cost_usd"] += cost
-                print(f"SPELL USAGE: +{t_in} in / +{t_out} out = ${cost:.4f} (Running: ${self.usage_stats['cost_usd']:.4f})")
+                price_in, price_out = self._prices(used_model_name or self.current_model_name)
+                cost = (t_in / 1_000_000 * price_in) + (t_out / 1_000_000 * price_out)
+                with self._usage_lock:
+                    self.usage_stats["tokens_in"] += t_in
+                    self.usage_stats["tokens_out"] += t_out
+                    self.usage_stats["total_tokens"] += (t_in + t_out)
+                    self.usage_stats["api_calls"] += 1
+                    self.usage_stats["cost_usd"] += cost
+                    running = self.usage_stats['cost_usd']
+                print(f"SPELL USAGE: +{t_in} in / +{t_out} out = ${cost:.4f} (Running: ${running:.4f})")
         except Exception as e:
             print(f"SPELL USAGE TRACKING ERROR: {e}")
 
+    def _prices(self, model_name):
+        if "pro" in (model_name or "").lower():
+            return self.PRICE_INPUT_PER_M, self.PRICE_OUTPUT_PER_M
+        return self.PRICE_IN_FLASH, self.PRICE_OUT_FLASH
+
+    def _routed_model(self, agent, est_tokens=0):
+        """Model name for an agent routed to a tier (MODEL_ROUTES), or None (brain's own handles)."""
+        tier = self.model_routes.get(agent)
+        return self.model_router.choose(tier, est_tokens, self._prices) if tier else None
+
+    def _get_client(self, key_index=None):
+        idx = self.current_key_index if key_index is None else key_index
+        return get_client(self.api_keys[idx])
+
     def _configure_genai(self):
-        current_key = self.api_keys[self.current_key_index]
-        genai.configure(api_key=current_key)
+        # Isolated per-key client: genai.configure() would leak into other brains in this process
+        self.client = self._get_client()
         print(f"SPELL DEBUG: Switched to API Key Index {self.current_key_index}")
-        
+
+    @classmethod
+    def _default_configs(cls):
+        """(generation_config, extraction_config, safety_settings), identical for every spell brain."""
         # High creativity for ritual writing
-        self.generation_config = genai.types.GenerationConfig(
+        generation_config = genai.types.GenerationConfig(
             max_output_tokens=8192,
             temperature=1.3,
             top_p=0.95,
@@ -78,31 +134,29 @@ class SpellBrain:
         
         from google.generativeai.types import HarmCategory, HarmBlockThreshold
         
-        self.safety_settings = {
+        safety_settings = {
             HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
             HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
             HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
             HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
         }
         
-        self.model = genai.GenerativeModel(
-            self.current_model_name,
-            generation_config=self.generation_config,
-            safety_settings=self.safety_settings
-        )
-        
         # Low temp for diagnostics, extraction, QC
-        self.extraction_config = genai.types.GenerationConfig(
+        extraction_config = genai.types.GenerationConfig(
             max_output_tokens=8192,
             temperature=0.3,
             top_p=0.95,
             top_k=64,
         )
-        self.extraction_model = genai.GenerativeModel(
-            self.EXTRACTION_MODEL,
-            generation_config=self.extraction_config,
-            safety_settings=self.safety_settings
-        )
+        return generation_config, extraction_config, safety_settings
+
+    @classmethod
+    def warm_model_pool(cls, api_keys):
+        generation_config, extraction_config, safety_settings = cls._default_configs()
+        return warm_pool(api_keys, [
+            (cls.PRIMARY_MODEL, generation_config, safety_settings),
+            (cls.EXTRACTION_MODEL, extraction_config, safety_settings),
+        ])
 
     # ==================== AGENT 1: SPIRITUAL DIAGNOSTIC ====================
     def spiritual_diagnostic(self, client_note, requested_work, memory_context="", progress_callback=None):
@@ -121,7 +175,7 @@ class SpellBrain:
         if progress_callback:
             progress_callback("Spiritual Diagnostic Scan in progress...")
         
-        response = self.generate_with_retry(self.extraction_model, prompt, progress_callback=progress_callback)
+        response = self.generate_with_retry(self.extraction_model, prompt, progress_callback=progress_callback, agent="spell_diagnostic")
         return response.text
 
     # ==================== AGENT 2: SPELL RECOMMENDER ====================
@@ -142,7 +196,7 @@ class SpellBrain:
         if progress_callback:
             progress_callback("Analyzing optimal spell cocktail...")
         
-        response = self.generate_with_retry(self.extraction_model, prompt, progress_callback=progress_callback)
+        response = self.generate_with_retry(self.extraction_model, prompt, progress_callback=progress_callback, agent="spell_recommendation")
         return response.text
 
     # ==================== AGENT 3: SPELL ARCHITECT ====================
@@ -152,19 +206,7 @@ class SpellBrain:
         Writes the full ritual document. If feedback is provided, it's a revision.
         Returns the ritual HTML body text.
         """
-        prompt = SPELL_ARCHITECT_PROMPT.format(
-            persona=SPELL_PERSONA,
-            approved_spells=approved_spells,
-            diagnostic_report=diagnostic_report,
-            knowledge_base=SPELL_KNOWLEDGE_BASE,
-            ancient_languages=ANCIENT_LANGUAGE_LIBRARY,
-            forty_pillars=FORTY_PILLARS,
-            memory_context=memory_context,
-            client_note=client_note,
-            requested_work=requested_work,
-            target_length=target_length,
-            current_time=self.get_ny_time()
-        )
+        prompt = self._architect_prompt(client_note, requested_work, approved_spells, diagnostic_report, target_length, memory_context)
         
         if feedback:
             prompt += f"""
@@ -178,72 +220,129 @@ class SpellBrain:
         if progress_callback:
             progress_callback("Spell Architect channeling ritual text...")
         
-        response = self.generate_with_retry(self.model, prompt, progress_callback=progress_callback)
+        response = self.generate_with_retry(self.model, prompt, progress_callback=progress_callback, agent="spell_architect")
         return response.text
 
+    def _architect_prompt(self, client_note, requested_work, approved_spells, diagnostic_report, target_length, memory_context):
+        return SPELL_ARCHITECT_PROMPT.format(
+            persona=SPELL_PERSONA,
+            approved_spells=approved_spells,
+            diagnostic_report=diagnostic_report,
+            knowledge_base=SPELL_KNOWLEDGE_BASE,
+            ancient_languages=ANCIENT_LANGUAGE_LIBRARY,
+            forty_pillars=FORTY_PILLARS,
+            memory_context=memory_context,
+            client_note=client_note,
+            requested_work=requested_work,
+            target_length=target_length,
+            current_time=self.get_ny_time()
+        )
+
+    def revise_sections(self, ritual_text, section_ids, client_note, requested_work, approved_spells, diagnostic_report,
+                        target_length="15000", memory_context="", progress_callback=None):
+        """
+        Rewrites only the sections the QC verdict rejected, each with its own
+        issues, and splices them back. Returns None when nothing could be
+        rewritten (caller falls back to a full revision).
+        """
+        verdict = self._verdict_for(ritual_text)
+        base = self._architect_prompt(client_note, requested_work, approved_spells, diagnostic_report, target_length, memory_context)
+        sections = split_sections(ritual_text)
+        revised = 0
+        for section in [s for s in sections if s["id"] in section_ids]:
+            if progress_callback:
+                progress_callback(f"Spell Architect rewriting section '{section['title'] or section['id']}' only...")
+            prompt = base + SPELL_SECTION_REVISION_PROMPT.format(
+                ritual_text=ritual_text,
+                feedback=format_issues(verdict["issues"], section["id"]) if verdict else "",
+                section_html=section["html"].strip()
+            )
+            response = self.generate_with_retry(self.model, prompt, progress_callback=progress_callback, agent="spell_architect")
+            html = clean_section(response.text, section["html"], longer=False)
+            if html is None:
+                print(f"SPELL SECTION REVISION: '{section['title']}' rejected, section kept as is.")
+                continue
+            sections = replace_section(sections, section["id"], html)
+            revised += 1
+        with self._usage_lock:
+            self.usage_stats["section_revisions"] += revised
+        return join_sections(sections) if revised else None
+
     # ==================== AGENT 4: GRANDMASTER SPELL QC ====================
     def grandmaster_spell_qc(self, ritual_text, client_note, requested_work, progress_callback=None):
         """
         18-point quality control. Returns (bool, string) -> (IS_APPROVED, FEEDBACK)
         """
+        sections = split_sections(ritual_text)
         prompt = SPELL_QC_PROMPT.format(
             ritual_text=ritual_text,
             client_note=client_note,
             requested_work=requested_work
-        )
+        ) + format_instructions(sections, spell=True)
         
         if progress_callback:
             progress_callback("Grandmaster QC evaluating ritual text (18 criteria)...")
         
-        response = self.generate_with_retry(self.extraction_model, prompt, progress_callback=progress_callback)
-        feedback = response.text.strip()
+        response = self.generate_with_retry(self.extraction_model, prompt, progress_callback=progress_callback, agent="spell_qc")
+        verdict = parse_verdict(response.text, [s["id"] for s in sections])
+        if not verdict["structured"]:
+            with self._usage_lock:
+                self.usage_stats["qc_verdict_fallbacks"] += 1
+        self.qc_verdicts[self._digest(ritual_text)] = verdict
         
-        if "APPROVED" in feedback:
+        if verdict["approved"]:
             return True, "Approved. Flawless."
         else:
-            return False, feedback
+            return False, format_issues(verdict["issues"])
+
+    def _digest(self, text):
+        return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+    def _verdict_for(self, ritual_text):
+        return self.qc_verdicts.get(self._digest(ritual_text))
 
     # ==================== IDENTIFY CLIENT ====================
-    def identify_client(self, text):
-        from prompts import CLIENT_ID_PROMPT
-        prompt = CLIENT_ID_PROMPT.format(text=text)
-        resp = self.generate_with_retry(self.extraction_model, prompt)
-        identified_name = resp.text.strip()
+    def identify_client(self, text, memory_manager=None):
+        self.client_identifier.refresh_index(memory_manager)
+        identified_name, _ = self.client_identifier.identify(text)
+        source = "local"
+        if not identified_name:
+            from prompts import CLIENT_ID_PROMPT
+            prompt = CLIENT_ID_PROMPT.format(text=text)
+            resp = self.generate_with_retry(self.extraction_model, prompt, agent="client_id")
+            identified_name = resp.text.strip()
+            source = "llm"
+        print(f"CLIENT ID ({source}): {identified_name} | hit rate {self.client_identifier.hit_rate():.0%}")
         self.last_client_name = identified_name
         return identified_name
 
     # ==================== UPDATE MEMORY ====================
+    def extract_json(self, prompt, schema, agent):
+        """Schema-mode extraction validated locally, one repair call on a violation (mirrors OracleBrain)."""
+        config = json_config(self.extraction_config, schema)
+
+        def generate(text):
+            return self.generate_with_retry(self.extraction_model, text, agent=agent, generation_config=config).text
+
+        data, repaired, errors = run_extraction(generate, prompt, schema)
+        with self._usage_lock:
+            self.usage_stats["extractions"] += 1
+            self.usage_stats["extraction_repairs"] += int(repaired)
+            self.usage_stats["extraction_failures"] += int(bool(errors))
+        return data
+
     def update_spell_memory(self, ritual_text, memory_key, memory_manager):
         prompt = SPELL_MEMORY_UPDATE_PROMPT.format(ritual_text=ritual_text)
-        resp = self.generate_with_retry(self.extraction_model, prompt)
+        data = self.extract_json(prompt, SPELL_SESSION_SCHEMA, agent="spell_memory")
+        if data is None:
+            print(f"SPELL MEMORY WARNING: Extraction failed schema validation")
+            return False
         try:
-            json_match = re.search(r'\{.*\}', resp.text, re.DOTALL)
-            if json_match:
-                clean_json = json_match.group(0)
-                data = json.loads(clean_json)
-                
-                mem = memory_manager.load_memory(memory_key)
-                
-                new_session = {
-                    "timestamp": self.get_ny_time(),
-                    "session_type": "spell",
-                    "topic": data.get("topic", "Spell Work"),
-                    "target_name": data.get("target_name"),
-                    "spells_used": data.get("spells_used", ""),
-                    "client_tasks_given": data.get("client_tasks_given", ""),
-                    "expected_timeline": data.get("expected_timeline", ""),
-                    "warnings_given": data.get("warnings_given", ""),
-                    "specific_details": data.get("specific_details", ""),
-                    "follow_up_protocol": data.get("follow_up_protocol", ""),
-                    "reading_summary": data.get("ritual_summary", "")
-                }
-                
-                mem["sessions"].append(new_session)
-                memory_manager.save_memory(memory_key, mem)
-                return True
-            else:
-                print(f"SPELL MEMORY WARNING: No JSON found in extraction response")
-                return False
+            mem = memory_manager.load_memory(memory_key)
+            mem["sessions"].append(build_spell_session(data, self.get_ny_time()))
+            memory_manager.roll_summary(mem)  # older sessions fold into the rolling summary
+            memory_manager.save_memory(memory_key, mem)
+            return True
         except Exception as e:
             print(f"SPELL MEMORY ERROR: {e}")
             return False
@@ -256,7 +355,7 @@ class SpellBrain:
                 client_name=client_name,
                 work_type=work_type
             )
-            response = self.generate_with_retry(self.model, prompt)
+            response = self.generate_with_retry(self.model, prompt, agent="spell_delivery")
             clean_text = response.text.strip()
             clean_text = re.sub(r'<[^>]+>', '', clean_text).strip()
             return clean_text
@@ -275,6 +374,14 @@ class SpellBrain:
         from memory import MemoryManager
         mem_mgr = MemoryManager()
         self._reset_usage_stats()
+        try:
+            cycle_settings = mem_mgr.load_settings() or {}
+        except Exception as e:
+            print(f"SPELL SETTINGS LOAD ERROR (non-fatal): {e}")
+            cycle_settings = {}
+        self.model_routes.update(cycle_settings.get("model_routes") or {})
+        self.budget = BudgetGovernor.from_settings(self._spent, cycle_settings)
+        self.qc_verdicts = {}
         
         # 1. DETERMINE CLIENT
         real_client_name = None
@@ -289,7 +396,7 @@ class SpellBrain:
         if not real_client_name:
             if progress_callback:
                 progress_callback("Identifying client...")
-            extracted_name = self.identify_client(client_note)
+            extracted_name = self.identify_client(client_note, mem_mgr)
             real_client_name = extracted_name
             if memory_data:
                 memory_data["client_name"] = real_client_name
@@ -304,6 +411,11 @@ class SpellBrain:
             memory_data = mem_mgr.load_memory(memory_key)
         
         memory_context = mem_mgr.format_context_for_prompt(memory_data)
+        ctx = getattr(mem_mgr, "last_context_stats", None) or {}
+        with self._usage_lock:
+            self.usage_stats["memory_context_tokens"] = ctx.get("tokens", 0)
+            self.usage_stats["memory_tokens_saved"] = ctx.get("tokens_saved", 0)
+            self.usage_stats["memory_bytes_saved"] = ctx.get("bytes_saved", 0)
         
         if progress_callback:
             progress_callback("Memory loaded (Reading + Spell history)...")
@@ -316,20 +428,28 @@ class SpellBrain:
             client_note, requested_work, approved_spells, diagnostic_report,
             target_length, memory_context, progress_callback=progress_callback
         )
+        self._offer_draft(draft)
         
-        # 3. QC LOOP — INFINITE until 100% approval
+        # 3. QC LOOP — until approval, the 4-round floor or the cycle budget
         iteration = 0
-        qc_feedback_history = []
+        flagged_codes = []  # issue codes of earlier rounds: a full rewrite must keep them fixed
         while True:
             iteration += 1
             if progress_callback:
                 progress_callback(f"Grandmaster Spell QC — Round {iteration}...")
             
-            approved, review_notes = self.grandmaster_spell_qc(
-                draft, client_note, requested_work, progress_callback=progress_callback
-            )
+            if self.usage_stats["budget_limit_fired"]:
+                approved, review_notes = True, None  # shipping the best draft, no further QC
+            else:
+                try:
+                    approved, review_notes = self.grandmaster_spell_qc(
+                        draft, client_note, requested_work, progress_callback=progress_callback
+                    )
+                    self._offer_draft(draft, approved, review_notes)
+                except BudgetExceeded as e:
+                    draft, approved, review_notes = self._ship_best(e, progress_callback)
             
-            if approved and iteration < 4:
+            if approved and iteration < 4 and not self.usage_stats["budget_limit_fired"]:
                 approved = False
                 review_notes = "Büyü ritüeli teknik olarak onaylanabilir düzeyde, ancak antik dil kullanımı, betimlemeler ve okült derinlik açısından henüz Kusursuz değil. Mistik detayları ve enerjik aktarımı çok daha fazla güçlendirerek ritüeli GENİŞLET ve BAŞTAN YAZ. Bu bir asgari kalite testidir."
                 if progress_callback:
@@ -337,6 +457,7 @@ class SpellBrain:
 
             if approved or iteration >= 4:
                 self.usage_stats["qc_rounds"] = iteration
+                self.budget.stop()  # memory, audio and delivery are never cut off
                 if progress_callback:
                     progress_callback(f"Grandmaster Approved! (Round {iteration} — perfection achieved)")
                 
@@ -380,17 +501,57 @@ class SpellBrain:
                 
                 return draft, delivery_msg, self.usage_stats, audio_path
             
-            # Revision needed
-            qc_feedback_history.append(f"--- FAILED ATTEMPT {iteration} --- \n{review_notes}")
-            cumulative_feedback = "\n\n".join(qc_feedback_history)
+            # Revision needed: only the rejected sections when the verdict names them
+            verdict = self._verdict_for(draft)
+            failing = failing_sections(verdict) if verdict and not verdict["approved"] else None
+            feedback = review_notes
+            if flagged_codes:
+                feedback += f"\n\nPreviously flagged (keep these fixed): {', '.join(flagged_codes)}"
+            for issue in (verdict["issues"] if verdict else []):
+                if issue["code"] not in flagged_codes:
+                    flagged_codes.append(issue["code"])
             
             if progress_callback:
-                progress_callback(f"QC Round {iteration} — Revisions required. Spell Architect rewriting with {len(qc_feedback_history)} past feedback constraints...")
-            draft = self.spell_architect(
-                client_note, requested_work, approved_spells, diagnostic_report,
-                target_length, memory_context, feedback=cumulative_feedback,
-                progress_callback=progress_callback
-            )
+                progress_callback(f"QC Round {iteration} — Revisions required ({len(failing) if failing else 'all'} sections)...")
+            try:
+                self.budget.check_round(iteration + 1)
+                revised = None
+                if failing and len(failing) < len(split_sections(draft)):
+                    revised = self.revise_sections(
+                        draft, failing, client_note, requested_work, approved_spells, diagnostic_report,
+                        target_length, memory_context, progress_callback=progress_callback
+                    )
+                draft = revised or self.spell_architect(
+                    client_note, requested_work, approved_spells, diagnostic_report,
+                    target_length, memory_context, feedback=feedback,
+                    progress_callback=progress_callback
+                )
+                self._offer_draft(draft)
+            except BudgetExceeded as e:
+                draft, _, _ = self._ship_best(e, progress_callback)
+                iteration -= 1  # the shipping pass is not a QC round
+
+    # ==================== BUDGET ====================
+    def _spent(self):
+        with self._usage_lock:
+            return self.usage_stats["cost_usd"], self.usage_stats["total_tokens"]
+
+    def _offer_draft(self, draft, approved=None, notes=None):
+        """QC-approved > reviewed > unreviewed; among equals the longer ritual wins."""
+        if self.budget is not None:
+            self.budget.offer(draft, (bool(approved), approved is not None, len(draft or ""), -len(notes or "")))
+
+    def _ship_best(self, error, progress_callback=None):
+        """Budget hit: returns (best draft so far, True, note) or re-raises when nothing was written."""
+        best = self.budget.best()
+        if best is None:
+            raise error
+        self.usage_stats["budget_limit_fired"] = error.limit
+        msg = f"BUDGET LIMIT ({error}). Shipping the best ritual so far..."
+        print(msg)
+        if progress_callback:
+            progress_callback(msg)
+        return best, True, msg
 
     # ==================== UTILITY: NY TIME ====================
     def get_ny_time(self):
@@ -401,32 +562,105 @@ class SpellBrain:
         return now.strftime("%Y-%m-%d %H:%M:%S %Z")
 
     # ==================== API RETRY LOGIC (mirrors OracleBrain) ====================
-    def generate_with_retry(self, model, prompt, progress_callback=None):
+    def _calibrate_tokens(self, response, prompt_text, used_model_name=None):
+        """Feeds real usage_metadata back into the shared token estimator (never raises)."""
+        try:
+            meta = response.usage_metadata
+            model_name = used_model_name or self.current_model_name
+            cached = getattr(meta, 'cached_content_token_count', 0) or 0
+            self.token_estimator.observe(prompt_text, (meta.prompt_token_count or 0) - cached, model_name)
+            self.token_estimator.observe(response.text, meta.candidates_token_count or 0, model_name)
+        except Exception:
+            pass
+
+    def _acquire_key(self, prompt, progress_callback=None, retry=None):
+        """Least-loaded healthy key from the shared pool (mirrors OracleBrain)."""
+        retry = retry or self.retry_policy.begin()
+        est_tokens = self.token_estimator.estimate(prompt, self.current_model_name)
+        if self.budget is not None:
+            self.budget.check(est_tokens, est_tokens / 1_000_000 * self.PRICE_INPUT_PER_M)
+        while True:
+            idx, wait = self.key_pool.acquire(est_tokens)
+            if idx is not None:
+                break
+            if wait is None:
+                reset_in = min((k["available_in_s"] for k in self.key_pool.snapshot() if k["quarantined"]), default=None)
+                if reset_in is None or reset_in >= retry.remaining():
+                    err_msg = "ALL KEYS EXHAUSTED FOR TODAY. Please add a new API key."
+                    print(err_msg)
+                    if progress_callback:
+                        progress_callback(err_msg)
+                    raise Exception(err_msg)
+                wait = reset_in
+            retry.wait(retry.backoff("pool", retry_after=wait),
+                       "ALL KEYS BUSY. Waiting for the earliest available key...", progress_callback)
+
+        if idx != self.current_key_index:
+            self.current_key_index = idx
+            self._configure_genai()
+            self._reinit_models()
+            msg_active = f"Key {self.current_key_index + 1} ACTIVE. Generating response (Stand by)..."
+            print(msg_active)
+            if progress_callback: progress_callback(msg_active)
+        return idx, est_tokens
+
+    def generate_with_retry(self, model, prompt, progress_callback=None, agent=None, generation_config=None):
         from google.api_core import exceptions
         
         attempt = 0
-        consecutive_exhaustions = 0
+        # Resolve the role ONCE: after a key rotation `model` is a stale handle of the old key
+        use_extraction = model is self.extraction_model
+        agent = agent or ("spell_extraction" if use_extraction else "spell_creative")
+        retry = self.retry_policy.begin()
         while True:
             attempt += 1
+            queued = time.time()
+            key_idx, est_tokens = self._acquire_key(prompt, progress_callback, retry=retry)
+            started = time.time()
+            routed = self._routed_model(agent, est_tokens)
+            span = self.telemetry.span("generate", "spell", agent,
+                                       routed or (self.EXTRACTION_MODEL if use_extraction else self.current_model_name),
+                                       key_idx, attempt, started - queued)
             try:
-                target_model = self.model if getattr(model, 'model_name', None) == self.model.model_name else self.extraction_model
+                if routed or generation_config:
+                    target_model = get_model(self.client,
+                                             routed or (self.EXTRACTION_MODEL if use_extraction else self.current_model_name),
+                                             generation_config or (self.extraction_config if use_extraction else self.generation_config),
+                                             self.safety_settings)
+                else:
+                    target_model = self.extraction_model if use_extraction else self.model
                 response = target_model.generate_content(prompt, request_options={'timeout': 300})
                 self._track_usage(response, getattr(target_model, 'model_name', None))
-                consecutive_exhaustions = 0
+                span.ok(response)
+                self._calibrate_tokens(response, prompt, getattr(target_model, 'model_name', None))
+                meta = getattr(response, 'usage_metadata', None)
+                self.key_pool.report_success(key_idx, latency=time.time() - started,
+                                             tokens=getattr(meta, 'total_token_count', 0) or 0, est_tokens=est_tokens)
+                if routed:
+                    self.model_router.record(routed, latency=time.time() - started)
+                    with self._usage_lock:
+                        self.usage_stats["routed_calls"][routed] = self.usage_stats["routed_calls"].get(routed, 0) + 1
                 
                 # Test text extraction to catch "finish_reason 19" empty part errors
                 try:
                     _ = response.text
                 except ValueError as ve:
-                    err_msg = f"API YANIT HATASI (Bos Icerik/Block): {str(ve)[:80]}. 5s bekleyip tekrar deniyor..."
-                    print(err_msg)
-                    if progress_callback: progress_callback(err_msg)
-                    time.sleep(5)
+                    span.fail("empty")
+                    retry.wait(retry.backoff("empty"),
+                               f"API YANIT HATASI (Bos Icerik/Block): {str(ve)[:80]}. Tekrar denenecek...", progress_callback)
                     continue
                     
                 return response
+            except RetryDeadlineExceeded:
+                span.fail("deadline")
+                raise
             except (exceptions.DeadlineExceeded, exceptions.ServiceUnavailable, exceptions.InternalServerError, exceptions.RetryError) as e:
-                if self.current_model_name != self.FALLBACK_MODEL:
+                span.fail("transient")
+                self.key_pool.report_error(key_idx, "transient")
+                if routed:
+                    # The router's chain handles the fallback of routed agents
+                    self.model_router.record(routed, ok=False)
+                elif self.current_model_name != self.FALLBACK_MODEL:
                     err_msg_sleep = f"SPELL GOOGLE 3.1 ÇÖKTÜ ({type(e).__name__}). 3.0 PRO YEDEĞİNE GEÇİLİYOR..."
                     print(err_msg_sleep)
                     if progress_callback:
@@ -436,62 +670,40 @@ class SpellBrain:
                     self._configure_genai()
                     self._reinit_models()
                     continue
-                else:
-                    err_msg_sleep = f"API CONGESTED ({type(e).__name__}). Waiting 15s..."
-                    print(err_msg_sleep)
-                    if progress_callback:
-                        progress_callback(err_msg_sleep)
-                    time.sleep(15)
-                    continue
+                retry.wait(retry.backoff("transient"),
+                           f"API CONGESTED ({type(e).__name__}). Resting key {key_idx + 1}, switching to a healthy key...", progress_callback)
                     
             except exceptions.InvalidArgument as e:
-                err_msg = f"SPELL VALIDATION ERROR (Invalid Argument). Retrying in 5s... {str(e)[:100]}"
-                print(err_msg)
-                if progress_callback:
-                    progress_callback(err_msg)
-                time.sleep(5)
+                span.fail("invalid_argument")
+                self.key_pool.release(key_idx)
+                retry.wait(retry.backoff("invalid_argument"),
+                           f"SPELL VALIDATION ERROR (Invalid Argument). Retrying... {str(e)[:100]}", progress_callback)
                 
-            except exceptions.ResourceExhausted:
-                consecutive_exhaustions += 1
-                if consecutive_exhaustions >= len(self.api_keys):
-                    err_msg_sleep = "ALL KEYS EXHAUSTED. Waiting 60s..."
-                    print(err_msg_sleep)
-                    if progress_callback:
-                        progress_callback(err_msg_sleep)
-                    time.sleep(60)
-                    consecutive_exhaustions = 0
-                    continue
-
-                err_msg = f"API Limit (429). Rotating to backup key... ({consecutive_exhaustions}/{len(self.api_keys)})"
+            except exceptions.ResourceExhausted as e:
+                span.fail("quota")
+                kind, retry_after = classify_quota_error(e)
+                seconds = self.key_pool.report_error(key_idx, kind, retry_after)
+                label = "Daily Quota" if kind == "daily_quota" else "API Limit (429)"
+                err_msg = f"{label}: key {key_idx + 1} quarantined for {int(seconds)}s. Switching to a healthy key..."
                 print(err_msg)
                 if progress_callback:
                     progress_callback(err_msg)
-                
-                while True:
-                    self.current_key_index = (self.current_key_index + 1) % len(self.api_keys)
-                    if self.api_keys[self.current_key_index]:
-                        self._configure_genai()
-                        self._reinit_models()
-                        
-                        msg_active = f"Key {self.current_key_index + 1} ACTIVE. Generating response (Stand by)..."
-                        print(msg_active)
-                        if progress_callback: progress_callback(msg_active)
-                        break
             except Exception as e:
-                err_msg = f"SPELL UNEXPECTED ERROR ({type(e).__name__}): {str(e)[:150]}... Retrying in 10s..."
-                print(err_msg)
-                if progress_callback:
-                    progress_callback(err_msg)
-                time.sleep(10)
+                if routed and type(e).__name__ in ("NotFound", "PermissionDenied"):
+                    span.fail("model_unavailable")
+                    self.key_pool.release(key_idx)
+                    self.model_router.record(routed, ok=False, permanent=True)
+                    continue
+                span.fail("other")
+                self.key_pool.report_error(key_idx, "other")
+                if routed:
+                    self.model_router.record(routed, ok=False)
+                retry.wait(retry.backoff("other"),
+                           f"SPELL UNEXPECTED ERROR ({type(e).__name__}): {str(e)[:150]}... Retrying...", progress_callback)
+            finally:
+                span.end()
 
     def _reinit_models(self):
-        self.model = genai.GenerativeModel(
-            self.current_model_name,
-            generation_config=self.generation_config,
-            safety_settings=self.safety_settings
-        )
-        self.extraction_model = genai.GenerativeModel(
-            self.EXTRACTION_MODEL,
-            generation_config=self.extraction_config,
-            safety_settings=self.safety_settings
-        )
+        self.client = self._get_client()
+        self.model = get_model(self.client, self.current_model_name, self.generation_config, self.safety_settings)
+        self.extraction_model = get_model(self.client, self.EXTRACTION_MODEL, self.extraction_config, self.safety_settings)
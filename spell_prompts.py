@@ -823,6 +823,26 @@ If ANY criterion fails:
 
 
 
+# ======================== SPELL SECTION REVISION PROMPT ========================
+# Appended to the architect prompt when QC rejected only some sections.
+
+SPELL_SECTION_REVISION_PROMPT = """
+
+--- CURRENT RITUAL (CONTEXT ONLY, DO NOT REWRITE IT) ---
+{ritual_text}
+
+--- GRANDMASTER QC FEEDBACK FOR THIS SECTION ---
+{feedback}
+
+--- SECTION TO REWRITE ---
+The Grandmaster rejected only this section; every other section is approved and stays exactly as it is.
+Rewrite ONLY the section below, fixing the issues above, in the same voice, with the same HTML wrapper and heading.
+Keep it at least as long. Do not add other sections, explanations or code fences (```).
+
+<<<SECTION_TO_REWRITE>>>
+{section_html}
+<<<SECTION_END>>>"""
+
 # ======================== SPELL MEMORY UPDATE PROMPT ========================
 
 SPELL_MEMORY_UPDATE_PROMPT = """
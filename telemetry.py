@@ -0,0 +1,288 @@
+"""
+Telemetry for Nes Shine Oracle
+One structured span per LLM call attempt (generate or stream) in OracleBrain
+and SpellBrain: agent, model, key, attempt, queue wait, time-to-first-token,
+latency, tokens, retry cause and ROT13 fallback. Spans are appended to a
+rotating JSONL file and feed rolling per-agent quantiles, served as Prometheus
+text on METRICS_PORT (GET /metrics).
+"""
+
+import os
+import json
+import math
+import time
+import logging
+import threading
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "llm_spans.jsonl")
+MAX_BYTES = 10 * 1024 * 1024   # per JSONL file before rotation
+BACKUP_COUNT = 5               # rotated files kept (llm_spans.jsonl.1 ... .5)
+WINDOW = 1000                  # spans per agent kept for quantiles
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Span:
+    """A single API call attempt. end() is idempotent and always records the span."""
+
+    def __init__(self, telemetry, kind, brain, agent, model, key_index, attempt, queue_wait=0.0, rot13=False, **extra):
+        self._telemetry = telemetry
+        self._started = telemetry.clock()
+        self.kind = kind
+        self.brain = brain
+        self.agent = agent
+        self.model = (model or "").replace("models/", "")
+        self.key_index = key_index
+        self.attempt = attempt
+        self.queue_wait = queue_wait
+        self.rot13 = rot13
+        self.extra = extra
+        self.ttft = None
+        self.latency = None
+        self.tokens_in = 0
+        self.tokens_out = 0
+        self.status = "abandoned"  # until ok() or fail(): e.g. the caller stopped reading a stream
+        self.retry_cause = None
+        self._ended = False
+
+    def _stop(self):
+        if self.latency is None:
+            self.latency = self._telemetry.clock() - self._started
+
+    def first_token(self):
+        if self.ttft is None:
+            self.ttft = self._telemetry.clock() - self._started
+
+    def tokens(self, t_in, t_out):
+        self.tokens_in, self.tokens_out = t_in or 0, t_out or 0
+
+    def ok(self, response=None):
+        """Call returned; token counts are taken from the response metadata when given."""
+        self._stop()
+        if self.ttft is None:
+            self.ttft = self.latency  # non-streaming: the whole answer is the first token
+        meta = getattr(response, "usage_metadata", None)
+        if meta is not None:
+            self.tokens(getattr(meta, "prompt_token_count", 0), getattr(meta, "candidates_token_count", 0))
+        self.status = "ok"
+
+    def fail(self, cause):
+        """Attempt failed and will be retried (or given up) because of `cause`."""
+        self._stop()
+        self.status = "error"
+        self.retry_cause = cause
+
+    def end(self):
+        if self._ended:
+            return
+        self._ended = True
+        self._stop()
+        self._telemetry.record(self.to_dict())
+
+    def to_dict(self):
+        record = {
+            "ts": round(self._started, 3),
+            "kind": self.kind,
+            "brain": self.brain,
+            "agent": self.agent,
+            "model": self.model,
+            "key_index": self.key_index,
+            "attempt": self.attempt,
+            "queue_wait_s": round(self.queue_wait, 3),
+            "ttft_s": None if self.ttft is None else round(self.ttft, 3),
+            "latency_s": None if self.latency is None else round(self.latency, 3),
+            "tokens_in": self.tokens_in,
+            "tokens_out": self.tokens_out,
+            "status": self.status,
+            "retry_cause": self.retry_cause,
+            "rot13": self.rot13,
+        }
+        record.update(self.extra)
+        return record
+
+
+class _AgentStats:
+    def __init__(self, window):
+        self.latency = deque(maxlen=window)
+        self.ttft = deque(maxlen=window)
+        self.queue_wait = deque(maxlen=window)
+        self.latency_sum = 0.0
+        self.count = 0
+        self.calls = {}     # status -> n
+        self.retries = {}   # cause -> n
+        self.tokens_in = 0
+        self.tokens_out = 0
+        self.rot13 = 0
+
+
+def _quantile(samples, q):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]  # nearest rank
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+class Telemetry:
+    def __init__(self, path=None, max_bytes=MAX_BYTES, backup_count=BACKUP_COUNT, window=WINDOW, clock=time.time):
+        self.path = path or os.environ.get("TELEMETRY_PATH", DEFAULT_PATH)
+        self.window = window
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._agents = {}
+        self._server = None
+        self._logger = logging.getLogger(f"oracle.telemetry.{id(self)}")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            handler = RotatingFileHandler(self.path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._logger.addHandler(handler)
+        except Exception as e:
+            # Read-only disk etc.: keep the in-memory metrics, skip the JSONL
+            print(f"TELEMETRY FILE DISABLED: {e}")
+
+    def span(self, kind, brain, agent, model, key_index, attempt, queue_wait=0.0, rot13=False, **extra):
+        return Span(self, kind, brain, agent, model, key_index, attempt, queue_wait, rot13, **extra)
+
+    def record(self, span_dict):
+        try:
+            self._logger.info(json.dumps(span_dict, ensure_ascii=False))
+        except Exception as e:
+            print(f"TELEMETRY WRITE ERROR (non-fatal): {e}")
+        agent = span_dict.get("agent") or "unknown"
+        with self._lock:
+            stats = self._agents.setdefault(agent, _AgentStats(self.window))
+            if span_dict.get("latency_s") is not None:
+                stats.latency.append(span_dict["latency_s"])
+                stats.latency_sum += span_dict["latency_s"]
+                stats.count += 1
+            if span_dict.get("ttft_s") is not None:
+                stats.ttft.append(span_dict["ttft_s"])
+            stats.queue_wait.append(span_dict.get("queue_wait_s") or 0.0)
+            status = span_dict.get("status", "ok")
+            stats.calls[status] = stats.calls.get(status, 0) + 1
+            if span_dict.get("retry_cause"):
+                cause = span_dict["retry_cause"]
+                stats.retries[cause] = stats.retries.get(cause, 0) + 1
+            stats.tokens_in += span_dict.get("tokens_in") or 0
+            stats.tokens_out += span_dict.get("tokens_out") or 0
+            stats.rot13 += int(bool(span_dict.get("rot13")))
+
+    def summary(self):
+        """{agent: {"calls", "latency_p50", "latency_p95", "latency_p99", "ttft_p95", "queue_wait_p95", ...}}"""
+        with self._lock:
+            agents = {name: (list(s.latency), list(s.ttft), list(s.queue_wait), dict(s.calls), dict(s.retries))
+                      for name, s in self._agents.items()}
+        result = {}
+        for name, (latency, ttft, queue_wait, calls, retries) in agents.items():
+            row = {"calls": sum(calls.values()), "retries": retries}
+            for q in QUANTILES:
+                pct = int(q * 100)
+                row[f"latency_p{pct}"] = _quantile(latency, q)
+                row[f"ttft_p{pct}"] = _quantile(ttft, q)
+                row[f"queue_wait_p{pct}"] = _quantile(queue_wait, q)
+            result[name] = row
+        return result
+
+    def render_prometheus(self):
+        """Prometheus text exposition: per-agent latency/TTFT/queue-wait summaries and counters."""
+        with self._lock:
+            snapshot = {name: (list(s.latency), list(s.ttft), list(s.queue_wait), s.latency_sum, s.count,
+                               dict(s.calls), dict(s.retries), s.tokens_in, s.tokens_out, s.rot13)
+                        for name, s in sorted(self._agents.items())}
+        lines = []
+
+        def summary(metric, help_text, index):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} summary")
+            for agent, data in snapshot.items():
+                samples = data[index]
+                for q in QUANTILES:
+                    value = _quantile(samples, q)
+                    if value is not None:
+                        lines.append(f'{metric}{{agent="{_label(agent)}",quantile="{q}"}} {value}')
+                if index == 0:
+                    lines.append(f'{metric}_sum{{agent="{_label(agent)}"}} {data[3]}')
+                    lines.append(f'{metric}_count{{agent="{_label(agent)}"}} {data[4]}')
+                else:
+                    lines.append(f'{metric}_sum{{agent="{_label(agent)}"}} {sum(samples)}')
+                    lines.append(f'{metric}_count{{agent="{_label(agent)}"}} {len(samples)}')
+
+        summary("oracle_llm_latency_seconds", "LLM call latency per agent (rolling window quantiles).", 0)
+        summary("oracle_llm_ttft_seconds", "Time to first token per agent (rolling window quantiles).", 1)
+        summary("oracle_llm_queue_wait_seconds", "Time spent waiting for a key per agent (rolling window quantiles).", 2)
+
+        lines.append("# HELP oracle_llm_calls_total LLM call attempts by agent and status.")
+        lines.append("# TYPE oracle_llm_calls_total counter")
+        for agent, data in snapshot.items():
+            for status, n in sorted(data[5].items()):
+                lines.append(f'oracle_llm_calls_total{{agent="{_label(agent)}",status="{_label(status)}"}} {n}')
+        lines.append("# HELP oracle_llm_retries_total Failed attempts by agent and retry cause.")
+        lines.append("# TYPE oracle_llm_retries_total counter")
+        for agent, data in snapshot.items():
+            for cause, n in sorted(data[6].items()):
+                lines.append(f'oracle_llm_retries_total{{agent="{_label(agent)}",cause="{_label(cause)}"}} {n}')
+        lines.append("# HELP oracle_llm_tokens_total Tokens by agent and direction.")
+        lines.append("# TYPE oracle_llm_tokens_total counter")
+        for agent, data in snapshot.items():
+            lines.append(f'oracle_llm_tokens_total{{agent="{_label(agent)}",direction="in"}} {data[7]}')
+            lines.append(f'oracle_llm_tokens_total{{agent="{_label(agent)}",direction="out"}} {data[8]}')
+        lines.append("# HELP oracle_llm_rot13_calls_total Attempts sent through the ROT13 block bypass.")
+        lines.append("# TYPE oracle_llm_rot13_calls_total counter")
+        for agent, data in snapshot.items():
+            lines.append(f'oracle_llm_rot13_calls_total{{agent="{_label(agent)}"}} {data[9]}')
+        return "\n".join(lines) + "\n"
+
+    # ==================== METRICS ENDPOINT ====================
+    def serve(self, port, host="0.0.0.0"):
+        """Starts the /metrics endpoint in a daemon thread (once per process)."""
+        if self._server is not None:
+            return self._server
+        from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+        telemetry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = telemetry.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass  # scrapes would flood the app log
+
+        try:
+            self._server = ThreadingHTTPServer((host, int(port)), MetricsHandler)
+        except Exception as e:
+            print(f"METRICS ENDPOINT DISABLED (port {port}): {e}")
+            return None
+        threading.Thread(target=self._server.serve_forever, name="oracle-metrics", daemon=True).start()
+        print(f"METRICS: Prometheus endpoint on :{self._server.server_address[1]}/metrics")
+        return self._server
+
+
+_TELEMETRY = None
+_TELEMETRY_LOCK = threading.Lock()
+
+
+def get_telemetry():
+    """Process-wide telemetry; starts the metrics endpoint when METRICS_PORT is set."""
+    global _TELEMETRY
+    with _TELEMETRY_LOCK:
+        if _TELEMETRY is None:
+            _TELEMETRY = Telemetry()
+            port = os.environ.get("METRICS_PORT")
+            if port:
+                _TELEMETRY.serve(port)
+        return _TELEMETRY
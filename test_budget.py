@@ -0,0 +1,98 @@
+import sys
+import json
+sys.path.insert(0, '.')
+import pytest
+from budget import BudgetGovernor, BudgetExceeded
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_each_limit_fires_by_name():
+    spent = {"usd": 0.0, "tokens": 0}
+    clock = FakeClock()
+    gov = BudgetGovernor(lambda: (spent["usd"], spent["tokens"]), max_usd=1.0, max_tokens=1000,
+                         max_seconds=60, max_rounds=3, clock=clock)
+    gov.check(est_tokens=900, est_usd=0.5)
+    with pytest.raises(BudgetExceeded) as e:
+        gov.check(est_tokens=1001)
+    assert e.value.limit == "max_tokens" and gov.fired == "max_tokens"
+
+    spent["usd"] = 0.9
+    with pytest.raises(BudgetExceeded, match="max_usd"):
+        gov.check(est_usd=0.2)
+    clock.now += 61
+    with pytest.raises(BudgetExceeded, match="max_seconds"):
+        gov.check()
+    with pytest.raises(BudgetExceeded, match="max_rounds"):
+        gov.check_round(4)
+    assert gov.fired == "max_tokens"  # the first limit that fired is the one reported
+
+    gov.stop()
+    gov.check(est_tokens=10 ** 9)
+    gov.check_round(99)
+
+
+def test_best_draft_and_settings():
+    gov = BudgetGovernor.from_settings(lambda: (0.0, 0), {"budget_limits": {"max_usd": "2.5", "max_rounds": 0, "bogus": 1}})
+    assert gov.limits["max_usd"] == 2.5 and gov.limits["max_rounds"] is None
+    assert gov.best() is None
+    gov.offer("unreviewed", (False, False, 1.0))
+    gov.offer("rejected", (False, True, 0.9))
+    gov.offer("approved", (True, True, 0.5))
+    gov.offer("late unreviewed", (False, False, 1.0))
+    assert gov.best() == "approved"
+
+
+def never_approve(prompt, model_name):
+    from fake_backend import default_responder
+    if "İNCELENECEK TASLAK" in prompt:
+        return "REVISE: daha fazla derinlik gerekli."
+    return default_responder(prompt, model_name)
+
+
+def run_reading(tmp_path, monkeypatch, limits, setup=None, branches=1):
+    from agents import OracleBrain
+    from key_pool import KeyPool
+    from telemetry import Telemetry
+    from response_cache import ResponseCache
+    from test_key_pool import DictStore
+    from fake_backend import FakeGemini, Latency, installed
+
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "app_settings.json").write_text(json.dumps({"budget_limits": limits}))
+    backend = FakeGemini(latency=Latency(median=0.0, sigma=0.0), time_scale=0.0, responder=never_approve)
+    keys = ["AIzaTestKey-budget-000000000000", "AIzaTestKey-budget-111111111111"]
+    with installed(gemini=backend):
+        brain = OracleBrain(keys, key_pool=KeyPool(keys, store=DictStore()))
+        brain.telemetry = Telemetry(path=str(tmp_path / "spans.jsonl"))
+        brain.response_cache = ResponseCache(path=str(tmp_path / "responses.sqlite3"))
+        if setup:
+            setup(brain)
+        draft, delivery, usage, _ = brain.run_cycle("Hi Nes, my name is Julie. Will Tom come back?", "Love",
+                                                    target_length="1500", speculative_branches=branches)
+    return draft, delivery, usage
+
+
+def test_round_limit_ships_best_draft(tmp_path, monkeypatch):
+    draft, delivery, usage = run_reading(tmp_path, monkeypatch, {"max_rounds": 2})
+    assert draft.endswith("</div>") and delivery
+    assert usage["budget_limit_fired"] == "max_rounds"
+    assert usage["qc_rounds"] == 2
+
+
+def test_cost_limit_stops_before_the_next_call(tmp_path, monkeypatch):
+    draft, delivery, usage = run_reading(tmp_path, monkeypatch, {"max_usd": 0.01})
+    assert draft.endswith("</div>")
+    assert usage["budget_limit_fired"] == "max_usd"
+    assert usage["qc_rounds"] < 4
+
+
+def test_limit_before_any_draft_raises(tmp_path, monkeypatch):
+    with pytest.raises(BudgetExceeded, match="max_usd"):
+        run_reading(tmp_path, monkeypatch, {"max_usd": 0.0005})
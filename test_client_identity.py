@@ -0,0 +1,76 @@
+import sys
+sys.path.insert(0, '.')
+from client_identity import ClientIdentifier, first_name
+
+
+CHAT_EXPORT = """Marissa Angelique 11/11
+Eamon Mitchell 12/30
+
+I need to spy on their marriage again
+Message:Yes, stuff happened when he was 12
+Marissa
+Message:I love our sessions together. I really appreciate it!!
+7:28 PM
+Marissa
+Message:Had another vision of me being sick
+"""
+
+
+def test_chat_export_sender_lines_resolve_locally():
+    ident = ClientIdentifier()
+    assert ident.identify(CHAT_EXPORT)[0] == "Marissa"
+
+
+def test_labels_and_signoffs():
+    ident = ClientIdentifier()
+    assert ident.identify("Hi Nes, my name is Julie and I was born 3/4.")[0] == "Julie"
+    assert ident.identify("Will Tom come back to me?\n\nLove,\nSarah")[0] == "Sarah"
+    assert ident.identify("Will Tom come back?\n- Sarah")[0] == "Sarah"
+
+
+def test_third_party_names_are_not_the_client():
+    ident = ClientIdentifier()
+    assert ident.identify("I need to know about him. His name is David and we broke up in May.")[0] is None
+    assert ident.identify("Please read for my daughter, her name is Emma.")[0] is None
+    assert ident.identify("My ex's name is Tom.\nName: Julie")[0] == "Julie"
+    assert ident.candidates("My partner's name: David\nLove,\nDavid")["David"] < 0.1
+    assert ident.identify("Hi! I'm Julie. Will he come back?")[0] is None  # "I'm" alone stays below threshold
+    assert ident.identify("Hi! I'm Julie. Will he come back?\n- Julie")[0] == "Julie"
+
+
+def test_weak_or_missing_signals_fall_back_to_llm():
+    ident = ClientIdentifier()
+    assert ident.identify("House built in 1887. Living here 54 years.") == (None, 0.0)
+    name, confidence = ident.identify("Sarah 4/5\nwill he come back?")
+    assert name is None and 0 < confidence < ident.threshold
+    assert ident.stats == {"local_hits": 0, "llm_fallbacks": 2}
+
+
+def test_known_client_index_raises_confidence():
+    ident = ClientIdentifier()
+    assert ident.build_index(["Sarah Connor", "fatsy2k@yahoo.co.uk", "Unknown Client"]) == 1
+    assert ident.identify("Sarah 4/5\nwill he come back?")[0] == "Sarah"
+    assert first_name("fatsy2k@yahoo.co.uk") is None
+
+
+def test_brain_skips_llm_on_local_hit(tmp_path):
+    from agents import OracleBrain
+    from telemetry import Telemetry
+    from test_key_pool import DictStore
+    from key_pool import KeyPool
+    keys = ["AIzaTestKey-client-id-0000"]
+    brain = OracleBrain(keys, key_pool=KeyPool(keys, store=DictStore()))
+    brain.telemetry = Telemetry(path=str(tmp_path / "spans.jsonl"))
+    brain.client_identifier = ClientIdentifier()
+    calls = []
+
+    class Resp:
+        text = "Unknown"
+
+    brain.generate_cached = lambda model, prompt, progress_callback=None, agent=None: calls.append(prompt) or Resp()
+    assert brain.identify_client(CHAT_EXPORT) == "Marissa"
+    assert brain.identify_client("House built in 1887.") == "Unknown"
+    assert len(calls) == 1
+    assert brain.usage_stats["client_id_local_hits"] == 1
+    assert brain.usage_stats["client_id_llm_calls"] == 1
+    assert brain.client_identifier.hit_rate() == 0.5
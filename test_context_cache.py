@@ -0,0 +1,81 @@
+import sys
+sys.path.insert(0, '.')
+from context_cache import ContextCache, LocalCacheBackend, REFRESH_MARGIN
+
+
+class FakeClock:
+    def __init__(self, start=1_800_000_000.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+
+class FakeClient:
+    def __init__(self, api_key):
+        self.api_key = api_key
+
+
+PREFIX = "NES SHINE CORE " * 600
+MEMORY = "--- HAFIZA --- previous sessions " * 50
+
+
+def test_prefix_is_created_once_and_reused():
+    backend = LocalCacheBackend()
+    cache = ContextCache(backend=backend, clock=FakeClock())
+    client = FakeClient("key-a-000000000000")
+    first = cache.get(client, "gemini-3.1-pro-preview", PREFIX, MEMORY)
+    second = cache.get(client, "gemini-3.1-pro-preview", PREFIX, MEMORY)
+    assert first["created"] and not second["created"]
+    assert first["name"] == second["name"]
+    assert backend.create_calls == 1
+    assert cache.stats["reused"] == 1
+
+
+def test_handles_are_scoped_per_key():
+    backend = LocalCacheBackend()
+    cache = ContextCache(backend=backend, clock=FakeClock())
+    a = cache.get(FakeClient("key-a-000000000000"), "m", PREFIX, MEMORY)
+    b = cache.get(FakeClient("key-b-000000000000"), "m", PREFIX, MEMORY)
+    assert a["name"] != b["name"]
+    assert backend.create_calls == 2
+
+
+def test_small_prefix_and_failures_fall_back_inline():
+    backend = LocalCacheBackend(fail=True)
+    cache = ContextCache(backend=backend, clock=FakeClock())
+    client = FakeClient("key-a-000000000000")
+    assert cache.get(client, "m", "tiny") is None
+    assert backend.create_calls == 0
+    assert cache.get(client, "m", PREFIX, MEMORY) is None
+    # Same size again: the refused estimate is remembered, no second API call
+    assert cache.get(client, "m", PREFIX, MEMORY) is None
+    assert backend.create_calls == 1
+
+
+def test_expiring_handle_is_recreated_and_release_deletes():
+    clock = FakeClock()
+    backend = LocalCacheBackend()
+    cache = ContextCache(backend=backend, ttl=600, clock=clock)
+    client = FakeClient("key-a-000000000000")
+    first = cache.get(client, "m", PREFIX, MEMORY)
+    clock.now += 600 - REFRESH_MARGIN
+    second = cache.get(client, "m", PREFIX, MEMORY)
+    assert second["created"] and second["name"] != first["name"]
+    assert first["name"] not in backend.entries
+    assert cache.release_all() == 1
+    assert backend.entries == {}
+
+
+def test_failed_cycle_still_releases_the_prefix(tmp_path, monkeypatch):
+    import pytest
+    from budget import BudgetExceeded
+    from test_budget import run_reading
+    released = []
+
+    def setup(brain):
+        brain.context_cache.release_all = lambda: released.append(True)
+
+    with pytest.raises(BudgetExceeded):
+        run_reading(tmp_path, monkeypatch, {"max_usd": 0.0005}, setup=setup)  # no draft to ship
+    assert released == [True]
@@ -0,0 +1,101 @@
+import sys
+sys.path.insert(0, '.')
+import pytest
+from google.api_core import exceptions
+from continuation import (stitch, validate_continuation, ContinuationStitcher,
+                          ContinuationRejected, build_continuation_prompt, MIN_RESUME_CHARS)
+
+PARTIAL = "<h1>The Veil</h1>\n<p>" + "The candle leaned toward the north wall. " * 20 + "and the moon"
+
+
+def test_stitch_removes_echoed_tail():
+    assert stitch(PARTIAL, "and the moon turned silver.</p>") == " turned silver.</p>"
+
+
+def test_stitch_removes_echoed_sentence_with_different_spacing():
+    cont = "```html\nThe candle leaned toward the north wall. and the moon rose.</p>"
+    assert stitch(PARTIAL, cont) == " rose.</p>"
+
+
+def test_stitch_keeps_clean_continuation():
+    assert stitch(PARTIAL, " rose over the hill.</p>") == " rose over the hill.</p>"
+
+
+def test_restarted_document_is_rejected():
+    ok, reason = validate_continuation(PARTIAL, "<h1>The Veil</h1><p>The candle...")
+    assert not ok and "h1" in reason
+    stitcher = ContinuationStitcher(PARTIAL, window=10)
+    with pytest.raises(ContinuationRejected):
+        stitcher.feed("Sure! Here is the rest of the reading")
+
+
+def test_empty_continuation_is_rejected_unless_partial_is_closed():
+    with pytest.raises(ContinuationRejected):
+        ContinuationStitcher(PARTIAL).finish()
+    assert ContinuationStitcher(PARTIAL + " rose.</p>\n</div>").finish() == ""
+
+
+def test_continuation_prompt_carries_partial():
+    prompt = build_continuation_prompt("ORIGINAL REQUEST", PARTIAL)
+    assert prompt.startswith("ORIGINAL REQUEST") and PARTIAL in prompt
+
+
+class FakeChunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeCount:
+    total_tokens = 100
+
+
+class FlakyStreamModel:
+    """First call dies mid-stream, second call continues the text."""
+    model_name = "models/gemini-3.1-pro-preview"
+
+    def __init__(self, first, second):
+        self.first, self.second = first, second
+        self.prompts = []
+
+    def count_tokens(self, text):
+        return FakeCount()
+
+    def generate_content(self, prompt, stream=False, request_options=None):
+        self.prompts.append(prompt)
+        if len(self.prompts) == 1:
+            return self._broken()
+        return iter([FakeChunk(self.second)])
+
+    def _broken(self):
+        yield FakeChunk(self.first)
+        raise exceptions.ServiceUnavailable("stream dropped")
+
+
+def test_broken_stream_is_continued_not_restarted(tmp_path):
+    from agents import OracleBrain
+    from key_pool import KeyPool
+    from telemetry import Telemetry
+    from test_key_pool import DictStore
+    keys = ["AIzaTestKey-continuation-000000", "AIzaTestKey-continuation-111111"]
+    brain = OracleBrain(keys, key_pool=KeyPool(keys, store=DictStore()))
+    brain.telemetry = Telemetry(path=str(tmp_path / "spans.jsonl"))
+    brain._configure_genai = lambda: None
+    first = "<p>" + "x" * (MIN_RESUME_CHARS + 50) + " and the silver moon"
+    model = FlakyStreamModel(first, "and the silver moon rose.</p>")
+    brain.model = model
+    brain._reinit_models = lambda: None
+
+    text = ""
+    resets = 0
+    for chunk in brain.stream_with_retry(model, "WRITE THE READING"):
+        if chunk == "__RESET_STREAM__":
+            resets += 1
+            text = ""
+            continue
+        text += chunk
+
+    assert resets == 1  # only the initial one
+    assert text == first + " rose.</p>"
+    assert first in model.prompts[1]
+    assert brain.usage_stats["stream_resumes"] == 1
+    assert brain.usage_stats["api_calls"] == 2  # broken segment is billed too
@@ -0,0 +1,54 @@
+import sys
+sys.path.insert(0, '.')
+from convergence import ConvergenceDetector, similarity, repeated_share, SWITCH_DIRECTIVE
+from test_budget import run_reading
+
+BASE = " ".join(f"kelime{i}" for i in range(400))
+
+
+def test_similarity_ignores_markup():
+    assert similarity("<p>" + BASE + "</p>", BASE) == 1.0
+    assert similarity(BASE, " ".join(f"baska{i}" for i in range(400))) == 0.0
+    assert repeated_share("Giriş zayıf. Sonuç çok kısa.", "Sonuç çok kısa. Giriş zayıf.") > 0.6
+    assert repeated_share("", "Sonuç çok kısa.") == 0.0
+
+
+def test_progress_resets_and_stalls_switch_then_stop():
+    det = ConvergenceDetector()
+    assert det.observe(BASE, "Giriş zayıf, sahne eksik.") is None
+    assert det.observe(BASE + " " + " ".join(f"yeni{i}" for i in range(200)), "Tamamen farklı bir eleştiri burada.") is None
+    draft = BASE + " " + " ".join(f"yeni{i}" for i in range(200))
+    assert det.observe(draft + " son", None) == "switch" and det.reason == "drafts_converged"
+    assert det.observe(draft + " son kez", None) == "stop"
+    assert det.switches == 1 and det.history[0]["similarity"] is None
+
+
+def test_repeated_feedback_is_a_stall_even_if_the_draft_changed():
+    det = ConvergenceDetector()
+    notes = "Sonuç bölümü çok kısa ve kart anlamları yüzeysel kalıyor."
+    det.observe(BASE, notes)
+    assert det.observe(" ".join(f"baska{i}" for i in range(400)), notes) == "switch"
+    assert det.reason == "repeated_feedback"
+    assert det.switch_feedback(notes) == SWITCH_DIRECTIVE + notes
+
+
+def test_run_cycle_stops_when_rewrites_stop_moving(tmp_path, monkeypatch):
+    draft, delivery, usage = run_reading(tmp_path, monkeypatch, {})
+    assert draft.endswith("</div>") and delivery
+    assert usage["convergence_stop"] == "drafts_converged"
+    assert usage["convergence_switches"] == 1
+    assert usage["qc_rounds"] == 3 and usage["rounds_saved"] == 1
+    assert usage["budget_limit_fired"] is None
+
+
+def test_lint_rejected_rounds_are_not_stalls(tmp_path, monkeypatch):
+    from agents import OracleBrain
+    # Completely different drafts that all fail the length rule: the lint feedback repeats, the drafts do not
+    drafts = iter(f"<h1>Reading</h1>\n<p>{' '.join(f'draft{n}word{i}' for i in range(30))}</p>\n</div>" for n in range(10))
+
+    def setup(brain):
+        brain.medium_agent = lambda *args, **kwargs: next(drafts)
+
+    draft, delivery, usage = run_reading(tmp_path, monkeypatch, {}, setup=setup)
+    assert usage["convergence_stop"] is None and usage["convergence_switches"] == 0
+    assert usage["qc_rounds"] == OracleBrain.MIN_QC_ROUNDS and usage["lint_rejections"] == OracleBrain.MIN_QC_ROUNDS
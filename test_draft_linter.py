@@ -0,0 +1,66 @@
+import sys
+sys.path.insert(0, '.')
+from draft_linter import lint, strip_fences
+from fake_backend import fake_document
+
+CLEAN = fake_document(3000)
+
+
+def test_clean_draft_passes():
+    assert lint(CLEAN, "3000") == {"passed": True, "hits": [], "feedback": ""}
+    chant = CLEAN.replace("</div>", '<div class="chantblock"><div class="latinverse">Veritas est lux</div></div>\n</div>')
+    assert lint(chant, "3000")["passed"]  # Latin "est" is not a timezone
+    assert lint(CLEAN.replace("Paragraph 2", "On 2025-03-14 the tide"), "3000")["hits"] == ["timestamp"]
+
+
+def test_each_rule_fires():
+    cases = {
+        "length": CLEAN,
+        "fences": "```html\n" + CLEAN,
+        "tags": CLEAN.replace("</p>", "", 1),
+        "dashes": CLEAN.replace("slowly but", "slowly — but", 1),
+        "turkish": CLEAN.replace("Paragraph 3:", "Bu çok güzel bir okuma ve seni bekliyor:", 1),
+        "timestamp": CLEAN.replace("Paragraph 4:", "It has been 2 hours ago since 14:05.", 1),
+        "internal": CLEAN.replace("Paragraph 5:", "[HATA: retry] APPROVED", 1),
+    }
+    for rule, draft in cases.items():
+        result = lint(draft, "6000" if rule == "length" else "3000")
+        assert result["hits"] == [rule], (rule, result["hits"])
+        assert not result["passed"] and result["feedback"].startswith("REVISE")
+
+
+def test_hyphenated_words_are_dashes_but_ranges_of_digits_are_not():
+    assert "dashes" in lint(CLEAN.replace("quiet truth", "quiet well-being", 1), "3000")["hits"]
+    assert lint(CLEAN.replace("Paragraph 6", "Paragraph 6-7", 1), "3000")["passed"]
+
+
+def test_ordinary_prose_is_not_an_internal_note_or_timestamp():
+    for prose in ("your love will be approved", "revise your plans", "the Grandmaster card",
+                  "you keep seeing 11:11 and 12:12"):
+        assert lint(CLEAN.replace("Paragraph 5:", prose, 1), "3000")["passed"], prose
+    assert lint(CLEAN.replace("Paragraph 5:", "Grandmaster: REVISE", 1), "3000")["hits"] == ["internal"]
+    assert lint(CLEAN.replace("Paragraph 5:", "It is 14:05 now", 1), "3000")["hits"] == ["timestamp"]
+
+
+def test_strip_fences():
+    assert strip_fences("```html\n<h1>x</h1>\n```") == "<h1>x</h1>"
+    assert strip_fences("<h1>x</h1>") == "<h1>x</h1>"
+
+
+def test_linted_draft_never_reaches_the_grandmaster(tmp_path):
+    from agents import OracleBrain
+    from key_pool import KeyPool
+    from telemetry import Telemetry
+    from test_key_pool import DictStore
+    from fake_backend import FakeGemini, Latency, installed
+
+    backend = FakeGemini(latency=Latency(median=0.0, sigma=0.0), time_scale=0.0)
+    keys = ["AIzaTestKey-linter-000000000000", "AIzaTestKey-linter-111111111111"]
+    with installed(gemini=backend):
+        brain = OracleBrain(keys, key_pool=KeyPool(keys, store=DictStore()))
+        brain.telemetry = Telemetry(path=str(tmp_path / "spans.jsonl"))
+        approved, notes = brain.grandmaster_agent(CLEAN.replace("slowly but", "slowly - but"), "note", "3000")
+        assert not approved and "tire" in notes and backend.stats["calls"] == 0
+        assert brain.grandmaster_agent(CLEAN, "note", "3000") == (True, "Onaylandı. Mükemmel.")
+        assert backend.stats["calls"] == 1  # one whole-draft review (section QC is opt-in)
+    assert brain.usage_stats["lint_hits"] == {"dashes": 1} and brain.usage_stats["lint_rejections"] == 1
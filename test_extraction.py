@@ -0,0 +1,172 @@
+import sys
+import json
+sys.path.insert(0, '.')
+from extraction import (post_reading_result, build_session, json_config, check, validate, run_extraction,
+                        POST_READING_SCHEMA, PDF_IMPORT_SCHEMA, SESSION_SCHEMA, SESSION_FIELDS)
+
+SESSION = {"topic": "Love", "target_name": "Eamon", "key_prediction": "He returns in spring", "hook_left": "A letter",
+           "client_mood": "hopeful", "specific_details": "Blue light", "promises_made": None,
+           "physical_descriptions": None, "reading_summary": "Summary"}
+
+
+def answer(**overrides):
+    data = {"client_name": "Julie", "delivery_message": "<p>Dear Julie, it is ready. Nes</p>", "session": SESSION}
+    data.update(overrides)
+    return data
+
+
+def test_post_reading_keeps_known_name_and_strips_html():
+    result = post_reading_result(answer(), "Julie")
+    assert result == {"client_name": "Julie", "delivery_message": "Dear Julie, it is ready. Nes", "session": SESSION}
+    assert post_reading_result(answer(client_name="Jennifer"), "Julie")["client_name"] == "Julie"
+    assert post_reading_result(answer(), "Unknown")["client_name"] == "Julie"
+    assert post_reading_result(answer(client_name="Unknown"), "Unknown")["client_name"] == "Unknown"
+    assert post_reading_result(None, "Julie") is None
+    assert post_reading_result(answer(delivery_message=" "), "Julie") is None
+
+
+def test_schema_validation():
+    assert check(json.dumps(answer()), POST_READING_SCHEMA) == (answer(), [])
+    assert check("```json\n" + json.dumps(SESSION) + "\n```", SESSION_SCHEMA) == (SESSION, [])
+    assert check("no json here", SESSION_SCHEMA) == (None, ["$: not a JSON object"])
+    broken = dict(SESSION, topic=None, target_name=["Eamon"])
+    del broken["hook_left"]
+    assert validate(broken, SESSION_SCHEMA) == ["$.hook_left: missing", "$.topic: null is not allowed",
+                                               "$.target_name: expected string, got list"]
+    pdf = {"topic": "Love", "key_prediction": "", "hook_left": "", "client_mood": "", "client_name": "Julie",
+           "target_name": None, "reading_date": "March 3rd"}
+    assert validate(pdf, PDF_IMPORT_SCHEMA) == ["$.reading_date: 'March 3rd' does not match ^(\\d{4}-\\d{2}-\\d{2}|Unknown)$"]
+    assert validate(dict(pdf, reading_date="Unknown"), PDF_IMPORT_SCHEMA) == []
+
+
+def test_one_targeted_repair():
+    prompts = []
+    replies = iter(['{"topic": "Love"}', json.dumps(SESSION)])
+
+    def generate(prompt):
+        prompts.append(prompt)
+        return next(replies)
+
+    assert run_extraction(generate, "READING TEXT", SESSION_SCHEMA) == (SESSION, True, [])
+    assert "READING TEXT" not in prompts[1] and "$.hook_left: missing" in prompts[1] and '{"topic": "Love"}' in prompts[1]
+    data, repaired, errors = run_extraction(lambda prompt: "still nothing", "READING TEXT", SESSION_SCHEMA)
+    assert data is None and repaired and errors
+
+
+def test_session_defaults_and_schema_config():
+    session = build_session({"key_prediction": "Spring"}, "2026-01-01")
+    assert session["timestamp"] == "2026-01-01" and session["topic"] == "Genel" and session["target_name"] is None
+    assert session["key_prediction"] == "Spring" and set(session) == {"timestamp", *SESSION_FIELDS}
+    import google.generativeai as genai
+    config = json_config(genai.types.GenerationConfig(temperature=0.1), POST_READING_SCHEMA)
+    assert config.response_mime_type == "application/json" and config.temperature == 0.1
+
+
+class DictMemory:
+    def __init__(self):
+        self.saved = {}
+        self.usage = None
+
+    def load_memory(self, key):
+        return json.loads(json.dumps(self.saved.get(key, {"client_name": key, "sessions": []})))
+
+    def save_memory(self, key, data):
+        self.saved[key] = data
+
+    def roll_summary(self, mem):
+        pass
+
+    def save_usage(self, client, topic, usage):
+        self.usage = dict(usage)
+
+
+def run_tail(tmp_path, responder):
+    from agents import OracleBrain
+    from key_pool import KeyPool
+    from telemetry import Telemetry
+    from test_key_pool import DictStore
+    from response_cache import ResponseCache
+    from fake_backend import FakeGemini, Latency, installed
+
+    backend = FakeGemini(latency=Latency(median=0.0, sigma=0.0), time_scale=0.0, responder=responder)
+    keys = ["AIzaTestKey-extraction-0000000000", "AIzaTestKey-extraction-1111111111"]
+    mem = DictMemory()
+    with installed(gemini=backend):
+        brain = OracleBrain(keys, key_pool=KeyPool(keys, store=DictStore()))
+        brain.telemetry = Telemetry(path=str(tmp_path / "spans.jsonl"))
+        brain.response_cache = ResponseCache(path=str(tmp_path / "responses.sqlite3"))
+        msg, _ = brain._run_post_approval("<h1>Dear Julie</h1><p>The reading.</p>", "julie@x.com", mem, "Julie", "julie@x.com", "Love")
+    return backend, mem, msg
+
+
+def test_one_call_feeds_memory_and_delivery(tmp_path):
+    backend, mem, msg = run_tail(tmp_path, None)
+    assert backend.stats["calls"] == 1
+    assert msg.startswith("Dear Julie,")
+    assert mem.saved["julie@x.com"]["client_name"] == "Julie"
+    assert mem.saved["julie@x.com"]["sessions"][0]["key_prediction"] == "He returns in spring"
+    assert mem.usage["fused_extractions"] == 1 and mem.usage["fused_fallbacks"] == 0
+
+
+def test_broken_fused_answer_uses_the_separate_calls(tmp_path):
+    from fake_backend import default_responder
+
+    def broken(prompt, model_name):
+        return "Sorry, no JSON today." if '"delivery_message"' in prompt else default_responder(prompt, model_name)
+
+    backend, mem, msg = run_tail(tmp_path, broken)
+    assert backend.stats["calls"] == 4  # fused + its repair + memory + delivery
+    assert len(mem.saved["julie@x.com"]["sessions"]) == 1 and msg
+    assert mem.usage["fused_extractions"] == 0 and mem.usage["fused_fallbacks"] == 1
+    assert (mem.usage["extractions"], mem.usage["extraction_repairs"], mem.usage["extraction_failures"]) == (2, 1, 1)
+
+
+def test_failed_extraction_is_not_cached(tmp_path):
+    from agents import OracleBrain
+    from key_pool import KeyPool
+    from telemetry import Telemetry
+    from test_key_pool import DictStore
+    from response_cache import ResponseCache
+    from fake_backend import FakeGemini, Latency, installed
+
+    replies = ["not json", "still not json", json.dumps(SESSION)]
+    backend = FakeGemini(latency=Latency(median=0.0, sigma=0.0), time_scale=0.0,
+                         responder=lambda prompt, model_name: replies.pop(0) if len(replies) > 1 else replies[0])
+    keys = ["AIzaTestKey-extract-cache-000000", "AIzaTestKey-extract-cache-111111"]
+    with installed(gemini=backend):
+        brain = OracleBrain(keys, key_pool=KeyPool(keys, store=DictStore()))
+        brain.telemetry = Telemetry(path=str(tmp_path / "spans.jsonl"))
+        brain.response_cache = ResponseCache(path=str(tmp_path / "responses.sqlite3"))
+        assert brain.extract_json("READING TEXT", SESSION_SCHEMA, agent="memory") is None
+        assert brain.response_cache.stats()["entries"] == 0
+        assert brain.extract_json("READING TEXT", SESSION_SCHEMA, agent="memory") == SESSION  # re-run reaches the API
+        assert backend.stats["calls"] == 3
+        assert brain.extract_json("READING TEXT", SESSION_SCHEMA, agent="memory") == SESSION
+        assert backend.stats["calls"] == 3 and brain.usage_stats["response_cache_hits"] == 1
+
+
+def test_spell_memory_is_repaired_once(tmp_path):
+    from spell_agents import SpellBrain
+    from key_pool import KeyPool
+    from telemetry import Telemetry
+    from test_key_pool import DictStore
+    from fake_backend import FakeGemini, Latency, installed, default_responder
+
+    def sloppy(prompt, model_name):
+        if "memory system for SPELL" in prompt:
+            return '{"topic": "Return", "spells_used": ["Melammu"]}'
+        if "JSON TO FIX" in prompt:
+            return default_responder("memory system for SPELL", model_name)
+        return default_responder(prompt, model_name)
+
+    backend = FakeGemini(latency=Latency(median=0.0, sigma=0.0), time_scale=0.0, responder=sloppy)
+    keys = ["AIzaTestKey-spell-extract-00000000", "AIzaTestKey-spell-extract-11111111"]
+    mem = DictMemory()
+    with installed(gemini=backend):
+        brain = SpellBrain(keys, key_pool=KeyPool(keys, store=DictStore()))
+        brain.telemetry = Telemetry(path=str(tmp_path / "spans.jsonl"))
+        assert brain.update_spell_memory("<div>ritual</div>", "julie@x.com", mem)
+    session = mem.saved["julie@x.com"]["sessions"][0]
+    assert session["session_type"] == "spell" and session["spells_used"] == "Melammu"
+    assert session["reading_summary"] == "Offline bench ritual" and backend.stats["calls"] == 2
+    assert (brain.usage_stats["extraction_repairs"], brain.usage_stats["extraction_failures"]) == (1, 0)
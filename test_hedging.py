@@ -0,0 +1,132 @@
+import sys
+import time
+import threading
+sys.path.insert(0, '.')
+import pytest
+from hedging import LatencyTracker, run_hedged, MIN_HEDGE_DELAY
+
+
+def slow(value, seconds):
+    def run():
+        time.sleep(seconds)
+        return value
+    return run
+
+
+def failing(seconds, error):
+    def run():
+        time.sleep(seconds)
+        raise error
+    return run
+
+
+def test_p90_per_model_and_size_bucket():
+    tracker = LatencyTracker(min_samples=5, default_delay=90)
+    assert tracker.hedge_delay("gemini-3.1-pro-preview", 3000) == 90
+    for latency in [10, 11, 12, 13, 14, 15, 16, 17, 18, 60]:
+        tracker.record("models/gemini-3.1-pro-preview", 3000, latency)
+    assert tracker.percentile("gemini-3.1-pro-preview", 3000) == 18
+    # other prompt-size bucket has no data yet
+    assert tracker.hedge_delay("gemini-3.1-pro-preview", 40000) == 90
+    tracker.record("m", 100, 0.1)
+    assert tracker.hedge_delay("m", 100) == 90  # below min samples
+    for _ in range(5):
+        tracker.record("m", 100, 0.1)
+    assert tracker.hedge_delay("m", 100) == MIN_HEDGE_DELAY
+
+
+def test_fast_primary_never_hedges():
+    fired = []
+    result, winner, hedged = run_hedged(slow("p", 0.01), lambda: fired.append(1) or slow("h", 0), 0.5, None)
+    assert (result, winner, hedged) == ("p", "primary", False)
+    assert fired == []
+
+
+def test_many_concurrent_calls_do_not_queue_into_the_hedge_delay():
+    results = []
+
+    def call():
+        results.append(run_hedged(slow("p", 0.2), lambda: slow("h", 0), 0.5, None))
+
+    callers = [threading.Thread(target=call) for _ in range(40)]
+    for t in callers:
+        t.start()
+    for t in callers:
+        t.join(5)
+    assert results == [("p", "primary", False)] * 40
+
+
+def test_stalled_primary_loses_to_hedge_and_is_still_accounted():
+    abandoned = []
+    done = threading.Event()
+
+    def on_abandoned(which, future):
+        abandoned.append((which, future.result()))
+        done.set()
+
+    started = time.time()
+    result, winner, hedged = run_hedged(slow("p", 0.5), lambda: slow("h", 0.05), 0.1, on_abandoned)
+    assert (result, winner, hedged) == ("h", "hedge", True)
+    assert time.time() - started < 0.4
+    assert done.wait(2)
+    assert abandoned == [("primary", "p")]
+
+
+def test_no_free_key_waits_for_primary():
+    result, winner, hedged = run_hedged(slow("p", 0.2), lambda: None, 0.05, None)
+    assert (result, winner, hedged) == ("p", "primary", False)
+
+
+def test_primary_failure_after_hedge_fired_uses_hedge():
+    abandoned = []
+    result, winner, _ = run_hedged(failing(0.15, ValueError("503")), lambda: slow("h", 0.3), 0.05,
+                                   lambda which, fut: abandoned.append(which))
+    assert (result, winner) == ("h", "hedge")
+    assert abandoned == ["primary"]
+
+
+def test_both_fail_raises_primary_error():
+    abandoned = []
+    with pytest.raises(ValueError):
+        run_hedged(failing(0.1, ValueError("primary")), lambda: failing(0.0, KeyError("hedge")), 0.05,
+                   lambda which, fut: abandoned.append(which))
+    assert abandoned == ["hedge"]
+
+
+def test_brain_hedges_only_enabled_agents(tmp_path):
+    from agents import OracleBrain
+    from key_pool import KeyPool
+    from telemetry import Telemetry
+    from test_key_pool import DictStore
+
+    class Resp:
+        text = "APPROVED"
+        usage_metadata = None
+
+    class FakeModel:
+        model_name = "models/gemini-3.1-pro-preview"
+
+        def __init__(self, delay):
+            self.delay = delay
+
+        def generate_content(self, prompt, request_options=None):
+            time.sleep(self.delay)
+            return Resp()
+
+    class FakeClient:
+        api_key = "AIzaTestKey-hedge-fake-client"
+
+        def build_model(self, *a, **k):
+            return FakeModel(0.01)
+
+    keys = ["AIzaTestKey-hedge-0000000000000", "AIzaTestKey-hedge-1111111111111"]
+    brain = OracleBrain(keys, key_pool=KeyPool(keys, store=DictStore()))
+    brain.telemetry = Telemetry(path=str(tmp_path / "spans.jsonl"))
+    brain.latency_tracker = LatencyTracker(default_delay=0.05, min_delay=0.0)
+    brain._get_client = lambda key_index=None: FakeClient()
+    brain.key_pool.acquire()
+    response, idx = brain._generate_hedged(FakeModel(0.4), "prompt", 0, 10, True, "grandmaster")
+    assert idx == 1
+    assert brain.usage_stats["hedges_fired"] == 1 and brain.usage_stats["hedge_wins"] == 1
+    response, idx = brain._generate_hedged(FakeModel(0.1), "prompt", 0, 10, False, "creative")
+    assert idx == 0 and brain.usage_stats["hedge_eligible_calls"] == 1
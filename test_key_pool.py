@@ -0,0 +1,121 @@
+import sys
+sys.path.insert(0, '.')
+import key_pool
+from key_pool import KeyPool, classify_quota_error
+
+
+class FakeClock:
+    def __init__(self, start=1_800_000_000.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+
+class DictStore:
+    def __init__(self):
+        self.records = []
+
+    def load(self):
+        return list(self.records)
+
+    def save(self, records):
+        self.records = list(records)
+
+
+def fresh_pool(keys, clock, store=None, limits=None):
+    key_pool._STATES.clear()
+    key_pool._SYNC.update({"loaded_at": 0.0, "saved_at": 0.0, "dirty": False})
+    return KeyPool(keys, limits=limits, store=store or DictStore(), clock=clock)
+
+
+def test_picks_least_loaded_key():
+    clock = FakeClock()
+    pool = fresh_pool(["key-a-000000000000", "key-b-000000000000"], clock, limits={"rpm": 2})
+    first, _ = pool.acquire()
+    second, _ = pool.acquire()
+    assert {first, second} == {0, 1}
+
+
+def test_rate_limited_key_is_skipped_until_cooldown():
+    clock = FakeClock()
+    pool = fresh_pool(["key-a-000000000000", "key-b-000000000000"], clock)
+    pool.report_error(0, "rate_limit", retry_after=30)
+    for _ in range(3):
+        idx, _ = pool.acquire()
+        assert idx == 1
+        pool.report_success(idx, latency=1.0)
+    assert pool.acquire(exclude=(1,)) == (None, 30.0)
+    clock.now += 31
+    assert pool.acquire(exclude=(1,))[0] == 0
+
+
+def test_all_throttled_returns_wait_and_daily_returns_none():
+    clock = FakeClock()
+    pool = fresh_pool(["key-a-000000000000"], clock)
+    pool.report_error(0, "rate_limit", retry_after=20)
+    idx, wait = pool.acquire()
+    assert idx is None and 19 <= wait <= 20
+    pool.report_error(0, "daily_quota")
+    assert pool.acquire() == (None, None)
+
+
+def test_daily_quarantine_survives_new_process():
+    clock = FakeClock()
+    store = DictStore()
+    pool = fresh_pool(["key-a-000000000000", "key-b-000000000000"], clock, store=store)
+    pool.report_error(1, "daily_quota")
+    assert store.records, "daily quarantine must be persisted immediately"
+
+    # Simulate a brand new process reading the shared store
+    reborn = fresh_pool(["key-a-000000000000", "key-b-000000000000"], clock, store=store)
+    picks = {reborn.acquire()[0] for _ in range(5)}
+    assert picks == {0}
+
+
+def test_state_file_is_not_a_client_memory(tmp_path):
+    clock = FakeClock()
+    store = key_pool.FileStateStore(str(tmp_path / "state" / "key_pool.json"))
+    assert store.load() == []
+    pool = fresh_pool(["key-a-000000000000", "key-b-000000000000"], clock, store=store)
+    pool.report_error(1, "daily_quota")
+    records = store.load()
+    assert len(records) == 2 and "key-b-000000000000" not in (tmp_path / "state" / "key_pool.json").read_text()
+    reborn = fresh_pool(["key-a-000000000000", "key-b-000000000000"], clock, store=store)
+    assert {reborn.acquire()[0] for _ in range(5)} == {0}
+    assert "client_memories" not in key_pool.DEFAULT_STATE_PATH
+
+
+def test_injected_pool_skips_the_shared_one(monkeypatch):
+    from agents import OracleBrain
+
+    def shared_pool(keys):
+        raise AssertionError("the shared pool (and its state file) must not be touched")
+
+    monkeypatch.setattr("agents.get_key_pool", shared_pool)
+    pool = fresh_pool(["key-a-000000000000"], FakeClock())
+    assert OracleBrain(["key-a-000000000000"], key_pool=pool).key_pool is pool
+
+
+def test_closing_a_stream_early_returns_its_key(tmp_path):
+    from agents import OracleBrain
+    from telemetry import Telemetry
+    from fake_backend import FakeGemini, Latency, installed
+
+    backend = FakeGemini(latency=Latency(median=0.0, sigma=0.0), time_scale=0.0, chunk_chars=100)
+    keys = ["AIzaTestKey-close-stream-00000"]
+    with installed(gemini=backend):
+        pool = fresh_pool(keys, FakeClock())
+        brain = OracleBrain(keys, key_pool=pool)
+        brain.telemetry = Telemetry(path=str(tmp_path / "spans.jsonl"))
+        stream = brain.stream_with_retry(brain.model, "HEDEF: Minimum 2000 karakter.")
+        assert next(stream) == "__RESET_STREAM__" and next(stream)
+        assert pool.snapshot()[0]["in_flight"] == 1
+        stream.close()
+    assert pool.snapshot()[0]["in_flight"] == 0
+
+
+def test_classify_quota_error():
+    assert classify_quota_error("429 Quota exceeded for GenerateRequestsPerDayPerProjectPerModel")[0] == "daily_quota"
+    kind, retry_after = classify_quota_error("429 Resource exhausted. Please retry in 12.5s.")
+    assert kind == "rate_limit" and retry_after == 12.5
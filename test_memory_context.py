@@ -0,0 +1,131 @@
+import sys
+import json
+sys.path.insert(0, '.')
+import pytest
+from memory import MemoryManager, CONTEXT_RECENT_SESSIONS
+
+
+def session(n):
+    return {
+        "timestamp": f"2025-{(n % 12) + 1:02d}-01 10:00:00 EST",
+        "topic": "Love" if n % 3 else "Career",
+        "target_name": "Eamon" if n < 30 else "Tom",
+        "key_prediction": f"Prediction number {n}: he reaches out before the full moon " * 2,
+        "hook_left": f"Hook {n}",
+        "client_mood": "hopeful",
+        "specific_details": f"Blue scarf seen in session {n}",
+        "promises_made": f"Promise {n}: a message within 9 days" if n % 5 == 0 else None,
+        "physical_descriptions": "Tall, dark curly hair" if n == 2 else None,
+        "reading_summary": "A long summary of everything that was said in the reading. " * 6,
+    }
+
+
+@pytest.fixture
+def mem(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    manager = MemoryManager()
+    assert not manager.use_db
+    return manager
+
+
+def test_loyal_client_context_stays_within_budget(mem):
+    data = {"client_name": "Marissa", "sessions": [session(n) for n in range(1, 61)]}
+    text = mem.format_context_for_prompt(data, token_budget=3000)
+
+    assert len(text) // 4 <= 3000
+    assert "TOTAL SESSIONS: 60" in text and "--- SESSION 60 (" in text
+    assert "--- SESSION 1 (" not in text and "OLDER SESSIONS 1-" in text
+    assert "TARGET NAMES: Eamon, Tom" in text
+    assert "Tall, dark curly hair" in text and "Promise 5: a message within 9 days" in text
+    assert text.rstrip().endswith("SADIK KAL !!!")
+    stats = mem.last_context_stats
+    assert stats["sessions"] == 60 and stats["tokens_saved"] > 10000 and stats["bytes_saved"] > 40000
+
+
+def test_small_history_is_unchanged_verbatim(mem):
+    data = {"client_name": "Julie", "sessions": [session(n) for n in range(1, 4)]}
+    text = mem.format_context_for_prompt(data)
+    assert "ROLLING SUMMARY" not in text
+    assert all(f"--- SESSION {n} (" in text for n in (1, 2, 3))
+    assert mem.last_context_stats["tokens_saved"] == 0
+
+
+def test_summary_is_incremental_and_rebuilt_after_edits(mem):
+    data = {"client_name": "Marissa", "sessions": [session(n) for n in range(1, 11)]}
+    summary = mem.roll_summary(data)
+    assert summary["covers"] == 10 - CONTEXT_RECENT_SESSIONS
+
+    data["sessions"].append(session(11))
+    folded = []
+    original_fold = mem._fold
+    mem._fold = lambda s, sess, n: folded.append(n) or original_fold(s, sess, n)
+    assert mem.roll_summary(data)["covers"] == 11 - CONTEXT_RECENT_SESSIONS
+    assert folded == [11 - CONTEXT_RECENT_SESSIONS]  # only the session that left the recent window
+
+    data["sessions"][0]["target_name"] = "Renamed"
+    folded.clear()
+    assert "Renamed" in mem.roll_summary(data)["targets"]
+    assert folded == list(range(1, 11 - CONTEXT_RECENT_SESSIONS + 1))
+
+
+def test_summary_survives_save_and_load(mem):
+    data = {"client_name": "Marissa", "sessions": [session(n) for n in range(1, 9)]}
+    mem.roll_summary(data)
+    mem.save_memory("marissa@example.com", data)
+    loaded = mem.load_memory("marissa@example.com")
+    assert loaded["rolling_summary"]["covers"] == 8 - CONTEXT_RECENT_SESSIONS
+
+
+def test_hard_cap_with_tiny_budget(mem):
+    data = {"client_name": "Marissa", "sessions": [session(n) for n in range(1, 61)]}
+    text = mem.format_context_for_prompt(data, token_budget=200)
+    assert len(text) // 4 <= 200
+    assert text.startswith("CLIENT NAME: Marissa") and "KRİTİK" in text
+
+
+class FakeTable:
+    COLUMNS = {"client_key", "client_name", "sessions", "updated_at"}  # the deployed client_memories schema
+
+    def __init__(self, db):
+        self.db = db
+        self.data = []
+
+    def upsert(self, row, on_conflict=None):
+        unknown = set(row) - self.COLUMNS
+        if unknown:
+            raise Exception(f"Could not find the {sorted(unknown)} column of 'client_memories'")
+        self.db.rows[row["client_key"]] = dict(row)
+        return self
+
+    def select(self, columns):
+        self.data = list(self.db.rows.values())
+        return self
+
+    def eq(self, column, value):
+        self.data = [row for row in self.data if row[column] == value]
+        return self
+
+    def execute(self):
+        return self
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.rows = {}
+
+    def table(self, name):
+        return FakeTable(self)
+
+
+def test_db_keeps_the_summary_in_the_sessions_payload(mem):
+    mem.supabase, mem.use_db = FakeSupabase(), True
+    data = {"client_name": "Marissa", "sessions": [session(n) for n in range(1, 9)]}
+    mem.roll_summary(data)
+    assert mem.save_memory("Marissa", data) is True
+    loaded = mem.load_memory("Marissa")
+    assert loaded["sessions"] == data["sessions"] and loaded["rolling_summary"] == data["rolling_summary"]
+    assert mem.list_all_clients()[0]["session_count"] == 8
+
+    # Rows written before the summary existed are a plain session list
+    mem.supabase.rows["Marissa"]["sessions"] = json.dumps(data["sessions"])
+    assert mem.load_memory("Marissa") == {"client_name": "Marissa", "sessions": data["sessions"]}
@@ -0,0 +1,47 @@
+import sys
+sys.path.insert(0, '.')
+import gemini_client
+from gemini_client import get_client, get_model, pool_stats
+
+
+KEYS = ["AIzaTestKey-model-pool-0000000", "AIzaTestKey-model-pool-1111111"]
+
+
+def test_new_brains_and_rotation_reuse_pooled_handles():
+    from agents import OracleBrain
+    from key_pool import KeyPool
+    from test_key_pool import DictStore
+    OracleBrain.warm_model_pool(KEYS)
+    builds = pool_stats()["builds"]
+
+    pool = KeyPool(KEYS, store=DictStore())
+    first = OracleBrain(KEYS, key_pool=pool)
+    second = OracleBrain(KEYS, key_pool=pool)
+    assert first.model is second.model
+    assert first.extraction_model is second.extraction_model
+    assert first.client is get_client(KEYS[0])
+
+    first.current_key_index = 1
+    first._configure_genai()
+    first._reinit_models()
+    assert first.model is not second.model
+    assert first.model._client is get_client(KEYS[1]).get_service_client("generative")
+    assert pool_stats()["builds"] == builds  # warmed: rotation and new brains built nothing
+
+
+def test_handles_are_keyed_by_config_values():
+    import google.generativeai as genai
+    client = get_client(KEYS[0])
+    low = genai.types.GenerationConfig(temperature=0.1)
+    assert get_model(client, "gemini-pool-test", low) is get_model(client, "gemini-pool-test", genai.types.GenerationConfig(temperature=0.1))
+    assert get_model(client, "gemini-pool-test", low) is not get_model(client, "gemini-pool-test", genai.types.GenerationConfig(temperature=1.3))
+
+
+def test_spell_brain_shares_the_pool():
+    from spell_agents import SpellBrain
+    from key_pool import KeyPool
+    from test_key_pool import DictStore
+    SpellBrain.warm_model_pool(KEYS)
+    pool = KeyPool(KEYS, store=DictStore())
+    assert SpellBrain(KEYS, key_pool=pool).extraction_model is SpellBrain(KEYS, key_pool=pool).extraction_model
+    assert len(gemini_client._CLIENTS) >= 2
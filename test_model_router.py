@@ -0,0 +1,62 @@
+import sys
+sys.path.insert(0, '.')
+from model_router import ModelRouter, load_catalogue, COOLDOWN_S, MAX_FAILURES, MIN_SAMPLES
+
+CATALOGUE = {name: {"methods": ["generateContent"]} for name in
+             ("gemini-3-flash-preview", "gemini-2.5-flash", "gemini-3.1-pro-preview", "gemini-3-pro-preview")}
+
+
+def test_catalogue_is_read_from_the_utf16_dump(tmp_path):
+    catalogue = load_catalogue()  # models.txt in the repo
+    assert catalogue["gemini-3-flash-preview"]["input_limit"] == 1048576
+    assert "generateContent" in catalogue["gemini-2.5-flash"]["methods"]
+    path = tmp_path / "models.txt"
+    path.write_text(repr({"models": [{"name": "models/gemini-2.5-flash", "supportedGenerationMethods": ["generateContent"]}]}), encoding="utf-16")
+    assert list(load_catalogue(str(path))) == ["gemini-2.5-flash"]
+    assert load_catalogue(str(tmp_path / "missing.txt")) is None
+    assert ModelRouter(load_catalogue(str(path))).chain("flash") == ["gemini-2.5-flash"]
+
+
+def test_latency_and_cost_targets_move_down_the_chain():
+    router = ModelRouter(CATALOGUE)
+    assert router.choose("flash") == "gemini-3-flash-preview"
+    for _ in range(MIN_SAMPLES):
+        router.record("gemini-3-flash-preview", latency=120.0)
+    assert router.choose("flash") == "gemini-2.5-flash"
+    pricey = lambda model: (50.0, 50.0) if "2.5" in model else (1.0, 10.0)
+    assert router.choose("flash", est_tokens=1000, price_fn=pricey) == "gemini-3.1-pro-preview"
+    assert router.snapshot()["fallbacks"] == 2
+
+
+def test_errors_cool_a_model_down_and_404_retires_it():
+    now = [1000.0]
+    router = ModelRouter(CATALOGUE, clock=lambda: now[0])
+    for _ in range(MAX_FAILURES):
+        router.record("gemini-3-flash-preview", ok=False)
+    assert router.choose("flash") == "gemini-2.5-flash"
+    now[0] += COOLDOWN_S + 1
+    assert router.choose("flash") == "gemini-3-flash-preview"
+    router.record("gemini-3-flash-preview", ok=False, permanent=True)
+    now[0] += 10 * COOLDOWN_S
+    assert router.choose("flash") == "gemini-2.5-flash"
+
+
+def test_brain_routes_short_calls_to_flash_and_falls_back(tmp_path):
+    from agents import OracleBrain
+    from key_pool import KeyPool
+    from telemetry import Telemetry
+    from test_key_pool import DictStore
+    from fake_backend import FakeGemini, Latency, installed
+
+    backend = FakeGemini(latency=Latency(median=0.0, sigma=0.0), time_scale=0.0, missing_models=("gemini-3-flash-preview",))
+    keys = ["AIzaTestKey-router-0000000000000", "AIzaTestKey-router-1111111111111"]
+    with installed(gemini=backend):
+        brain = OracleBrain(keys, key_pool=KeyPool(keys, store=DictStore()))
+        brain.telemetry = Telemetry(path=str(tmp_path / "spans.jsonl"))
+        brain.model_router = ModelRouter(CATALOGUE)
+        assert brain.generate_delivery_message("Mira", "Love")
+        brain.generate_with_retry(brain.extraction_model, "extract please", agent="grandmaster")
+        brain.generate_with_retry(brain.extraction_model, "extract please", agent="memory")
+    assert backend.stats["calls_per_model"] == {"gemini-3-flash-preview": 1, "gemini-2.5-flash": 2, "gemini-3.1-pro-preview": 1}
+    assert brain.usage_stats["routed_calls"] == {"gemini-2.5-flash": 2}
+    assert brain.model_router.snapshot()["cooling_down"] == ["gemini-3-flash-preview"]
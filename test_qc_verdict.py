@@ -0,0 +1,65 @@
+import sys
+sys.path.insert(0, '.')
+from qc_verdict import parse_verdict, failing_sections, format_issues, format_instructions
+from sections import split_sections
+from fake_backend import fake_document
+
+DRAFT = fake_document(3000)
+IDS = [s["id"] for s in split_sections(DRAFT)]
+
+
+def test_json_verdict_is_normalised():
+    verdict = parse_verdict('Sure:\n```json\n{"approved": false, "issues": ['
+                            '{"code": "dash", "sections": ["s2", "s99"], "note": "Remove the dash."},'
+                            '{"code": "VIBES", "sections": ["s1"], "note": "' + "x" * 900 + '"}]}\n```', IDS)
+    assert verdict["structured"] and not verdict["approved"]
+    assert [(i["code"], i["sections"]) for i in verdict["issues"]] == [("DASH", ["s2"]), ("OTHER", ["s1"])]
+    assert len(verdict["issues"][1]["note"]) == 400
+    assert failing_sections(verdict) == ["s1", "s2"]
+    assert format_issues(verdict["issues"], "s2") == "- [DASH] Remove the dash."
+    assert parse_verdict('{"approved": true, "issues": [{"code": "HOOKS", "note": "x"}]}', IDS)["approved"] is False
+
+
+def test_legacy_answers_still_work():
+    assert parse_verdict("Everything fine.\nAPPROVED", IDS) == {"approved": True, "issues": [], "structured": False}
+    verdict = parse_verdict("REVISE: Chapter 2 is thin.", IDS)
+    assert not verdict["structured"] and verdict["issues"][0]["code"] == "OTHER"
+    assert failing_sections(verdict) is None  # whole-draft critique -> full rewrite
+    assert parse_verdict("REVISE: thin.", IDS, default_sections=["s3"])["issues"][0]["sections"] == ["s3"]
+    assert failing_sections(None) is None
+
+
+def test_instructions_list_codes_and_sections():
+    text = format_instructions(split_sections(DRAFT), spell=True)
+    assert "ANSWER FORMAT" in text and "HALLUCINATION" in text and "s0: Açılış" in text and "s2: Chapter 2" in text
+
+
+def reject_spell_chapter_two(prompt, model_name):
+    from fake_backend import default_responder
+    if "GRANDMASTER QUALITY CONTROLLER" in prompt:
+        if "<h2>Chapter 2</h2>" in prompt and "revised truth" not in prompt:
+            return '{"approved": false, "issues": [{"code": "AI_TONE", "sections": ["s2"], "note": "Chapter 2 sounds templated."}]}'
+        return '{"approved": true, "issues": []}'
+    return default_responder(prompt, model_name)
+
+
+def test_spell_qc_rewrites_only_the_rejected_section(tmp_path):
+    from spell_agents import SpellBrain
+    from key_pool import KeyPool
+    from telemetry import Telemetry
+    from test_key_pool import DictStore
+    from fake_backend import FakeGemini, Latency, installed
+
+    backend = FakeGemini(latency=Latency(median=0.0, sigma=0.0), time_scale=0.0, responder=reject_spell_chapter_two)
+    keys = ["AIzaTestKey-spell-verdict-00000000", "AIzaTestKey-spell-verdict-11111111"]
+    with installed(gemini=backend):
+        brain = SpellBrain(keys, key_pool=KeyPool(keys, store=DictStore()))
+        brain.telemetry = Telemetry(path=str(tmp_path / "spans.jsonl"))
+        approved, notes = brain.grandmaster_spell_qc(DRAFT, "note", "Return spell")
+        assert not approved and notes == "- [AI_TONE] (s2) Chapter 2 sounds templated."
+        revised = brain.revise_sections(DRAFT, failing_sections(brain._verdict_for(DRAFT)), "note", "Return spell", "", "")
+        assert brain.grandmaster_spell_qc(revised, "note", "Return spell") == (True, "Approved. Flawless.")
+
+    before, after = split_sections(DRAFT), split_sections(revised)
+    assert [b["html"] == a["html"] for b, a in zip(before, after)] == [s["id"] != "s2" for s in before]
+    assert brain.usage_stats["section_revisions"] == 1 and brain.usage_stats["qc_verdict_fallbacks"] == 0
@@ -0,0 +1,83 @@
+import sys
+sys.path.insert(0, '.')
+from response_cache import ResponseCache, make_key, is_cacheable
+
+
+class FakeClock:
+    def __init__(self, start=1_800_000_000.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+
+def test_key_depends_on_model_config_and_prompt():
+    base = make_key("gemini-3.1-pro-preview", {"temperature": 0.1}, "prompt")
+    assert base == make_key("models/gemini-3.1-pro-preview", {"temperature": 0.1}, "prompt")
+    assert base != make_key("gemini-3.1-pro-preview", {"temperature": 0.2}, "prompt")
+    assert base != make_key("gemini-3.1-pro-preview", {"temperature": 0.1}, "prompt ")
+    assert base != make_key("gemini-flash", {"temperature": 0.1}, "prompt")
+
+
+def test_only_low_temperature_configs_are_cacheable():
+    assert is_cacheable({"temperature": 0.1})
+    assert not is_cacheable({"temperature": 1.3})
+    assert not is_cacheable(None)
+
+
+def test_hit_miss_and_ttl(tmp_path):
+    clock = FakeClock()
+    cache = ResponseCache(path=str(tmp_path / "r.sqlite3"), default_ttl=60, clock=clock)
+    assert cache.get("k") is None
+    cache.put("k", "Sarah")
+    assert cache.get("k") == "Sarah"
+    clock.now += 61
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_eviction_by_count_and_size(tmp_path):
+    clock = FakeClock()
+    cache = ResponseCache(path=str(tmp_path / "r.sqlite3"), max_entries=2, max_bytes=1000, clock=clock)
+    cache.put("a", "1")
+    clock.now += 1
+    cache.put("b", "2")
+    clock.now += 1
+    assert cache.get("a") == "1"  # touch a -> b is now least recently used
+    clock.now += 1
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1" and cache.get("c") == "3"
+
+    clock.now += 1
+    cache.put("big", "x" * 999)
+    assert cache.stats()["bytes"] <= 1000
+    assert cache.get("big") == "x" * 999
+
+
+def test_brain_serves_repeated_extraction_from_disk(tmp_path):
+    from agents import OracleBrain
+    from key_pool import KeyPool
+    from test_key_pool import DictStore
+    keys = ["AIzaTestKey-response-cache-0000"]
+    brain = OracleBrain(keys, key_pool=KeyPool(keys, store=DictStore()))
+    brain.response_cache = ResponseCache(path=str(tmp_path / "r.sqlite3"))
+    calls = []
+
+    class Resp:
+        text = "Sarah"
+
+    def fake_generate(model, prompt, progress_callback=None, agent=None, generation_config=None):
+        calls.append(prompt)
+        return Resp()
+
+    brain.generate_with_retry = fake_generate
+    assert brain.identify_client("order from Sarah") == "Sarah"
+    assert brain.identify_client("order from Sarah") == "Sarah"
+    assert len(calls) == 1
+    assert brain.usage_stats["response_cache_hits"] == 1
+    assert brain.usage_stats["response_cache_misses"] == 1
+
+    brain.generate_cached(brain.model, "creative prompt")
+    brain.generate_cached(brain.model, "creative prompt")
+    assert len(calls) == 3  # high temperature is never cached
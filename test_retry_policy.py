@@ -0,0 +1,107 @@
+import sys
+sys.path.insert(0, '.')
+import pytest
+from retry_policy import RetryPolicy, RetryDeadlineExceeded, HEARTBEAT_INTERVAL
+
+
+class FakeClock:
+    """Clock + sleep pair: sleeping advances time instantly."""
+    def __init__(self, start=1_800_000_000.0):
+        self.now = start
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def make_policy(clock, rng=lambda: 1.0, deadline=600):
+    return RetryPolicy(base_delay=2.0, max_delay=60.0, deadline=deadline, clock=clock, sleep=clock.sleep, rng=rng)
+
+
+def test_exponential_backoff_is_capped():
+    clock = FakeClock()
+    budget = make_policy(clock).begin()
+    delays = [budget.backoff("other") for _ in range(8)]
+    assert delays[:5] == [2.0, 4.0, 8.0, 16.0, 32.0]
+    assert max(delays) == 60.0
+
+
+def test_full_jitter_spreads_workers():
+    clock = FakeClock()
+    low = make_policy(clock, rng=lambda: 0.1).begin()
+    high = make_policy(clock, rng=lambda: 0.9).begin()
+    for _ in range(3):
+        a, b = low.backoff("other"), high.backoff("other")
+    assert a == pytest.approx(0.8) and b == pytest.approx(7.2)
+
+
+def test_failure_kinds_back_off_independently():
+    clock = FakeClock()
+    budget = make_policy(clock).begin()
+    budget.backoff("blocked")
+    budget.backoff("blocked")
+    assert budget.backoff("other") == 2.0
+
+
+def test_retry_after_is_a_floor():
+    clock = FakeClock()
+    budget = make_policy(clock, rng=lambda: 0.0).begin()
+    assert budget.backoff("pool", retry_after=30) == 30
+    jittered = make_policy(clock, rng=lambda: 1.0).begin()
+    assert 30 < jittered.backoff("pool", retry_after=30) <= 35
+
+
+def test_wait_is_sliced_with_heartbeat():
+    clock = FakeClock()
+    budget = make_policy(clock).begin()
+    beats = []
+    budget.wait(12.0, "busy", beats.append)
+    assert sum(clock.sleeps) == pytest.approx(12.0)
+    assert max(clock.sleeps) <= 1.0
+    # initial message + one heartbeat per HEARTBEAT_INTERVAL
+    assert len(beats) == 1 + int(12.0 // HEARTBEAT_INTERVAL)
+
+
+def test_deadline_stops_retries():
+    clock = FakeClock()
+    budget = make_policy(clock, deadline=20).begin()
+    budget.wait(15.0)
+    with pytest.raises(RetryDeadlineExceeded):
+        budget.wait(10.0)
+
+
+def test_quota_reset_wait_until():
+    clock = FakeClock()
+    budget = make_policy(clock, deadline=3600).begin()
+    budget.wait_until(clock.now + 120)
+    assert budget.waited == pytest.approx(120)
+    with pytest.raises(RetryDeadlineExceeded):
+        budget.wait_until(clock.now + 7200)
+
+
+def test_transient_errors_back_off_instead_of_spinning(tmp_path, monkeypatch):
+    from agents import OracleBrain
+    from key_pool import KeyPool
+    from telemetry import Telemetry
+    from response_cache import ResponseCache
+    from fake_backend import FakeGemini, FaultProfile, Latency, installed
+    from test_key_pool import DictStore
+
+    monkeypatch.setattr("key_pool.TRANSIENT_COOLDOWN", 0.0)
+    backend = FakeGemini(latency=Latency(median=0.0, sigma=0.0), faults=FaultProfile(unavailable=1.0), time_scale=0.0)
+    keys = ["AIzaFakeKey-transient-000000000", "AIzaFakeKey-transient-111111111"]
+    clock = FakeClock()
+    with installed(gemini=backend):
+        brain = OracleBrain(keys, key_pool=KeyPool(keys, store=DictStore()))
+        brain.retry_policy = make_policy(clock, deadline=30)
+        brain.telemetry = Telemetry(path=str(tmp_path / "spans.jsonl"))
+        brain.response_cache = ResponseCache(path=str(tmp_path / "responses.sqlite3"))
+        with pytest.raises(RetryDeadlineExceeded):
+            brain.generate_with_retry(brain.model, "hello")
+    # 2 + 4 + 8 s of backoff, then the next 16 s wait would outlive the 30 s deadline
+    assert sum(clock.sleeps) == pytest.approx(14.0)
+    assert backend.stats["calls"] == 4
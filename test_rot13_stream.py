@@ -0,0 +1,64 @@
+import sys
+sys.path.insert(0, '.')
+from rot13_stream import Rot13StreamDecoder, build_rot13_prompt, encode, decode, looks_plaintext, ROT13_DIRECTIVE
+
+READING = "<h1>The Veil</h1>\n<p>" + "The candle leaned toward the north wall and you felt it. " * 12 + "İçimde bir ışık var.</p>\n</div>"
+
+
+def run(decoder, raw, size):
+    out = [decoder.feed(raw[i:i + size]) for i in range(0, len(raw), size)]
+    return "".join(out) + decoder.finish()
+
+
+def test_decoding_is_independent_of_chunk_boundaries():
+    raw = encode(READING)
+    for size in (1, 2, 7, 33, 160, 5000):
+        assert run(Rot13StreamDecoder(), raw, size) == READING
+
+
+def test_text_is_released_before_the_stream_ends():
+    decoder = Rot13StreamDecoder(head_chars=40)
+    raw = encode(READING)
+    assert decoder.feed(raw[:20]) == ""
+    first = decoder.feed(raw[20:100])
+    assert first and READING.startswith(first)
+
+
+def test_fences_are_stripped_even_when_split():
+    raw = "```ugzy\n" + encode(READING) + "\n``" + "`"
+    assert run(Rot13StreamDecoder(), raw, 3) == READING
+    assert run(Rot13StreamDecoder(), "``" + "`\n" + encode(READING), 50) == READING
+
+
+def test_plaintext_answer_passes_through_undecoded():
+    decoder = Rot13StreamDecoder()
+    assert run(decoder, READING, 25) == READING
+    assert decoder.plaintext
+    assert not looks_plaintext(encode(READING))
+
+
+def test_prompt_carries_directive_and_encoded_request():
+    prompt = build_rot13_prompt("Write the reading about Eamon")
+    assert prompt.startswith(ROT13_DIRECTIVE)
+    assert decode(prompt[len(ROT13_DIRECTIVE):]) == "Write the reading about Eamon"
+
+
+def test_blocked_stream_keeps_streaming_through_rot13(tmp_path):
+    from agents import OracleBrain
+    from key_pool import KeyPool
+    from telemetry import Telemetry
+    from test_key_pool import DictStore
+    from fake_backend import FakeGemini, FaultProfile, Latency, installed, fake_document
+
+    backend = FakeGemini(latency=Latency(median=0.0, sigma=0.0), faults=FaultProfile(blocked=1.0), time_scale=0.0, chunk_chars=100)
+    keys = ["AIzaTestKey-rot13-stream-00000", "AIzaTestKey-rot13-stream-11111"]
+    with installed(gemini=backend):
+        brain = OracleBrain(keys, key_pool=KeyPool(keys, store=DictStore()))
+        brain.telemetry = Telemetry(path=str(tmp_path / "spans.jsonl"))
+        chunks = list(brain.stream_with_retry(brain.model, "HEDEF: Minimum 2000 karakter."))
+
+    last_reset = len(chunks) - 1 - chunks[::-1].index("__RESET_STREAM__")
+    assert "".join(chunks[last_reset + 1:]) == fake_document(2000)
+    assert len(chunks) - last_reset - 1 > 5  # streamed, not one blob at the end
+    assert brain.usage_stats["rot13_streams"] == 1
+    assert brain.telemetry.summary()["draft"]["retries"] == {"blocked": 1}
@@ -0,0 +1,154 @@
+import sys
+import threading
+sys.path.insert(0, '.')
+from section_qc import SectionReviewer, aggregate, build_section_qc_prompt, build_whole_qc_prompt
+from sections import split_sections
+from fake_backend import fake_document
+
+DRAFT = fake_document(3000)
+
+
+class CountingReview:
+    def __init__(self, reject=()):
+        self.reject = reject
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, section, index, order_note, target_length):
+        with self.lock:
+            self.calls.append(section["id"])
+        if section["title"] in self.reject:
+            return False, [{"code": "DEPTH", "sections": [section["id"]], "note": f"{section['title']} is too flat."}]
+        return True, []
+
+
+def test_aggregate_names_failing_sections():
+    sections = split_sections(DRAFT)
+    verdict, feedback = aggregate([(s, True, []) for s in sections])
+    assert verdict["approved"] and feedback == "Onaylandı. Mükemmel."
+    issue = {"code": "DEPTH", "sections": ["s2"], "note": "too flat"}
+    verdict, feedback = aggregate([(s, s["id"] != "s2", [] if s["id"] != "s2" else [issue]) for s in sections])
+    assert not verdict["approved"] and verdict["issues"] == [issue]
+    assert "1/%d bölüm reddedildi" % len(sections) in feedback
+    assert "[Bölüm s2 · Chapter 2]\n- [DEPTH] too flat" in feedback
+
+
+def test_section_prompt_keeps_the_qc_markers():
+    section = split_sections(DRAFT)[1]
+    prompt = build_section_qc_prompt("QC RULES", section, 1, "my note", "3000")
+    assert "QC RULES" in prompt and "İNCELENECEK TASLAK" in prompt and section["html"] in prompt and "my note" in prompt
+    assert '"approved": true|false' in prompt and "s1: Chapter 1" in prompt
+    whole = build_whole_qc_prompt("WHOLE RULES", DRAFT, split_sections(DRAFT), "my note", "3000")
+    assert "WHOLE RULES" in whole and DRAFT in whole and "3000 karakter" in whole and "s2: Chapter 2" in whole
+
+
+def test_chapters_are_not_judged_on_whole_reading_criteria():
+    from prompts import SECTION_QC_PROMPT, WHOLE_READING_QC_PROMPT
+    assert "hooklar var mı" not in SECTION_QC_PROMPT and "hooklar var mı" in WHOLE_READING_QC_PROMPT
+    assert "ışık gördüğümü" not in SECTION_QC_PROMPT and "ışık gördüğümü" in WHOLE_READING_QC_PROMPT
+    assert "hatırladığını" not in SECTION_QC_PROMPT and "karakter uzunluğu" in WHOLE_READING_QC_PROMPT
+
+
+def test_whole_reading_issues_fail_the_draft():
+    sections = split_sections(DRAFT)
+    hooks = {"code": "HOOKS", "sections": [], "note": "No hook for a next session."}
+    verdict, feedback = aggregate([(s, True, []) for s in sections], (False, [hooks]))
+    assert not verdict["approved"] and verdict["issues"] == [hooks]
+    assert feedback == "[Tüm okuma]\n- [HOOKS] No hook for a next session."
+    assert aggregate([(s, True, []) for s in sections], (True, []))[0]["approved"]
+
+
+def test_reviewer_caches_unchanged_sections():
+    review = CountingReview(reject=("Chapter 2",))
+    reviewer = SectionReviewer(review)
+    sections = split_sections(DRAFT)
+    results = reviewer.review(sections, "note", "3000")
+    assert [ok for _, ok, _ in results] == [s["title"] != "Chapter 2" for s in sections]
+    assert sorted(review.calls) == sorted(s["id"] for s in sections)
+
+    changed = [dict(s, html=s["html"].replace("quiet", "bright")) if s["id"] == "s2" else s for s in sections]
+    reviewer.review(changed, "note", "3000")
+    assert len(review.calls) == len(sections) + 1 and reviewer.reused == len(sections) - 1
+    reviewer.review(changed[:2], "other note", "3000")
+    assert len(review.calls) == len(sections) + 3
+    reviewer.reset()
+    reviewer.review(changed[:1], "note", "3000")
+    assert len(review.calls) == len(sections) + 4
+
+
+def test_failed_review_is_retried():
+    attempts = []
+
+    def flaky(section, index, order_note, target_length):
+        attempts.append(section["id"])
+        if len(attempts) == 1:
+            raise RuntimeError("503")
+        return True, []
+
+    reviewer = SectionReviewer(flaky)
+    section = split_sections(DRAFT)[0]
+    future = reviewer.submit(section, 0, "note", "3000")
+    assert isinstance(future.exception(), RuntimeError)
+    assert reviewer.review([section], "note", "3000") == [(section, True, [])]
+
+
+def make_brain(tmp_path):
+    from agents import OracleBrain
+    from key_pool import KeyPool
+    from telemetry import Telemetry
+    from test_key_pool import DictStore
+
+    keys = ["AIzaTestKey-section-qc-0000000000", "AIzaTestKey-section-qc-1111111111"]
+    brain = OracleBrain(keys, key_pool=KeyPool(keys, store=DictStore()))
+    brain.telemetry = Telemetry(path=str(tmp_path / "spans.jsonl"))
+    brain.section_qc["enabled"] = True
+    return brain
+
+
+def reject_chapter_two(prompt, model_name):
+    from fake_backend import default_responder
+    if "BÖLÜM KAPSAMI" in prompt and "<h2>Chapter 2</h2>" in prompt and "revised truth" not in prompt:
+        return '```json\n{"approved": false, "issues": [{"code": "relevance", "sections": [], "note": "Chapter 2 feels generic."}]}\n```'
+    if "BÖLÜM KAPSAMI" in prompt or "TÜM OKUMA" in prompt:
+        return '{"approved": true, "issues": []}'
+    return default_responder(prompt, model_name)
+
+
+def test_only_rejected_sections_are_rewritten_and_re_reviewed(tmp_path):
+    from fake_backend import FakeGemini, Latency, installed
+
+    backend = FakeGemini(latency=Latency(median=0.0, sigma=0.0), time_scale=0.0, responder=reject_chapter_two)
+    with installed(gemini=backend):
+        brain = make_brain(tmp_path)
+        approved, notes = brain.grandmaster_agent(DRAFT, "note", "3000")
+        assert not approved and "- [RELEVANCE] Chapter 2 feels generic." in notes
+        failing = brain._failing_sections(DRAFT)
+        assert failing == ["s2"]
+        calls = backend.stats["calls"]
+        revised = brain.revise_sections(DRAFT, failing, "note", "Love", "3000", "", notes)
+        assert backend.stats["calls"] == calls + 1
+        assert brain.grandmaster_agent(revised, "note", "3000") == (True, "Onaylandı. Mükemmel.")
+        assert backend.stats["calls"] == calls + 3  # the rewritten chapter and the new whole draft
+
+    before, after = split_sections(DRAFT), split_sections(revised)
+    assert [s["id"] for s in before] == [s["id"] for s in after]
+    assert [b["html"] == a["html"] for b, a in zip(before, after)] == [s["id"] != "s2" for s in before]
+    assert brain.usage_stats["section_revisions"] == 1
+    assert brain.usage_stats["section_reviews"] == len(before) + 1
+    assert brain.usage_stats["whole_reviews"] == 2
+    assert brain.usage_stats["qc_verdict_fallbacks"] == 0
+
+
+def test_pipelined_review_starts_during_the_stream(tmp_path):
+    from fake_backend import FakeGemini, Latency, installed
+
+    backend = FakeGemini(latency=Latency(median=0.0, sigma=0.0), time_scale=0.0, chunk_chars=200)
+    with installed(gemini=backend):
+        brain = make_brain(tmp_path)
+        brain.section_qc["pipeline"] = True
+        draft = brain.medium_agent("note", "Love", target_length="3000")
+        sections = split_sections(draft)
+        assert brain.section_reviewer.submitted == len(sections) - 1  # all but the last chapter
+        assert brain.grandmaster_agent(draft, "note", "3000")[0]
+    assert brain.usage_stats["section_reviews"] == len(sections)
+    assert brain.usage_stats["section_reviews_reused"] == len(sections) - 1
@@ -0,0 +1,92 @@
+import sys
+sys.path.insert(0, '.')
+from sections import (parse_target_length, visible_length, split_sections, join_sections,
+                      replace_section, clean_section, build_expansion_prompt)
+
+DRAFT = ("<h1>The Veil</h1>\n<div class=\"subtitle\">For Julie</div>\n<p>Opening.</p>\n"
+         "<h2>The Past</h2>\n<p>Short.</p>\n\n"
+         "<h2 class=\"x\">The <b>Present</b></h2>\n<p>A little longer paragraph here.</p>\n"
+         "<h2>The Seal</h2>\n<div class=\"warningseal\">Listen.</div>\n</div>")
+
+
+def test_parse_target_length():
+    assert parse_target_length("8000") == 8000
+    assert parse_target_length(" 20,000 ") == 20000
+    assert parse_target_length("SOVEREIGN DEPTH (20K CHARS)") == 20000
+    assert parse_target_length("Minimum 4 Pages of Esoteric Depth") == 8000
+    assert parse_target_length(None, default=15000) == 15000
+
+
+def test_split_is_lossless_and_keeps_titles():
+    sections = split_sections(DRAFT)
+    assert join_sections(sections) == DRAFT
+    assert [s["id"] for s in sections] == ["s0", "s1", "s2", "s3"]
+    assert [s["title"] for s in sections] == ["", "The Past", "The Present", "The Seal"]
+    assert split_sections("<p>no chapters</p>") == [{"id": "s0", "title": "", "html": "<p>no chapters</p>"}]
+    assert visible_length("<p>a  <b>b</b></p>\n") == 3
+
+
+def test_clean_section_accepts_only_drop_in_replacements():
+    original = split_sections(DRAFT)[1]["html"]
+    longer = "```html\n<h2>The Past</h2>\n<p>Short, then much longer and deeper.</p>\n```"
+    assert clean_section(longer, original) == "<h2>The Past</h2>\n<p>Short, then much longer and deeper.</p>\n\n"
+    assert clean_section("<p>The Past was...</p>" * 5, original) is None
+    assert clean_section("<h1>New</h1><h2>The Past</h2>" + "<p>x</p>" * 20, original) is None
+    assert clean_section("<h2>The Past</h2><p>S.</p>", original) is None
+    spliced = join_sections(replace_section(split_sections(DRAFT), "s1", clean_section(longer, original)))
+    assert spliced.count("<h2") == 3 and "much longer" in spliced and spliced.endswith("</div>")
+
+
+def test_expansion_prompt_carries_context_and_section():
+    section = split_sections(DRAFT)[1]
+    prompt = build_expansion_prompt("ORIGINAL", DRAFT, section, 900)
+    assert prompt.startswith("ORIGINAL") and DRAFT in prompt and "en az 900 harf" in prompt
+    assert prompt.rstrip().endswith("<p>Short.</p>\n<<<BÖLÜM_SONU>>>")
+
+
+def make_brain(tmp_path):
+    from agents import OracleBrain
+    from key_pool import KeyPool
+    from telemetry import Telemetry
+    from test_key_pool import DictStore
+
+    keys = ["AIzaTestKey-sections-00000000000", "AIzaTestKey-sections-11111111111"]
+    brain = OracleBrain(keys, key_pool=KeyPool(keys, store=DictStore()))
+    brain.telemetry = Telemetry(path=str(tmp_path / "spans.jsonl"))
+    return brain
+
+
+def test_short_draft_is_expanded_by_section_not_rewritten(tmp_path):
+    from fake_backend import FakeGemini, Latency, default_responder, fake_document, installed
+
+    def responder(prompt, model_name):
+        if "<<<" in prompt:
+            return default_responder(prompt, model_name)
+        return fake_document(4000)  # complete, but half of the 8000 target
+
+    backend = FakeGemini(latency=Latency(median=0.0, sigma=0.0), time_scale=0.0, responder=responder)
+    with installed(gemini=backend):
+        brain = make_brain(tmp_path)
+        draft = brain.medium_agent("Will Tom come back?", "Love", target_length="8000")
+    assert visible_length(draft) >= visible_length(fake_document(4000)) + 3000
+    assert draft.startswith("<h1>") and draft.count("<h1>") == 1 and draft.endswith("</div>")
+    assert draft.count("<h2>") == fake_document(4000).count("<h2>")
+    assert brain.usage_stats["length_extensions"] >= 3
+    assert backend.stats["calls"] == 1 + brain.usage_stats["length_extensions"]
+
+
+def test_truncated_draft_is_continued(tmp_path):
+    from fake_backend import FakeGemini, Latency, default_responder, fake_document, installed
+
+    def responder(prompt, model_name):
+        if "<<<" in prompt:
+            return default_responder(prompt, model_name)
+        return fake_document(8000)[:3000]  # cut off mid-text, like an output-token limit
+
+    backend = FakeGemini(latency=Latency(median=0.0, sigma=0.0), time_scale=0.0, responder=responder)
+    with installed(gemini=backend):
+        brain = make_brain(tmp_path)
+        draft = brain.medium_agent("Will Tom come back?", "Love", target_length="8000")
+    assert draft.startswith(fake_document(8000)[:3000]) and draft.endswith("</div>")
+    assert draft.count("<h1>") == 1 and visible_length(draft) >= 0.9 * 8000 * 0.9
+    assert brain.usage_stats["length_extensions"] == 1 and backend.stats["calls"] == 2
@@ -0,0 +1,176 @@
+import sys
+import time
+import threading
+sys.path.insert(0, '.')
+from concurrency import iter_completed, run_parallel
+from key_pool import KeyPool
+from test_key_pool import DictStore
+
+
+def make_brain(tmp_path, n_keys=3):
+    from agents import OracleBrain
+    from telemetry import Telemetry
+    keys = [f"AIzaTestKey-speculative-{i}00000000" for i in range(n_keys)]
+    brain = OracleBrain(keys, key_pool=KeyPool(keys, store=DictStore()))
+    brain.telemetry = Telemetry(path=str(tmp_path / "spans.jsonl"))
+    return brain
+
+
+def test_run_parallel_keeps_order_and_captures_errors():
+    def boom():
+        raise ValueError("nope")
+    results = run_parallel([lambda: 1, boom, lambda: 3])
+    assert results[0] == (1, None) and results[2] == (3, None)
+    assert isinstance(results[1][1], ValueError)
+
+
+def test_iter_completed_yields_fastest_first():
+    def slow():
+        time.sleep(0.2)
+        return "slow"
+    order = [result for _, result, _ in iter_completed([slow, lambda: "fast"])]
+    assert order == ["fast", "slow"]
+
+
+def test_speculative_round_runs_branches_concurrently_and_picks_best(tmp_path):
+    brain = make_brain(tmp_path)
+    lock = threading.Lock()
+    state = {"active": 0, "peak": 0, "n": 0}
+
+    def fake_medium(order_note, reading_topic, target_length, memory_context, feedback=None, progress_callback=None):
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+            state["n"] += 1
+            n = state["n"]
+        time.sleep(0.1)
+        with lock:
+            state["active"] -= 1
+        return "x" * (1000 * n)
+
+    brain.medium_agent = fake_medium
+    brain.grandmaster_agent = lambda draft, *a, **k: (False, "needs work " * (10 - len(draft) // 1000))
+    draft, approved, notes = brain._speculative_round(3, "note", "topic", "3000", "", stop_on_approval=True)
+    assert state["peak"] == 3
+    assert len(draft) == 3000 and not approved
+    assert brain.usage_stats["speculative_drafts"] == 3
+
+
+def test_first_approved_candidate_wins(tmp_path):
+    brain = make_brain(tmp_path)
+    calls = []
+    lock = threading.Lock()
+
+    def fake_medium(order_note, reading_topic, target_length, memory_context, feedback=None, progress_callback=None):
+        with lock:
+            calls.append(1)
+            first = len(calls) == 1
+        if first:
+            return "approved draft"
+        time.sleep(0.3)
+        return "late draft"
+
+    brain.medium_agent = fake_medium
+    brain.grandmaster_agent = lambda draft, *a, **k: (draft == "approved draft", "ok")
+    started = time.time()
+    draft, approved, _ = brain._speculative_round(2, "note", "topic", "8000", "", stop_on_approval=True)
+    assert approved and draft == "approved draft"
+    assert time.time() - started < 0.25
+
+
+def test_abandoned_branches_stop_at_their_next_call(tmp_path, monkeypatch):
+    from agents import OracleBrain
+    from concurrency import Cancelled
+    brain = make_brain(tmp_path)
+    outcome = []
+    lock = threading.Lock()
+
+    def fake_medium(self, order_note, reading_topic, target_length, memory_context, feedback=None, progress_callback=None):
+        with lock:
+            first = not outcome
+            if first:
+                outcome.append("first")
+        if first:
+            time.sleep(0.05)  # both branches are running when the round is decided
+            return "approved draft"
+        time.sleep(0.2)
+        try:
+            self._acquire_key("one more chapter")
+            outcome.append("called")
+        except Cancelled:
+            outcome.append("cancelled")
+        return "late draft"
+
+    monkeypatch.setattr(OracleBrain, "medium_agent", fake_medium)
+    brain.grandmaster_agent = lambda draft, *a, **k: (draft == "approved draft", "ok")
+    draft, approved, _ = brain._speculative_round(2, "note", "topic", "8000", "", stop_on_approval=True)
+    assert approved and draft == "approved draft"
+    time.sleep(0.4)
+    assert outcome == ["first", "cancelled"]
+    assert brain.usage_stats["speculative_drafts"] == 1  # the abandoned draft never finished
+
+
+def test_speculative_round_is_one_qc_round(tmp_path, monkeypatch):
+    from test_budget import run_reading
+    draft, delivery, usage = run_reading(tmp_path, monkeypatch, {}, branches=2)
+    assert draft and delivery
+    assert usage["qc_rounds"] + (usage["rounds_saved"] or 0) == 4 and usage["qc_rounds"] >= 3
+    assert usage["speculative_drafts"] == 2 * usage["qc_rounds"]
+
+
+def test_cost_ceiling_limits_branches(tmp_path):
+    brain = make_brain(tmp_path, n_keys=4)
+    brain.usage_stats["cost_usd"] = 1.0  # two drafts so far -> $0.50 per draft
+    assert brain._plan_branches(4, 2.0, drafts_done=2) == 2
+    assert brain._plan_branches(4, 10.0, drafts_done=2) == 4
+    assert brain._plan_branches(1, 10.0, drafts_done=0) == 1
+
+
+def test_run_stage_isolates_failures_and_timeouts():
+    from concurrency import run_stage
+
+    def slow():
+        time.sleep(1.0)
+        return "late"
+
+    def boom():
+        raise RuntimeError("db down")
+
+    started = time.time()
+    results = run_stage({
+        "memory": (boom, 5),
+        "audio": (slow, 0.2),
+        "delivery": (lambda: "Hi Sarah", 5),
+    })
+    assert time.time() - started < 0.8
+    assert results["delivery"] == ("Hi Sarah", None)
+    assert isinstance(results["memory"][1], RuntimeError)
+    assert isinstance(results["audio"][1], TimeoutError)
+
+
+def test_post_approval_tail_runs_concurrently_and_saves_usage_last(tmp_path):
+    brain = make_brain(tmp_path)
+    events = []
+
+    def fake_update_memory(reading_text, client_name, memory_manager):
+        time.sleep(0.3)
+        events.append("memory")
+        return True
+
+    def fake_delivery(client_name, reading_topic):
+        time.sleep(0.3)
+        events.append("delivery")
+        return "Hi Sarah"
+
+    class FakeMem:
+        def save_usage(self, client, topic, usage):
+            events.append("usage")
+
+    brain.extract_post_reading = lambda reading_text, client_name, reading_topic: None  # fused call failed: separate calls
+    brain.update_memory = fake_update_memory
+    brain.generate_delivery_message = fake_delivery
+    started = time.time()
+    msg, audio = brain._run_post_approval("draft", "sarah@x.com", FakeMem(), "Sarah", "sarah@x.com", "Love")
+    assert time.time() - started < 0.55
+    assert msg == "Hi Sarah" and audio is None
+    assert events[-1] == "usage"
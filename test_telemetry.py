@@ -0,0 +1,136 @@
+import sys
+import json
+import urllib.request
+sys.path.insert(0, '.')
+from telemetry import Telemetry
+
+
+class FakeClock:
+    def __init__(self, start=1_800_000_000.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+
+def read_spans(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_span_records_timings_tokens_and_cause(tmp_path):
+    clock = FakeClock()
+    telemetry = Telemetry(path=str(tmp_path / "spans.jsonl"), clock=clock)
+
+    span = telemetry.span("stream", "oracle", "draft", "models/gemini-3.1-pro-preview", 1, 2, queue_wait=3.5, resumed=True)
+    clock.now += 2
+    span.first_token()
+    clock.now += 8
+    span.tokens(1200, 3000)
+    span.ok()
+    span.end()
+    span.end()  # idempotent
+
+    failed = telemetry.span("generate", "oracle", "grandmaster", "gemini-3.1-pro-preview", 0, 1, rot13=True)
+    clock.now += 4
+    failed.fail("quota")
+    clock.now += 30  # backoff wait after the failure is not call latency
+    failed.end()
+
+    first, second = read_spans(tmp_path / "spans.jsonl")
+    assert first["model"] == "gemini-3.1-pro-preview" and first["resumed"] is True
+    assert (first["queue_wait_s"], first["ttft_s"], first["latency_s"]) == (3.5, 2.0, 10.0)
+    assert (first["tokens_in"], first["tokens_out"], first["status"]) == (1200, 3000, "ok")
+    assert (second["status"], second["retry_cause"], second["latency_s"], second["rot13"]) == ("error", "quota", 4.0, True)
+
+
+def test_rotation_keeps_bounded_files(tmp_path):
+    telemetry = Telemetry(path=str(tmp_path / "spans.jsonl"), max_bytes=2000, backup_count=2)
+    for n in range(100):
+        span = telemetry.span("generate", "oracle", "extraction", "gemini", 0, n)
+        span.ok()
+        span.end()
+    files = sorted(p.name for p in tmp_path.iterdir())
+    assert files == ["spans.jsonl", "spans.jsonl.1", "spans.jsonl.2"]
+
+
+def test_prometheus_quantiles_per_agent(tmp_path):
+    clock = FakeClock()
+    telemetry = Telemetry(path=str(tmp_path / "spans.jsonl"), clock=clock)
+    for latency in range(1, 101):
+        span = telemetry.span("generate", "oracle", "grandmaster", "gemini", 0, 1)
+        clock.now += latency
+        span.ok()
+        span.end()
+    span = telemetry.span("generate", "spell", "spell_qc", "gemini", 0, 1)
+    span.fail("transient")
+    span.end()
+
+    summary = telemetry.summary()
+    assert (summary["grandmaster"]["latency_p50"], summary["grandmaster"]["latency_p95"],
+            summary["grandmaster"]["latency_p99"]) == (50, 95, 99)
+    assert summary["spell_qc"]["retries"] == {"transient": 1}
+
+    text = telemetry.render_prometheus()
+    assert 'oracle_llm_latency_seconds{agent="grandmaster",quantile="0.95"} 95' in text
+    assert 'oracle_llm_latency_seconds_count{agent="grandmaster"} 100' in text
+    assert 'oracle_llm_retries_total{agent="spell_qc",cause="transient"} 1' in text
+    assert 'oracle_llm_calls_total{agent="grandmaster",status="ok"} 100' in text
+
+
+def test_metrics_endpoint(tmp_path):
+    telemetry = Telemetry(path=str(tmp_path / "spans.jsonl"))
+    span = telemetry.span("generate", "oracle", "delivery", "gemini", 0, 1)
+    span.ok()
+    span.end()
+    server = telemetry.serve(0, host="127.0.0.1")
+    try:
+        port = server.server_address[1]
+        body = urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5).read().decode()
+        assert 'oracle_llm_calls_total{agent="delivery",status="ok"} 1' in body
+    finally:
+        server.shutdown()
+
+
+def test_generate_with_retry_emits_one_span_per_attempt(tmp_path):
+    from google.api_core import exceptions
+    from agents import OracleBrain
+    from key_pool import KeyPool
+    from test_key_pool import DictStore
+
+    keys = ["AIzaTestKey-telemetry-000000000", "AIzaTestKey-telemetry-111111111"]
+    brain = OracleBrain(keys, key_pool=KeyPool(keys, store=DictStore()))
+    brain.telemetry = Telemetry(path=str(tmp_path / "spans.jsonl"))
+    brain._configure_genai = lambda: None
+    brain._reinit_models = lambda: None
+    brain.model_routes = {}  # delivery on the brain's own (flaky) handle, not the flash tier
+
+    class Meta:
+        prompt_token_count = 40
+        candidates_token_count = 7
+        total_token_count = 47
+        cached_content_token_count = 0
+
+    class Resp:
+        text = "ok"
+        candidates = ["ok"]
+        usage_metadata = Meta()
+        prompt_feedback = None
+
+    class FlakyModel:
+        model_name = "models/gemini-3.1-pro-preview"
+        calls = 0
+
+        def generate_content(self, prompt, request_options=None):
+            FlakyModel.calls += 1
+            if FlakyModel.calls == 1:
+                raise exceptions.ServiceUnavailable("busy")
+            return Resp()
+
+    brain.model = FlakyModel()
+    assert brain.generate_with_retry(brain.model, "prompt", agent="delivery").text == "ok"
+
+    first, second = read_spans(tmp_path / "spans.jsonl")
+    assert (first["agent"], first["attempt"], first["status"], first["retry_cause"]) == ("delivery", 1, "error", "transient")
+    assert (second["attempt"], second["status"], second["tokens_in"], second["tokens_out"]) == (2, "ok", 40, 7)
+    assert first["key_index"] != second["key_index"]
@@ -0,0 +1,91 @@
+import sys
+import random
+sys.path.insert(0, '.')
+from token_estimator import TokenEstimator, features
+
+TR = "Kartlar bu ilişkinin çok derin bir dönüşümden geçtiğini gösteriyor ve sen bunu hissediyorsun. "
+EN = "The cards show that this connection is moving through a deep transformation and you feel it. "
+HTML = "<p class=\"reading\">{}</p>\n"
+
+
+def true_tokens(text):
+    """Stand-in tokenizer: Turkish, English and markup at different densities."""
+    tr, en, other = features(text)
+    return int(1000 * (0.37 * tr + 0.21 * en + 0.62 * other))
+
+
+def sample(rng):
+    parts = []
+    for _ in range(rng.randint(5, 40)):
+        parts.append(HTML.format(TR if rng.random() < rng.random() else EN))
+    return "".join(parts)
+
+
+def test_features_split_languages_by_line():
+    tr, en, other = features("Bu bir deneme ve çok güzel\nThis is the test")
+    assert tr > 0 and en > 0 and other == 0
+
+
+def test_calibrates_to_within_a_few_percent():
+    rng = random.Random(5)
+    est = TokenEstimator(audit=False)
+    before = [abs(est.estimate(t, "gemini-3.1-pro-preview") - true_tokens(t)) / true_tokens(t)
+              for t in (sample(rng) for _ in range(20))]
+    for _ in range(80):
+        text = sample(rng)
+        est.observe(text, true_tokens(text), "gemini-3.1-pro-preview")
+    after = [abs(est.estimate(t, "gemini-3.1-pro-preview") - true_tokens(t)) / true_tokens(t)
+             for t in (sample(rng) for _ in range(50))]
+    assert max(after) < 0.03 < sum(before) / len(before)
+    assert est.report()["gemini-3.1-pro-preview"]["samples"] == 80
+
+
+def test_models_are_calibrated_separately():
+    est = TokenEstimator(audit=False)
+    text = HTML.format(EN) * 20
+    for _ in range(30):
+        est.observe(text, 2 * true_tokens(text), "models/gemini-2.5-flash")
+    assert est.estimate(text, "gemini-2.5-flash") > 1.5 * est.estimate(text, "gemini-3.1-pro-preview")
+
+
+def test_audit_mode_uses_exact_count_and_records_error():
+    class Count:
+        total_tokens = 500
+
+    class Model:
+        calls = 0
+
+        def count_tokens(self, text):
+            Model.calls += 1
+            return Count()
+
+    text = HTML.format(EN) * 10
+    assert TokenEstimator(audit=False).count(Model(), text) != 500 and Model.calls == 0
+    audited = TokenEstimator(audit=True)
+    assert audited.count(Model(), text, "gemini-x") == 500 and Model.calls == 1
+    report = audited.report()["gemini-x"]
+    assert report["audit_mean_error"] > 0 and report["samples"] == 1
+
+
+def test_stream_does_not_call_count_tokens(tmp_path):
+    from agents import OracleBrain
+    from key_pool import KeyPool
+    from telemetry import Telemetry
+    from test_key_pool import DictStore
+    from fake_backend import FakeGemini, Latency, installed
+
+    backend = FakeGemini(latency=Latency(median=0.0, sigma=0.0), time_scale=0.0)
+    keys = ["AIzaTestKey-token-estimator-000", "AIzaTestKey-token-estimator-111"]
+    with installed(gemini=backend):
+        brain = OracleBrain(keys, key_pool=KeyPool(keys, store=DictStore()))
+        brain.telemetry = Telemetry(path=str(tmp_path / "spans.jsonl"))
+        brain.token_estimator = TokenEstimator(audit=False)
+        counted = []
+        original = type(brain.model).count_tokens
+        type(brain.model).count_tokens = lambda self, text: counted.append(text) or original(self, text)
+        try:
+            text = "".join(c for c in brain.stream_with_retry(brain.model, "HEDEF: Minimum 2000 karakter.") if c != "__RESET_STREAM__")
+        finally:
+            type(brain.model).count_tokens = original
+    assert text.endswith("</div>") and counted == []
+    assert brain.token_estimator.report()[brain.current_model_name]["samples"] == 1  # output calibrated from metadata
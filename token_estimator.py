@@ -0,0 +1,157 @@
+"""
+Local Token Estimator for Nes Shine Oracle
+Replaces the blocking count_tokens() round-trips in stream_with_retry. Text is
+split into Turkish letters, English letters and symbols/markup (each line is
+classified by Turkish characters and stopwords); tokens are a linear function
+of those counts with per-model coefficients. Coefficients start from priors
+and are re-fitted after every call from the real usage_metadata (decayed
+least squares with a ridge pull towards the prior), so the estimate tracks
+the tokenizer of each model. TOKEN_AUDIT=1 keeps the exact count_tokens()
+calls and records the estimator's error next to them.
+"""
+
+import os
+import re
+import threading
+from collections import deque
+
+# Tokens per character before any calibration: Turkish tokenizes denser than English
+PRIOR = (0.30, 0.24, 0.45)    # (turkish letters, english letters, symbols/digits/markup)
+DECAY = 0.98                  # weight of older samples per new observation (~50-sample memory)
+RIDGE = 0.5                   # pull towards PRIOR (in (1000 chars)^2 units)
+MIN_SAMPLE_CHARS = 40         # tiny texts say more about overhead than about the tokenizer
+ERROR_WINDOW = 200            # relative errors kept for the accuracy report
+
+_TR_CHARS = set("çğıöşüÇĞİÖŞÜâîû")
+_TR_WORDS = re.compile(r"\b(?:ve|bir|bu|için|ile|olarak|çok|ne|da|de|gibi|daha|ama|sen|ben|o|şu|değil|mi|mı|ki)\b", re.IGNORECASE)
+_EN_WORDS = re.compile(r"\b(?:the|and|you|your|is|of|to|a|in|that|it|for|with|he|she|will)\b", re.IGNORECASE)
+
+
+def _is_turkish(line):
+    if any(c in _TR_CHARS for c in line):
+        return True
+    return len(_TR_WORDS.findall(line)) > len(_EN_WORDS.findall(line))
+
+
+def features(text):
+    """(turkish letters, english letters, other non-space chars), in thousands of characters."""
+    tr = en = other = 0
+    for line in (text or "").splitlines():
+        letters = sum(1 for c in line if c.isalpha())
+        symbols = sum(1 for c in line if not c.isalpha() and not c.isspace())
+        if _is_turkish(line):
+            tr += letters
+        else:
+            en += letters
+        other += symbols
+    return tr / 1000.0, en / 1000.0, other / 1000.0
+
+
+def _solve3(a, b):
+    """Gaussian elimination for the 3x3 normal equations."""
+    m = [list(a[i]) + [b[i]] for i in range(3)]
+    for col in range(3):
+        pivot = max(range(col, 3), key=lambda r: abs(m[r][col]))
+        m[col], m[pivot] = m[pivot], m[col]
+        if abs(m[col][col]) < 1e-12:
+            return None
+        for r in range(3):
+            if r != col:
+                f = m[r][col] / m[col][col]
+                m[r] = [x - f * y for x, y in zip(m[r], m[col])]
+    return tuple(m[i][3] / m[i][i] for i in range(3))
+
+
+class _ModelFit:
+    def __init__(self, prior):
+        self.xtx = [[0.0] * 3 for _ in range(3)]
+        self.xty = [0.0] * 3
+        self.coef = tuple(prior)
+        self.samples = 0
+        self.errors = deque(maxlen=ERROR_WINDOW)
+        self.audit_errors = deque(maxlen=ERROR_WINDOW)
+
+
+class TokenEstimator:
+    def __init__(self, prior=PRIOR, decay=DECAY, ridge=RIDGE, audit=None):
+        self.prior = tuple(prior)
+        self.decay = decay
+        self.ridge = ridge
+        self.audit = (os.environ.get("TOKEN_AUDIT", "") == "1") if audit is None else audit
+        self._lock = threading.Lock()
+        self._models = {}
+
+    def _fit(self, model):
+        key = (model or "default").replace("models/", "")
+        if key not in self._models:
+            self._models[key] = _ModelFit(self.prior)
+        return self._models[key]
+
+    def estimate(self, text, model=None):
+        x = features(str(text or ""))
+        with self._lock:
+            coef = self._fit(model).coef
+        return max(1, int(round(1000 * sum(c * f for c, f in zip(coef, x))))) if text else 0
+
+    def observe(self, text, tokens, model=None):
+        """Calibrates with a real token count (usage_metadata) for `text`."""
+        text = str(text or "")
+        if not tokens or len(text) < MIN_SAMPLE_CHARS:
+            return
+        x = features(text)
+        y = tokens / 1000.0
+        with self._lock:
+            fit = self._fit(model)
+            predicted = sum(c * f for c, f in zip(fit.coef, x))
+            fit.errors.append(abs(predicted - y) / y)
+            for i in range(3):
+                fit.xty[i] = fit.xty[i] * self.decay + x[i] * y
+                for j in range(3):
+                    fit.xtx[i][j] = fit.xtx[i][j] * self.decay + x[i] * x[j]
+            a = [[fit.xtx[i][j] + (self.ridge if i == j else 0.0) for j in range(3)] for i in range(3)]
+            b = [fit.xty[i] + self.ridge * self.prior[i] for i in range(3)]
+            solved = _solve3(a, b)
+            if solved and all(c > 0 for c in solved):
+                fit.coef = solved
+            fit.samples += 1
+
+    def count(self, model_handle, text, model=None):
+        """
+        Token count for `text`: local estimate, or in audit mode the exact
+        count_tokens() result (the estimate's error is recorded and the exact
+        count calibrates the fit).
+        """
+        estimate = self.estimate(text, model)
+        if not self.audit or model_handle is None:
+            return estimate
+        try:
+            exact = model_handle.count_tokens(text).total_tokens
+        except Exception as e:
+            print(f"TOKEN AUDIT: count_tokens başarısız ({str(e)[:80]}), tahmin kullanılıyor.")
+            return estimate
+        if exact:
+            with self._lock:
+                self._fit(model).audit_errors.append(abs(estimate - exact) / exact)
+            self.observe(text, exact, model)
+        return exact
+
+    def report(self):
+        """{model: {"samples", "coef", "mean_error", "audit_mean_error"}} (errors as fractions)."""
+        with self._lock:
+            return {
+                name: {
+                    "samples": fit.samples,
+                    "coef": tuple(round(c, 4) for c in fit.coef),
+                    "mean_error": sum(fit.errors) / len(fit.errors) if fit.errors else None,
+                    "audit_mean_error": sum(fit.audit_errors) / len(fit.audit_errors) if fit.audit_errors else None,
+                }
+                for name, fit in self._models.items()
+            }
+
+
+_ESTIMATOR = TokenEstimator()
+
+
+def get_token_estimator():
+    """Process-wide estimator shared by OracleBrain and SpellBrain (calibration is per model)."""
+    return _ESTIMATOR